@@ -0,0 +1,210 @@
+"""
+Answer backends - Optional model-backed answers for FAQGenerationAgent
+
+The agent asks a backend for answers first and falls back to its rule-based
+answer for every question the backend could not answer.
+"""
+import asyncio
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from models.product import Product
+
+# Status codes worth retrying; other 4xx responses fail the batch immediately
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class BackendError(Exception):
+    """A generation request failed (transport error or bad response)"""
+    
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class _ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP connections to one host"""
+    
+    def __init__(self, url: str, size: int, timeout: float):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported answer backend URL: {url}")
+        self._factory = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+    
+    def acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._factory(self.host, self.port, timeout=self.timeout)
+    
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True):
+        if not reusable:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HTTPAnswerBackend:
+    """
+    Sends questions to an HTTP text-generation service
+    
+    Protocol: POST <url> {"product": {...}, "questions": [{"category", "question"}, ...]}
+    answered with {"answers": ["...", ...]} in the same order.
+    
+    Questions are sent in batches of `batch_size`. At most `concurrency`
+    requests are in flight across all callers; they share a pool of keep-alive
+    connections. Each call has a `timeout` (seconds) and is retried up to
+    `retries` times with exponential backoff plus jitter. Batches that still
+    fail come back as None so the agent uses its rule-based answers.
+    """
+    
+    def __init__(self, url: str, batch_size: int = 4, concurrency: int = 8,
+                 timeout: float = 5.0, retries: int = 2, backoff: float = 0.1):
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("batch_size and concurrency must be at least 1")
+        if retries < 0 or timeout <= 0:
+            raise ValueError("retries must be >= 0 and timeout > 0")
+        self.url = url
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._pool = _ConnectionPool(url, size=concurrency, timeout=timeout)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="answer-backend")
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failed_batches": 0, "answered": 0, "fallbacks": 0}
+    
+    @classmethod
+    def from_env(cls) -> Optional['HTTPAnswerBackend']:
+        """
+        Backend configured by ANSWER_BACKEND_URL (and ANSWER_BACKEND_* tuning), or None
+        
+        Backends are shared per process and settings, so every agent (one per
+        API request) uses the same connection pool, executor and concurrency
+        bound.
+        """
+        url = os.environ.get("ANSWER_BACKEND_URL")
+        if not url:
+            return None
+        settings = dict(
+            batch_size=int(os.environ.get("ANSWER_BACKEND_BATCH_SIZE", "4")),
+            concurrency=int(os.environ.get("ANSWER_BACKEND_CONCURRENCY", "8")),
+            timeout=float(os.environ.get("ANSWER_BACKEND_TIMEOUT", "5.0")),
+            retries=int(os.environ.get("ANSWER_BACKEND_RETRIES", "2"))
+        )
+        # Forked workers must not inherit the parent's executor threads
+        key = (os.getpid(), url) + tuple(settings.values())
+        with _instances_lock:
+            backend = _instances.get(key)
+            if backend is None:
+                backend = _instances[key] = cls(url, **settings)
+            return backend
+    
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+    
+    def _post(self, payload: bytes, expected: int) -> List[str]:
+        """One blocking request on a pooled connection (runs in the executor)"""
+        conn = self._pool.acquire()
+        reusable = False
+        try:
+            conn.request("POST", self._pool.path, body=payload,
+                         headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            body = response.read()
+            reusable = not response.will_close
+        except (OSError, http.client.HTTPException) as e:
+            raise BackendError(f"{type(e).__name__}: {e}")
+        finally:
+            self._pool.release(conn, reusable)
+        
+        if response.status != 200:
+            raise BackendError(f"HTTP {response.status}", retryable=response.status in RETRYABLE_STATUSES)
+        try:
+            answers = json.loads(body)["answers"]
+        except (ValueError, KeyError, TypeError):
+            raise BackendError("Malformed backend response")
+        if not isinstance(answers, list) or len(answers) != expected:
+            raise BackendError("Backend returned the wrong number of answers")
+        return answers
+    
+    async def _answer_batch(self, loop, semaphore: asyncio.Semaphore, product: Dict,
+                            batch: List[Dict]) -> List[Optional[str]]:
+        payload = json.dumps({
+            "product": product,
+            "questions": [{"category": q.get("category", ""), "question": q.get("question", "")}
+                          for q in batch]
+        }, ensure_ascii=False).encode("utf-8")
+        
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    self._count(requests=1)
+                    answers = await loop.run_in_executor(self._executor, self._post, payload, len(batch))
+                return [a if isinstance(a, str) and a.strip() else None for a in answers]
+            except BackendError as e:
+                if not e.retryable or attempt == self.retries:
+                    break
+                self._count(retries=1)
+                delay = self.backoff * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+        self._count(failed_batches=1)
+        return [None] * len(batch)
+    
+    async def answer_async(self, product: Product, questions: List[Dict]) -> List[Optional[str]]:
+        """Answer all questions with bounded concurrency; None marks a failed answer"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        data = product.to_dict()
+        batches = [questions[i:i + self.batch_size] for i in range(0, len(questions), self.batch_size)]
+        results = await asyncio.gather(*(self._answer_batch(loop, semaphore, data, batch) for batch in batches))
+        answers = [answer for batch in results for answer in batch]
+        answered = sum(answer is not None for answer in answers)
+        self._count(answered=answered, fallbacks=len(answers) - answered)
+        return answers
+    
+    def answer(self, product: Product, questions: List[Dict]) -> List[Optional[str]]:
+        """Synchronous entry point used by FAQGenerationAgent"""
+        if not questions:
+            return []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.answer_async(product, questions))
+        # Called from a coroutine: asyncio.run() cannot nest, so the batches get
+        # their own event loop on a helper thread while this caller blocks
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="answer-backend-loop") as runner:
+            return runner.submit(asyncio.run, self.answer_async(product, questions)).result()
+    
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._pool.close()
+
+
+# Backends created through from_env, one per process and settings
+_instances: Dict[Tuple, HTTPAnswerBackend] = {}
+_instances_lock = threading.Lock()
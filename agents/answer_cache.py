@@ -0,0 +1,65 @@
+"""
+Answer cache - Shares generated FAQ answers across products and runs
+
+Entries are keyed by the answer intent plus the values of only the product
+fields that intent reads, so variants that differ in, say, name or price
+still share their usage and ingredient answers.
+"""
+import functools
+import os
+from typing import Callable, Dict
+
+
+class AnswerCache:
+    """
+    Bounded LRU cache of rendered answers
+    
+    `render(renderer, args)` returns `renderer(args)`, caching on the
+    renderer plus its (hashable) arguments; callers pass only arguments
+    whose equal values render the same text (not 10 and 10.0). Built on
+    functools.lru_cache (C implementation, thread-safe): a lookup must stay
+    cheaper than the string formatting it saves.
+    
+    Args:
+        max_entries: Capacity; 0 disables caching
+        name: Cache name used on /metrics
+    """
+    
+    def __init__(self, max_entries: int = 4096, name: str = "faq_answers"):
+        if max_entries < 0:
+            raise ValueError("max_entries must not be negative")
+        self.max_entries = max_entries
+        self.name = name
+        self.render = functools.lru_cache(maxsize=max_entries)(_call) if max_entries else _call
+    
+    @classmethod
+    def from_env(cls) -> 'AnswerCache':
+        """Cache sized by FAQ_ANSWER_CACHE_SIZE (default 16384, 0 disables)"""
+        return cls(max_entries=int(os.environ.get("FAQ_ANSWER_CACHE_SIZE", "16384")))
+    
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters, current size and hit rate"""
+        if not self.max_entries:
+            return {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "max_entries": 0, "hit_rate": 0.0}
+        info = self.render.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "evictions": info.misses - info.currsize,
+            "size": info.currsize,
+            "max_entries": self.max_entries,
+            "hit_rate": info.hits / lookups if lookups else 0.0
+        }
+    
+    def clear(self):
+        if self.max_entries:
+            self.render.cache_clear()
+
+
+def _call(render: Callable[..., str], args) -> str:
+    return render(args)
+
+
+# Process-wide cache shared by every FAQGenerationAgent
+ANSWER_CACHE = AnswerCache.from_env()
@@ -1,18 +1,32 @@
 """
 Content Assembly Agent - Assembles content pages using templates and blocks
 """
-from typing import Dict
+from typing import Callable, Dict, List, Sequence
 from models.product import Product
 from templates.template_engine import TemplateEngine
 import blocks.content_blocks as blocks
+from blocks.block_cache import BlockCache
 
 
 class ContentAssemblyAgent:
     """Agent responsible for assembling content pages"""
     
-    def __init__(self):
+    def __init__(self, block_cache: BlockCache = None):
         self.name = "ContentAssemblyAgent"
         self.template_engine = TemplateEngine()
+        
+        # Persistent block cache: explicit, else CONTENT_BLOCK_CACHE=<sqlite path>
+        self.block_cache = block_cache if block_cache is not None else BlockCache.from_env()
+    
+    def _blocks(self, products: Sequence[Product], *functions: Callable) -> List[Dict]:
+        """Run block functions on the products, through the block cache when enabled"""
+        if self.block_cache is None:
+            return [function(*products) for function in functions]
+        return self.block_cache.compute([(function, products) for function in functions])
+    
+    def compute_blocks(self, products: Sequence[Product], names: Sequence[str]) -> Dict[str, Dict]:
+        """Run the named content blocks (see BLOCK_FIELDS) on the products"""
+        return dict(zip(names, self._blocks(products, *(getattr(blocks, name) for name in names))))
     
     def assemble_faq_page(self, product: Product, questions: list, answers: list) -> Dict:
         """
@@ -44,12 +58,15 @@ class ContentAssemblyAgent:
             Structured product page data
         """
         # Generate content blocks
-        overview = blocks.generate_overview_block(product)
-        benefits = blocks.generate_benefits_block(product)
-        ingredients = blocks.generate_ingredients_block(product)
-        usage = blocks.extract_usage_block(product)
-        safety = blocks.extract_safety_block(product)
-        pricing = blocks.generate_price_block(product)
+        overview, benefits, ingredients, usage, safety, pricing = self._blocks(
+            (product,),
+            blocks.generate_overview_block,
+            blocks.generate_benefits_block,
+            blocks.generate_ingredients_block,
+            blocks.extract_usage_block,
+            blocks.extract_safety_block,
+            blocks.generate_price_block
+        )
         
         # Render template with blocks
         return self.template_engine.render_template(
@@ -75,9 +92,12 @@ class ContentAssemblyAgent:
             Structured comparison page data
         """
         # Generate comparison blocks
-        ingredients_comp = blocks.compare_ingredients_block(product_a, product_b)
-        benefits_comp = blocks.compare_benefits_block(product_a, product_b)
-        price_comp = blocks.compare_price_block(product_a, product_b)
+        ingredients_comp, benefits_comp, price_comp = self._blocks(
+            (product_a, product_b),
+            blocks.compare_ingredients_block,
+            blocks.compare_benefits_block,
+            blocks.compare_price_block
+        )
         
         # Render template with comparison blocks
         return self.template_engine.render_template(
@@ -1,16 +1,204 @@
 """
 FAQ Generation Agent - Generates FAQ content from questions
 """
+import operator
 from typing import List, Dict
 from models.product import Product
 import blocks.content_blocks as blocks
+from .answer_backends import HTTPAnswerBackend
+from .answer_cache import ANSWER_CACHE
+
+
+def _safety(side_effects) -> str:
+    safety = "Yes, it is safe for daily use. " 
+    if side_effects:
+        safety += f"However, note: {side_effects}"
+    return safety
+
+
+def _precautions(side_effects, how_to_use) -> str:
+    if side_effects:
+        return f"Be aware: {side_effects}. Follow the usage instructions carefully."
+    return "Follow the usage instructions: " + how_to_use
+
+
+# Answer intents: name -> (product fields read, renderer taking those fields).
+# The field values key the answer cache, so renderers may only use their arguments.
+ANSWER_INTENTS = {
+    "what_is": (
+        ("product_name", "concentration", "suitable_for", "key_ingredients"),
+        lambda name, concentration, suitable_for, ingredients: f"{name} is a product with {concentration}, {suitable_for}. It contains {', '.join(ingredients)}."
+    ),
+    "key_features": (
+        ("concentration", "key_ingredients", "benefits"),
+        lambda concentration, ingredients, benefits: f"Key features include {concentration}, {', '.join(ingredients)}, and benefits such as {', '.join(benefits)}."
+    ),
+    "effectiveness": (
+        ("concentration", "key_ingredients"),
+        lambda concentration, ingredients: f"The effectiveness comes from its {concentration} and key components like {', '.join(ingredients)}."
+    ),
+    "side_effects": (
+        ("side_effects",),
+        lambda side_effects: side_effects if side_effects else "No known side effects when used as directed."
+    ),
+    "daily_safety": (("side_effects",), _safety),
+    "precautions": (("side_effects", "how_to_use"), _precautions),
+    "how_to_use": (("how_to_use",), lambda how_to_use: how_to_use),
+    "when_to_use": (("how_to_use",), lambda how_to_use: f"Use according to instructions: {how_to_use}"),
+    "how_often": (("how_to_use",), lambda how_to_use: f"Follow the recommended usage: {how_to_use}"),
+    "best_results": (
+        ("how_to_use",),
+        lambda how_to_use: f"For optimal results, {how_to_use}. Consistent use is recommended."
+    ),
+    "price": (("product_name", "price"), lambda name, price: f"{name} is priced at {price}."),
+    "where_to_buy": (
+        ("product_name", "price"),
+        lambda name, price: f"You can purchase {name} at the listed price of {price}."
+    ),
+    "value": (
+        ("product_name", "benefits", "price"),
+        lambda name, benefits, price: f"Yes, {name} offers {', '.join(benefits)} at {price}, providing excellent value."
+    ),
+    "comparison": (
+        ("product_name", "concentration", "key_ingredients"),
+        lambda name, concentration, ingredients: f"{name} stands out with its {concentration} and unique combination of {', '.join(ingredients)}."
+    ),
+    "technical": (
+        ("product_name", "concentration"),
+        lambda name, concentration: f"The {concentration} refers to the key specification of {name}."
+    ),
+    "default": (
+        ("product_name", "concentration", "suitable_for", "benefits"),
+        lambda name, concentration, suitable_for, benefits: f"For {name}: {concentration}, {suitable_for}. Benefits include {', '.join(benefits)}."
+    )
+}
+
+
+def _compile(fields, render):
+    """(argument getter, renderer taking the getter's result) for one intent"""
+    getter = operator.itemgetter(*fields)
+    if len(fields) == 1:
+        return getter, render
+    return getter, lambda args: render(*args)
+
+
+# Intent -> (getter, render) used on the hot path; itemgetter builds the
+# cache key in C so a cache hit costs less than formatting the answer
+_COMPILED_INTENTS = {intent: _compile(fields, render) for intent, (fields, render) in ANSWER_INTENTS.items()}
+
+
+class _Items(tuple):
+    """Hashable stand-in for a list field that still formats like the list"""
+    
+    __slots__ = ()
+    
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def field_values(product: Product) -> Dict:
+    """Product fields as hashable values (lists become tuples) for cache keys"""
+    return {field: _Items(value) if isinstance(value, list) else value
+            for field, value in vars(product).items()}
+
+
+def _cacheable(value) -> bool:
+    """
+    Whether a field value may key the answer cache
+    
+    Equal keys must render the same text, which 10, 10.0 and True do not
+    (and nested lists or dicts are unhashable), so only str, None and
+    lists of str qualify.
+    """
+    if value is None or value.__class__ is str:
+        return True
+    return value.__class__ is _Items and all(item.__class__ is str for item in value)
+
+
+def _render(render, args) -> str:
+    return render(args)
+
+
+def classify_intent(product: Product, category: str, question: str) -> str:
+    """Map a question to the ANSWER_INTENTS entry that answers it (first matching rule wins)"""
+    
+    question_lower = question.lower()
+    
+    # What is the product
+    if "what is" in question_lower and product.product_name.lower() in question_lower:
+        return "what_is"
+    
+    # Key features
+    if "key features" in question_lower or "features" in question_lower:
+        return "key_features"
+    
+    # What makes it effective
+    if "effective" in question_lower or "makes" in question_lower:
+        return "effectiveness"
+    
+    # Side effects
+    if "side effect" in question_lower:
+        return "side_effects"
+    
+    # Safety for daily use
+    if "safe" in question_lower and "daily" in question_lower:
+        return "daily_safety"
+    
+    # Precautions
+    if "precaution" in question_lower:
+        return "precautions"
+    
+    # How to use
+    if "how" in question_lower and "use" in question_lower:
+        return "how_to_use"
+    
+    # When to use
+    if "when" in question_lower:
+        return "when_to_use"
+    
+    # How often
+    if "how often" in question_lower:
+        return "how_often"
+    
+    # Best way to get results
+    if "best way" in question_lower or "results" in question_lower:
+        return "best_results"
+    
+    # Price/cost
+    if "cost" in question_lower or "price" in question_lower or "much" in question_lower:
+        return "price"
+    
+    # Where to buy
+    if "where" in question_lower and "buy" in question_lower:
+        return "where_to_buy"
+    
+    # Worth the price
+    if "worth" in question_lower:
+        return "value"
+    
+    # Comparison
+    if "compare" in question_lower or "different" in question_lower:
+        return "comparison"
+    
+    # Technical spec
+    if category == "Technical":
+        return "technical"
+    
+    # Default answer
+    return "default"
 
 
 class FAQGenerationAgent:
     """Agent responsible for generating FAQ answers"""
     
-    def __init__(self):
+    def __init__(self, backend=None, cache=None):
         self.name = "FAQGenerationAgent"
+        
+        # Rule-based answers are memoized in the process-wide cache by default
+        self.cache = cache if cache is not None else ANSWER_CACHE
+        
+        # Optional model-backed answers: explicit backend, else ANSWER_BACKEND_URL
+        self.backend = backend if backend is not None else HTTPAnswerBackend.from_env()
     
     def generate_answers(self, product: Product, questions: List[Dict]) -> List[str]:
         """
@@ -23,90 +211,39 @@ class FAQGenerationAgent:
         Returns:
             List of answer strings
         """
+        if self.backend is not None:
+            generated = self.backend.answer(product, questions)
+            return [
+                answer if answer is not None
+                else self._generate_answer(product, q.get("category", ""), q.get("question", ""))
+                for q, answer in zip(questions, generated)
+            ]
+        
         answers = []
+        values, render_cached = self._renderer(product)
         
         for q in questions:
             category = q.get("category", "")
             question = q.get("question", "")
             
             # Generate answer based on category and question content
-            answer = self._generate_answer(product, category, question)
-            answers.append(answer)
+            getter, render = _COMPILED_INTENTS[classify_intent(product, category, question)]
+            answers.append(render_cached(render, getter(values)))
         
         return answers
     
     def _generate_answer(self, product: Product, category: str, question: str) -> str:
         """Generate specific answer based on category and question"""
-        
-        question_lower = question.lower()
-        
-        # What is the product
-        if "what is" in question_lower and product.product_name.lower() in question_lower:
-            return f"{product.product_name} is a product with {product.concentration}, {product.suitable_for}. It contains {', '.join(product.key_ingredients)}."
-        
-        # Key features
-        if "key features" in question_lower or "features" in question_lower:
-            return f"Key features include {product.concentration}, {', '.join(product.key_ingredients)}, and benefits such as {', '.join(product.benefits)}."
-        
-        # What makes it effective
-        if "effective" in question_lower or "makes" in question_lower:
-            return f"The effectiveness comes from its {product.concentration} and key components like {', '.join(product.key_ingredients)}."
-        
-        # Side effects
-        if "side effect" in question_lower:
-            return product.side_effects if product.side_effects else "No known side effects when used as directed."
-        
-        # Safety for daily use
-        if "safe" in question_lower and "daily" in question_lower:
-            safety = "Yes, it is safe for daily use. " 
-            if product.side_effects:
-                safety += f"However, note: {product.side_effects}"
-            return safety
-        
-        # Precautions
-        if "precaution" in question_lower:
-            if product.side_effects:
-                return f"Be aware: {product.side_effects}. Follow the usage instructions carefully."
-            return "Follow the usage instructions: " + product.how_to_use
-        
-        # How to use
-        if "how" in question_lower and "use" in question_lower:
-            return product.how_to_use
-        
-        # When to use
-        if "when" in question_lower:
-            return f"Use according to instructions: {product.how_to_use}"
-        
-        # How often
-        if "how often" in question_lower:
-            return f"Follow the recommended usage: {product.how_to_use}"
-        
-        # Best way to get results
-        if "best way" in question_lower or "results" in question_lower:
-            return f"For optimal results, {product.how_to_use}. Consistent use is recommended."
-        
-        # Price/cost
-        if "cost" in question_lower or "price" in question_lower or "much" in question_lower:
-            return f"{product.product_name} is priced at {product.price}."
-        
-        # Where to buy
-        if "where" in question_lower and "buy" in question_lower:
-            return f"You can purchase {product.product_name} at the listed price of {product.price}."
-        
-        # Worth the price
-        if "worth" in question_lower:
-            return f"Yes, {product.product_name} offers {', '.join(product.benefits)} at {product.price}, providing excellent value."
-        
-        # Comparison
-        if "compare" in question_lower or "different" in question_lower:
-            return f"{product.product_name} stands out with its {product.concentration} and unique combination of {', '.join(product.key_ingredients)}."
-        
-        # Technical spec
-        if category == "Technical":
-            return f"The {product.concentration} refers to the key specification of {product.product_name}."
-        
-        # Default answer
-        return f"For {product.product_name}: {product.concentration}, {product.suitable_for}. Benefits include {', '.join(product.benefits)}."
+        getter, render = _COMPILED_INTENTS[classify_intent(product, category, question)]
+        values, render_cached = self._renderer(product)
+        return render_cached(render, getter(values))
+    
+    def _renderer(self, product: Product):
+        """Field values and render function for a product (uncached if a value cannot key the cache)"""
+        values = field_values(product)
+        if all(map(_cacheable, values.values())):
+            return values, self.cache.render
+        return vars(product), _render
     
     def get_output(self) -> Dict:
         """Return agent metadata"""
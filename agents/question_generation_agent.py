@@ -5,6 +5,42 @@ from typing import List, Dict
 from models.product import Product
 
 
+# (category, question template) pairs, built once at import time.
+# Templates may use {name} and {concentration}.
+QUESTION_TEMPLATES = (
+    # Informational questions
+    ("Informational", "What is {name}?"),
+    ("Informational", "What are the key features of {name}?"),
+    ("Informational", "What makes {name} effective?"),
+    
+    # Safety questions
+    ("Safety", "Are there any side effects of using {name}?"),
+    ("Safety", "Is {name} safe for daily use?"),
+    ("Safety", "What precautions should I take when using {name}?"),
+    
+    # Usage questions
+    ("Usage", "How do I use {name}?"),
+    ("Usage", "When should I use {name}?"),
+    ("Usage", "How often should I use {name}?"),
+    ("Usage", "What is the best way to get results from {name}?"),
+    
+    # Purchase questions
+    ("Purchase", "How much does {name} cost?"),
+    ("Purchase", "Where can I buy {name}?"),
+    ("Purchase", "Is {name} worth the price?"),
+    
+    # Comparison questions
+    ("Comparison", "How does {name} compare to other similar products?"),
+    ("Comparison", "What makes {name} different from competitors?"),
+    
+    # Technical questions
+    ("Technical", "What is the {concentration}?"),
+)
+
+# Product fields the question texts read (the {name} and {concentration} placeholders)
+QUESTION_FIELDS = ("product_name", "concentration")
+
+
 class QuestionGenerationAgent:
     """Agent responsible for generating categorized user questions"""
     
@@ -29,95 +65,12 @@ class QuestionGenerationAgent:
         Returns:
             List of dictionaries with 'category' and 'question' keys
         """
-        questions = []
-        
-        # Informational questions
-        questions.extend([
-            {
-                "category": "Informational",
-                "question": f"What is {product.product_name}?"
-            },
-            {
-                "category": "Informational",
-                "question": f"What are the key features of {product.product_name}?"
-            },
-            {
-                "category": "Informational",
-                "question": f"What makes {product.product_name} effective?"
-            }
-        ])
-        
-        # Safety questions
-        questions.extend([
-            {
-                "category": "Safety",
-                "question": f"Are there any side effects of using {product.product_name}?"
-            },
-            {
-                "category": "Safety",
-                "question": f"Is {product.product_name} safe for daily use?"
-            },
-            {
-                "category": "Safety",
-                "question": f"What precautions should I take when using {product.product_name}?"
-            }
-        ])
-        
-        # Usage questions
-        questions.extend([
-            {
-                "category": "Usage",
-                "question": f"How do I use {product.product_name}?"
-            },
-            {
-                "category": "Usage",
-                "question": f"When should I use {product.product_name}?"
-            },
-            {
-                "category": "Usage",
-                "question": f"How often should I use {product.product_name}?"
-            },
-            {
-                "category": "Usage",
-                "question": f"What is the best way to get results from {product.product_name}?"
-            }
-        ])
-        
-        # Purchase questions
-        questions.extend([
-            {
-                "category": "Purchase",
-                "question": f"How much does {product.product_name} cost?"
-            },
-            {
-                "category": "Purchase",
-                "question": f"Where can I buy {product.product_name}?"
-            },
-            {
-                "category": "Purchase",
-                "question": f"Is {product.product_name} worth the price?"
-            }
-        ])
-        
-        # Comparison questions
-        questions.extend([
-            {
-                "category": "Comparison",
-                "question": f"How does {product.product_name} compare to other similar products?"
-            },
-            {
-                "category": "Comparison",
-                "question": f"What makes {product.product_name} different from competitors?"
-            }
-        ])
-        
-        # Technical questions
-        questions.append({
-            "category": "Technical",
-            "question": f"What is the {product.concentration}?"
-        })
-        
-        return questions
+        name = product.product_name
+        concentration = product.concentration
+        return [
+            {"category": category, "question": template.format(name=name, concentration=concentration)}
+            for category, template in QUESTION_TEMPLATES
+        ]
     
     def get_output(self) -> Dict:
         """Return agent metadata"""
@@ -4,104 +4,492 @@ Vercel serverless function for content generation
 import json
 import sys
 import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
 
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Add parent directory to path for imports (already there when run locally)
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
 
-from orchestrator import WorkflowOrchestrator
+# Only lightweight modules are imported here. The agent pipeline and the
+# job queue are loaded on first use, so a cold start can answer GET,
+# OPTIONS and /metrics without importing them.
+from orchestrator.pages import PAGE_TYPES, parse_pages
+from server import parse_fields, project, encode_body, negotiate_encoding, StreamEncoder
+from server import metrics, serialization, RequestTimer, DebugProbe, AdmissionController
+from server.static_files import StaticFiles, sendfile
 from http.server import BaseHTTPRequestHandler
 
 
+def _collect_answer_cache():
+    # Report FAQ answer-cache totals once the agents are loaded (/metrics
+    # itself must not import them)
+    module = sys.modules.get('agents.answer_cache')
+    if module is not None:
+        stats = module.ANSWER_CACHE.stats()
+        metrics.record_cache_stats(module.ANSWER_CACHE.name, stats['hits'], stats['misses'])
+
+
+metrics.REGISTRY.add_collector(_collect_answer_cache)
+
+
+def _query_params(path: str) -> dict:
+    """Return the first value of each query string parameter in a request path"""
+    query = parse_qs(urlsplit(path).query)
+    return {key: values[0] for key, values in query.items() if values}
+
+
+def _flag(value) -> bool:
+    """Interpret a boolean request option given as JSON bool or query string"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
 class handler(BaseHTTPRequestHandler):
     """Vercel serverless handler for content generation API"""
     
+    # Shared by all requests served by this process
+    admission = AdmissionController.from_env()
+    # Reverse proxies in front of this server; X-Forwarded-For is ignored without them
+    trusted_proxies = max(0, int(os.environ.get('GENERATE_TRUSTED_PROXIES', '0')))
+    static_files = StaticFiles(os.path.join(_ROOT, 'public'))
+    
+    # Job store and in-process workers, created on first use
+    job_store = None
+    job_workers = None
+    _jobs_lock = threading.Lock()
+    
+    # Page version store (PAGE_VERSION_STORE), opened on first use
+    version_store = None
+    _versions_lock = threading.Lock()
+    
+    @classmethod
+    def _jobs(cls):
+        """Open the job store and start GENERATE_JOB_WORKERS worker threads (0 = external workers only)"""
+        from server.jobs import JobStore, JobWorkerPool
+        
+        with cls._jobs_lock:
+            if cls.job_store is None:
+                cls.job_store = JobStore()
+            if cls.job_workers is None:
+                workers = int(os.environ.get('GENERATE_JOB_WORKERS', '2'))
+                cls.job_workers = JobWorkerPool(cls.job_store, workers=workers)
+                cls.job_workers.start()
+        return cls.job_store
+    
+    def send_response(self, code, message=None):
+        """Send the status line, remembering the code for request metrics"""
+        self._status = code
+        super().send_response(code, message)
+
+    def _write_body(self, body: bytes, encoding: str = None):
+        """Write a response body and count the bytes served"""
+        self.wfile.write(body)
+        metrics.BYTES_SERVED.inc(len(body), encoding=encoding or 'identity')
+
     def do_GET(self):
-        """Serve a simple frontend for local testing or respond to favicon requests"""
-        # Serve the public/index.html on root requests to make local testing easier
-        if self.path in ('/', '/index.html'):
-            try:
-                index_path = os.path.join(os.path.dirname(__file__), '..', 'public', 'index.html')
-                with open(index_path, 'rb') as f:
-                    content = f.read()
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html; charset=utf-8')
+        """Serve the frontend, metrics, or respond to favicon requests"""
+        try:
+            self._handle_get()
+        finally:
+            metrics.REQUESTS.inc(method='GET', status=getattr(self, '_status', 0))
+
+    def _handle_get(self):
+        path = urlsplit(self.path).path
+        if path == '/metrics':
+            content = metrics.REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self._write_body(content)
+        elif path.startswith('/api/jobs/'):
+            self._handle_job_get(path)
+        elif path == '/api/changes':
+            self._handle_changes()
+        else:
+            # Serve files from public/ (index.html on root requests) to make local testing easier
+            file_path = self.static_files.resolve(path)
+            if file_path is not None:
+                self._serve_static(file_path)
+            elif path == '/favicon.ico':
+                self.send_response(204)
                 self.end_headers()
-                self.wfile.write(content)
-            except Exception:
-                self.send_response(500)
+            else:
+                # For other GET paths, return 404
+                self.send_response(404)
                 self.end_headers()
-        elif self.path == '/favicon.ico':
-            self.send_response(204)
+
+    def _serve_static(self, file_path: str):
+        """Serve a public/ file from the memory cache, answering conditional GETs with 304"""
+        try:
+            entry = self.static_files.lookup(file_path)
+        except OSError:
+            self.send_response(500)
             self.end_headers()
-        else:
-            # For other GET paths, return 404
-            self.send_response(404)
+            return
+        
+        cache_headers = self.static_files.headers(entry)
+        if self.static_files.is_not_modified(entry, self.headers.get('If-None-Match'),
+                                             self.headers.get('If-Modified-Since')):
+            self.send_response(304)
+            for name, value in cache_headers.items():
+                self.send_header(name, value)
             self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-type', entry.content_type)
+        for name, value in cache_headers.items():
+            self.send_header(name, value)
+        if entry.body is None:
+            # Too large to keep in memory: zero-copy from the file
+            self.send_header('Content-Length', str(entry.size))
+            self.end_headers()
+            sendfile(self.connection, self.wfile, entry.path, entry.size)
+            metrics.BYTES_SERVED.inc(entry.size, encoding='identity')
+            return
+        
+        body, encoding = self.static_files.encoded_body(entry, self.headers.get('Accept-Encoding'))
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self._write_body(body, encoding)
+
+    def _send_json(self, status: int, payload: dict, compact: bool = True, headers: dict = None):
+        """Serialize payload and write it as a JSON response"""
+        timer = getattr(self, '_timer', None) or RequestTimer()
+        with timer.stage('encode'):
+            if compact:
+                body = json.dumps(payload, separators=(',', ':'))
+            else:
+                body = json.dumps(payload, indent=2)
+            body = body.encode()
+        self._send_body(status, body, headers=headers)
+
+    def _send_body(self, status: int, body: bytes, content_type: str = 'application/json',
+                   headers: dict = None):
+        """Compress (if negotiated) and write an already-encoded response body"""
+        timer = getattr(self, '_timer', None) or RequestTimer()
+        with timer.stage('compress'):
+            body, encoding = encode_body(body, self.headers.get('Accept-Encoding'))
+        
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Server-Timing', timer.header())
+        self.send_header('Timing-Allow-Origin', '*')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self._write_body(body, encoding)
+
+    def _send_stream(self, status: int, render, content_type: str, headers: dict = None):
+        """
+        Write a response body while it is being rendered
+        
+        render(write) passes encoded fragments to write. They are sent in
+        pieces (compressed on the way if the client accepts gzip/deflate), as
+        a chunked body to HTTP/1.1 clients and until the connection closes
+        to HTTP/1.0 clients. Server-Timing covers the stages before the body.
+        """
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            # Chunked transfer coding needs an HTTP/1.1 status line
+            self.protocol_version = 'HTTP/1.1'
+        
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Server-Timing', self._timer.header())
+        self.send_header('Timing-Allow-Origin', '*')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        if chunked:
+            send = lambda data: self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        else:
+            send = self.wfile.write
+        stream = StreamEncoder(send, encoding)
+        try:
+            with self._timer.stage('encode'):
+                render(stream.write)
+                stream.close()
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except Exception as e:
+            # The status line is gone; a truncated body tells the client
+            self.log_error('Streaming response failed: %s', e)
+        finally:
+            metrics.BYTES_SERVED.inc(stream.bytes_sent, encoding=encoding or 'identity')
+
+    def _client_id(self) -> str:
+        """
+        Identify the client for rate limiting
+        
+        X-Forwarded-For is set by the client, so it is only read behind
+        GENERATE_TRUSTED_PROXIES proxies. Each of them appends the address it
+        saw, so the client is the entry the outermost trusted proxy added.
+        """
+        if self.trusted_proxies:
+            hops = [hop.strip() for value in self.headers.get_all('X-Forwarded-For', [])
+                    for hop in value.split(',') if hop.strip()]
+            if len(hops) >= self.trusted_proxies:
+                return hops[-self.trusted_proxies]
+        return self.client_address[0]
 
     def do_POST(self):
         """Handle POST request with product data"""
+        start = time.perf_counter()
+        self._timer = RequestTimer()
+        with self._timer.stage('queue'):
+            rejection = self.admission.admit(self._client_id())
+        if rejection:
+            # Shed fast: do not read the body or touch the pipeline
+            metrics.SHED.inc(reason=rejection.reason)
+            message = 'Rate limit exceeded' if rejection.status == 429 else 'Server overloaded'
+            self._send_json(rejection.status, {'error': message, 'reason': rejection.reason},
+                            headers={'Retry-After': str(rejection.retry_after)})
+            metrics.REQUESTS.inc(method='POST', status=rejection.status)
+            return
+        
+        metrics.IN_FLIGHT.inc()
+        try:
+            if urlsplit(self.path).path.rstrip('/') == '/api/jobs':
+                self._handle_job_submit()
+            else:
+                self._handle_generate()
+        finally:
+            self.admission.release()
+            metrics.IN_FLIGHT.dec()
+            metrics.REQUEST_LATENCY.observe(time.perf_counter() - start)
+            metrics.REQUESTS.inc(method='POST', status=getattr(self, '_status', 0))
+
+    def _handle_generate(self):
         try:
             # Parse request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode('utf-8'))
+            with self._timer.stage('read'):
+                content_length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(content_length)
+                data = json.loads(body.decode('utf-8'))
             
             # Extract product data
             product_a_data = data.get('product_a')
             product_b_data = data.get('product_b')
+            params = _query_params(self.path)
             
             if not product_a_data:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                error = {'error': 'product_a is required'}
-                self.wfile.write(json.dumps(error).encode())
+                self._send_json(400, {'error': 'product_a is required'})
+                return
+            
+            # Request options: body values win over query parameters
+            compact = _flag(data.get('compact', params.get('compact', True)))
+            debug = _flag(data.get('debug', params.get('debug')))
+            output_format = data.get('format', params.get('format', 'json'))
+            renderer = None
+            try:
+                fields = parse_fields(data.get('fields', params.get('fields')))
+                if output_format != 'json':
+                    from templates.streaming import get_renderer
+                    renderer = get_renderer(output_format)
+                    if fields is not None:
+                        raise ValueError("fields can only be used with format 'json'")
+                pages = data.get('pages', params.get('pages'))
+                if pages is None and fields is not None:
+                    # Only build the pages the projection can reach
+                    pages = [page for page in fields if page in PAGE_TYPES]
+                pages = parse_pages(pages)
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
                 return
             
-            # Initialize orchestrator
-            orchestrator = WorkflowOrchestrator()
+            probe = DebugProbe() if debug else None
+            if probe:
+                probe.start()
+            
+            # Initialize orchestrator, profiling a sampled fraction of requests
+            from orchestrator import WorkflowOrchestrator
+            from orchestrator.profiling import PipelineProfiler, sample_rate
+            rate = sample_rate()
+            profiler = PipelineProfiler(label='api') if rate and random.random() < rate else None
+            orchestrator = WorkflowOrchestrator(profiler=profiler)
             
             # Execute pipeline
             results = orchestrator.execute_pipeline_from_data(
                 product_a_data=product_a_data,
-                product_b_data=product_b_data
+                product_b_data=product_b_data,
+                pages=pages
             )
+            results['outputs'].materialize()
+            self._timer.update(results['timings'])
+            for stage, seconds in results['timings'].items():
+                metrics.STAGE_LATENCY.observe(seconds, stage=stage)
             
             # Return generated content
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            if fields is None:
+                outputs = results['outputs']
+                agents_executed = results['agents_executed']
+            else:
+                outputs = project(results['outputs'], fields)
+                agents_executed = None
+            
+            debug_info = None
+            if probe:
+                debug_info = probe.stop()
+                debug_info['stages_ms'] = {
+                    stage: round(seconds * 1000, 3)
+                    for stage, seconds in self._timer.stages.items()
+                }
             
-            response = {
-                'success': True,
-                'outputs': results['outputs'],
-                'agents_executed': results['agents_executed']
-            }
+            headers = {}
+            if 'profile' in results:
+                headers['X-Profile-Id'] = os.path.basename(results['profile']['pstats'])[:-len('.pstats')]
             
-            self.wfile.write(json.dumps(response, indent=2).encode())
+            if renderer is not None:
+                # Pages are written to the client as they are rendered
+                self._send_stream(200, lambda write: renderer.render_pages(outputs, write),
+                                  renderer.content_type, headers=headers)
+            elif compact:
+                with self._timer.stage('encode'):
+                    body = serialization.encode_response(
+                        outputs, agents_executed=agents_executed, debug=debug_info
+                    )
+                self._send_body(200, body, content_type='application/json; charset=utf-8', headers=headers)
+            else:
+                response = {'success': True, 'outputs': outputs}
+                if agents_executed is not None:
+                    response['agents_executed'] = agents_executed
+                if debug_info is not None:
+                    response['debug'] = debug_info
+                self._send_json(200, response, compact=False, headers=headers)
             
         except json.JSONDecodeError:
-            self.send_response(400)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            error = {'error': 'Invalid JSON'}
-            self.wfile.write(json.dumps(error).encode())
+            self._send_json(400, {'error': 'Invalid JSON'})
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            error = {'error': str(e)}
-            self.wfile.write(json.dumps(error).encode())
+            self._send_json(500, {'error': str(e)})
+    
+    def _read_json(self) -> dict:
+        """Read and decode the JSON request body"""
+        content_length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(content_length).decode('utf-8'))
+
+    def _handle_job_submit(self):
+        """Queue a catalog as an asynchronous job: POST /api/jobs"""
+        try:
+            data = self._read_json()
+            parse_pages(data.get('pages'))
+            job_id = self._jobs().submit(
+                data.get('products'),
+                product_b=data.get('product_b'),
+                pages=data.get('pages')
+            )
+        except json.JSONDecodeError:
+            self._send_json(400, {'error': 'Invalid JSON'})
+            return
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        
+        self._send_json(202, {
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+            'results_url': f'/api/jobs/{job_id}/results'
+        }, headers={'Location': f'/api/jobs/{job_id}'})
+
+    def _handle_job_get(self, path: str):
+        """Job status (GET /api/jobs/<id>) or results (GET /api/jobs/<id>/results)"""
+        parts = path.strip('/').split('/')
+        store = self._jobs()
+        job = store.get(parts[2]) if len(parts) in (3, 4) else None
+        if job is None or (len(parts) == 4 and parts[3] != 'results'):
+            self._send_json(404, {'error': 'Job not found'})
+            return
+        
+        if len(parts) == 3:
+            self._send_json(200, job)
+            return
+        
+        params = _query_params(self.path)
+        try:
+            offset = int(params.get('offset', 0))
+            limit = max(1, min(int(params.get('limit', 100)), 1000))
+        except ValueError:
+            self._send_json(400, {'error': 'offset and limit must be integers'})
+            return
+        if offset < 0:
+            self._send_json(400, {'error': 'offset must not be negative'})
+            return
+        self._send_json(200, {
+            'job_id': job['id'],
+            'status': job['status'],
+            'offset': offset,
+            'results': store.results(job['id'], offset=offset, limit=limit)
+        })
+
+    @classmethod
+    def _versions(cls):
+        """Page version store at PAGE_VERSION_STORE, opened on first use (None when unset)"""
+        with cls._versions_lock:
+            if cls.version_store is None:
+                from orchestrator.page_versions import PageVersionStore
+                cls.version_store = PageVersionStore.from_env()
+        return cls.version_store
+
+    def _handle_changes(self):
+        """Page changes after a version: GET /api/changes?since=<version>[&key=<sku>][&limit=<n>]"""
+        store = self._versions()
+        if store is None:
+            self._send_json(404, {'error': 'Page versions are not enabled (set PAGE_VERSION_STORE)'})
+            return
+        params = _query_params(self.path)
+        try:
+            since = int(params.get('since', 0))
+            limit = min(int(params.get('limit', 1000)), 10000)
+        except ValueError:
+            self._send_json(400, {'error': 'since and limit must be integers'})
+            return
+        self._send_json(200, store.changes(since, key=params.get('key'), limit=limit))
+
+    def do_DELETE(self):
+        """Cancel a job: DELETE /api/jobs/<id>"""
+        try:
+            parts = urlsplit(self.path).path.strip('/').split('/')
+            if len(parts) != 3 or parts[:2] != ['api', 'jobs']:
+                self._send_json(404, {'error': 'Not found'})
+                return
+            store = self._jobs()
+            if store.get(parts[2]) is None:
+                self._send_json(404, {'error': 'Job not found'})
+            elif store.cancel(parts[2]):
+                self._send_json(200, store.get(parts[2]))
+            else:
+                self._send_json(409, {'error': 'Job already finished'})
+        finally:
+            metrics.REQUESTS.inc(method='DELETE', status=getattr(self, '_status', 0))
     
     def do_OPTIONS(self):
         """Handle CORS preflight"""
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
@@ -0,0 +1,93 @@
+"""
+Answer backend benchmark - Throughput and tail latency of model-backed FAQs
+
+Runs FAQ answer generation for a synthetic catalog against the local stub
+server, from several caller threads (like concurrent API requests), and
+reports products/s, per-product latency percentiles and backend stats.
+
+Usage:
+    python -m benchmarks.bench_answer_backend --products 200 --latency 0.05 \\
+        --concurrency 16 --batch-size 4 --callers 8 [--error-rate 0.05]
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from agents.answer_backends import HTTPAnswerBackend
+from agents.faq_generation_agent import FAQGenerationAgent
+from agents.question_generation_agent import QuestionGenerationAgent
+from models.product import Product
+
+from .catalog import generate_catalog
+from .histogram import LatencyHistogram
+from .stub_generation_server import spawn_stub
+
+
+def run(products: int = 200, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0,
+        concurrency: int = 16, batch_size: int = 4, callers: int = 8,
+        timeout: float = 2.0, retries: int = 2) -> Dict:
+    server, url = spawn_stub(latency=latency, jitter=jitter, error_rate=error_rate)
+    backend = HTTPAnswerBackend(url, batch_size=batch_size, concurrency=concurrency,
+                                timeout=timeout, retries=retries, backoff=0.01)
+    agent = FAQGenerationAgent(backend=backend)
+    question_agent = QuestionGenerationAgent()
+    items = []
+    for data in generate_catalog(products):
+        product = Product.from_dict(data)
+        items.append((product, question_agent.generate_questions(product)))
+    
+    histogram = LatencyHistogram()
+    
+    def answer(item):
+        start = time.perf_counter_ns()
+        agent.generate_answers(*item)
+        return time.perf_counter_ns() - start
+    
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            for elapsed_ns in pool.map(answer, items):
+                histogram.record(elapsed_ns)
+        elapsed = time.perf_counter() - start
+    finally:
+        backend.close()
+        server.shutdown()
+        server.server_close()
+    
+    return {
+        "settings": {"products": products, "latency_s": latency, "jitter_s": jitter,
+                     "error_rate": error_rate, "concurrency": concurrency,
+                     "batch_size": batch_size, "callers": callers},
+        "products_per_sec": round(products / elapsed, 1),
+        "product_latency_ms": histogram.summary(scale=1e6),
+        "backend": dict(backend.stats),
+        "stub_requests": server.requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTTP answer backend against a stub")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--callers", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--retries", type=int, default=2)
+    args = parser.parse_args()
+    
+    report = run(args.products, args.latency, args.jitter, args.error_rate, args.concurrency,
+                 args.batch_size, args.callers, args.timeout, args.retries)
+    print(json.dumps(report, indent=2))
+    latency = report["product_latency_ms"]
+    print(f"{report['products_per_sec']} products/s, p50 {latency['p50']} ms, "
+          f"p99 {latency['p99']} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
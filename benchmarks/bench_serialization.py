@@ -0,0 +1,86 @@
+"""
+Serialization benchmark - Encoding throughput per page type
+
+Compares the previous response path (json.dumps(indent=2).encode()) with
+the compact single-pass encoder in server/serialization.py.
+
+Usage:
+    python -m benchmarks.bench_serialization [--iterations 5000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from orchestrator import WorkflowOrchestrator
+from server import serialization
+
+PRODUCT_B = {
+    "product_name": "RadiantGlow Vitamin C Essence",
+    "concentration": "15% Vitamin C",
+    "suitable_for": "All skin types",
+    "key_ingredients": ["Vitamin C", "Ferulic Acid", "Vitamin E"],
+    "benefits": ["Brightening", "Anti-aging", "Antioxidant protection"],
+    "how_to_use": "Apply 3-4 drops in the evening after cleansing",
+    "side_effects": "May cause redness for very sensitive skin",
+    "price": "₹899"
+}
+
+
+def _time(encode: Callable[[], bytes], iterations: int) -> Dict:
+    size = len(encode())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode()
+    elapsed = time.perf_counter() - start
+    return {
+        "bytes": size,
+        "pages_per_sec": round(iterations / elapsed, 1),
+        "mb_per_sec": round(size * iterations / elapsed / 1e6, 2)
+    }
+
+
+def run(iterations: int = 5000) -> Dict:
+    """Benchmark both encoders on each page type and a full response"""
+    with open(os.path.join(ROOT, 'input_data.json'), 'r', encoding='utf-8') as f:
+        product_a = json.load(f)
+    results = WorkflowOrchestrator().execute_pipeline_from_data(product_a, PRODUCT_B)
+    # Build the lazy pages up front so only encoding is timed
+    outputs = results["outputs"].materialize()
+    
+    report = {}
+    for name, page in outputs.items():
+        report[name] = {
+            "indented": _time(lambda: json.dumps(page, indent=2).encode(), iterations),
+            "compact": _time(lambda: serialization.encode_page(page), iterations)
+        }
+    response = {"success": True, "outputs": outputs, "agents_executed": results["agents_executed"]}
+    report["response"] = {
+        "indented": _time(lambda: json.dumps(response, indent=2).encode(), iterations),
+        "compact": _time(lambda: serialization.encode_response(
+            outputs, agents_executed=results["agents_executed"]), iterations)
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response encoding")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    
+    report = run(args.iterations)
+    print(json.dumps(report, indent=2))
+    for name, row in report.items():
+        speedup = row["compact"]["pages_per_sec"] / row["indented"]["pages_per_sec"]
+        print(f"{name:>10}: {speedup:.1f}x faster, "
+              f"{row['indented']['bytes']} -> {row['compact']['bytes']} bytes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
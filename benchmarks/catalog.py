@@ -0,0 +1,146 @@
+"""
+Synthetic catalog - Deterministic product data for benchmarks and load tests
+
+Usage:
+    python -m benchmarks.catalog --count 100000 --output catalog.ndjson [--seed 42]
+"""
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator
+
+BRANDS = [
+    "GlowBoost", "RadiantGlow", "PureLeaf", "DermaCalm", "SkinNova", "AquaVeil",
+    "LumiSkin", "VelvetDew", "ClearPath", "BotaniQ", "UrbanBloom", "SilkRoot"
+]
+ACTIVES = [
+    ("Vitamin C", "%"), ("Niacinamide", "%"), ("Retinol", "%"), ("Hyaluronic Acid", "%"),
+    ("Salicylic Acid", "%"), ("Glycolic Acid", "%"), ("Peptide Complex", "%"),
+    ("Ceramide", "%"), ("Azelaic Acid", "%"), ("Bakuchiol", "%"), ("SPF", "")
+]
+FORMS = ["Serum", "Essence", "Cream", "Gel", "Toner", "Lotion", "Oil", "Mask", "Sunscreen"]
+INGREDIENTS = [
+    "Vitamin C", "Vitamin E", "Ferulic Acid", "Hyaluronic Acid", "Niacinamide", "Retinol",
+    "Squalane", "Ceramide NP", "Panthenol", "Allantoin", "Centella Asiatica", "Green Tea Extract",
+    "Zinc PCA", "Salicylic Acid", "Glycolic Acid", "Lactic Acid", "Peptides", "Bakuchiol",
+    "Licorice Root", "Aloe Vera", "Glycerin", "Shea Butter", "Jojoba Oil", "Rosehip Oil",
+    "Tranexamic Acid", "Arbutin", "Azelaic Acid", "Caffeine", "Snail Mucin", "Beta-Glucan",
+    "Madecassoside", "Urea", "Colloidal Oatmeal", "Zinc Oxide", "Titanium Dioxide", "Adenosine"
+]
+BENEFITS = [
+    "Brightening", "Fades dark spots", "Hydrates skin", "Anti-aging", "Antioxidant protection",
+    "Reduces redness", "Controls oil", "Minimizes pores", "Smooths texture", "Firms skin",
+    "Soothes irritation", "Strengthens barrier", "Evens skin tone", "Unclogs pores",
+    "Reduces fine lines", "Sun protection", "Calms breakouts", "Restores radiance",
+    "Locks in moisture", "Gentle exfoliation"
+]
+SKIN_TYPES = ["Oily", "Dry", "Combination", "Normal", "Sensitive", "Acne-prone", "Mature"]
+USAGE = [
+    "Apply {n} drops to clean skin in the morning before sunscreen",
+    "Apply {n} drops in the evening after cleansing",
+    "Massage a pea-sized amount onto face and neck twice daily",
+    "Use {n} times a week on clean, dry skin and rinse after 10 minutes",
+    "Sweep over face with a cotton pad after cleansing",
+    "Apply generously 15 minutes before sun exposure and reapply every 2 hours"
+]
+SIDE_EFFECTS = [
+    "May cause mild tingling for very sensitive skin",
+    "May cause redness for very sensitive skin",
+    "Possible dryness during the first weeks of use",
+    "Increases sun sensitivity; use sunscreen daily",
+    "Patch test recommended before first use"
+]
+
+# Weighted counts: most products list 3-4 ingredients and 2-3 benefits,
+# with a long tail up to 10 ingredients and 6 benefits
+INGREDIENT_COUNT_WEIGHTS = [(1, 4), (2, 12), (3, 28), (4, 24), (5, 14), (6, 8), (7, 5), (8, 3), (10, 2)]
+BENEFIT_COUNT_WEIGHTS = [(1, 10), (2, 30), (3, 35), (4, 15), (5, 7), (6, 3)]
+
+
+def _weighted(rng: random.Random, weights) -> int:
+    values, counts = zip(*weights)
+    return rng.choices(values, weights=counts)[0]
+
+
+def generate_product(index: int, rng: random.Random) -> Dict:
+    """Build one synthetic product; `index` makes sku and name unique"""
+    brand = rng.choice(BRANDS)
+    active, unit = rng.choice(ACTIVES)
+    form = rng.choice(FORMS)
+    strength = rng.choice([1, 2, 5, 10, 12, 15, 20, 30, 50]) if unit else rng.choice([30, 50])
+    concentration = f"{strength}{unit} {active}" if unit else f"{active} {strength}"
+    
+    ingredients = rng.sample(INGREDIENTS, _weighted(rng, INGREDIENT_COUNT_WEIGHTS))
+    if active in INGREDIENTS and active not in ingredients:
+        ingredients[0] = active
+    
+    return {
+        "sku": f"SKU-{index:07d}",
+        "product_name": f"{brand} {active} {form} {index}",
+        "concentration": concentration,
+        "suitable_for": ", ".join(rng.sample(SKIN_TYPES, rng.randint(1, 3))),
+        "key_ingredients": ingredients,
+        "benefits": rng.sample(BENEFITS, _weighted(rng, BENEFIT_COUNT_WEIGHTS)),
+        "how_to_use": rng.choice(USAGE).format(n=rng.randint(2, 4)),
+        "side_effects": rng.choice(SIDE_EFFECTS) if rng.random() < 0.7 else None,
+        # Log-normal prices centred around ₹800
+        "price": f"₹{int(round(rng.lognormvariate(6.7, 0.5), -1))}"
+    }
+
+
+def generate_variant(index: int, base: Dict, rng: random.Random) -> Dict:
+    """A size variant of `base`: same formula and copy, new sku, name and price"""
+    size = rng.choice([15, 30, 50, 100])
+    variant = dict(base, key_ingredients=list(base["key_ingredients"]), benefits=list(base["benefits"]))
+    variant["sku"] = f"SKU-{index:07d}"
+    variant["product_name"] = f"{base['product_name']} {size}ml"
+    variant["price"] = f"₹{int(round(rng.lognormvariate(6.7, 0.5), -1))}"
+    return variant
+
+
+def generate_catalog(count: int, seed: int = 42, variant_rate: float = 0.3) -> Iterator[Dict]:
+    """
+    Yield `count` synthetic products, identical for the same seed
+    
+    About `variant_rate` of the products are size variants of a recent
+    product (as in real catalogs). Products are generated lazily, so
+    million-product catalogs can be streamed without holding them in memory.
+    """
+    rng = random.Random(seed)
+    recent = []
+    for index in range(count):
+        if recent and rng.random() < variant_rate:
+            yield generate_variant(index, rng.choice(recent), rng)
+            continue
+        product = generate_product(index, rng)
+        recent.append(product)
+        if len(recent) > 32:
+            recent.pop(0)
+        yield product
+
+
+def write_catalog(path: str, count: int, seed: int = 42) -> None:
+    """Write a synthetic catalog as NDJSON (one product per line)"""
+    with open(path, "w", encoding="utf-8") as f:
+        for product in generate_catalog(count, seed):
+            f.write(json.dumps(product, ensure_ascii=False))
+            f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic product catalog")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="NDJSON file (default: stdout)")
+    args = parser.parse_args()
+    
+    if args.output:
+        write_catalog(args.output, args.count, args.seed)
+    else:
+        for product in generate_catalog(args.count, args.seed):
+            sys.stdout.write(json.dumps(product, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Cold-start benchmark - Import cost and time to first response of the generate API
+
+Usage:
+    python -m benchmarks.cold_start [--runs 5] [--output cold_start.json]
+                                    [--max-first-response-ms 800]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _sample_request() -> bytes:
+    with open(os.path.join(ROOT, 'input_data.json'), 'r', encoding='utf-8') as f:
+        return json.dumps({"product_a": json.load(f)}).encode()
+
+
+def measure_import_time(module: str = "api.generate") -> Dict:
+    """
+    Import a module in a fresh interpreter under -X importtime
+    
+    Returns:
+        Dictionary with the module's cumulative import time and the
+        slowest imported modules (microseconds)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    
+    total = next((cumulative for name, _, cumulative in entries if name == module), 0)
+    slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:10]
+    return {
+        "module": module,
+        "cumulative_us": total,
+        "slowest_self_us": [{"module": name, "self_us": self_us} for name, self_us, _ in slowest]
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_first_response(timeout: float = 30.0) -> Dict:
+    """
+    Start run_local.py in a fresh process and time the first POST response
+    
+    Returns:
+        Dictionary with milliseconds until the port accepted connections
+        and until the first generate response was fully read
+    """
+    port = _free_port()
+    body = _sample_request()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "run_local.py", "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + timeout
+        while True:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+                conn.connect()
+                break
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError("Server did not start")
+                time.sleep(0.002)
+        listening = time.perf_counter()
+        
+        conn.request('POST', '/api/generate', body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        first_response = time.perf_counter()
+        conn.close()
+        if response.status != 200:
+            raise RuntimeError(f"First request failed with HTTP {response.status}")
+    finally:
+        proc.terminate()
+        proc.wait()
+    
+    return {
+        "listening_ms": (listening - start) * 1000,
+        "first_response_ms": (first_response - start) * 1000
+    }
+
+
+def run(runs: int = 5) -> Dict:
+    """Repeat both measurements and report medians"""
+    imports: List[Dict] = [measure_import_time() for _ in range(runs)]
+    starts: List[Dict] = [measure_first_response() for _ in range(runs)]
+    return {
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "import_ms": round(statistics.median(r["cumulative_us"] for r in imports) / 1000, 3),
+        "listening_ms": round(statistics.median(r["listening_ms"] for r in starts), 3),
+        "first_response_ms": round(statistics.median(r["first_response_ms"] for r in starts), 3),
+        "slowest_imports": imports[-1]["slowest_self_us"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure generate API cold-start latency")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--max-first-response-ms", type=float,
+                        help="Exit non-zero if median time to first response exceeds this")
+    args = parser.parse_args()
+    
+    report = run(args.runs)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    
+    if args.max_first_response_ms and report["first_response_ms"] > args.max_first_response_ms:
+        print(f"FAIL: first response {report['first_response_ms']:.1f} ms "
+              f"> {args.max_first_response_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Latency histogram - HdrHistogram-style log-linear buckets
+
+Values (integers, e.g. nanoseconds) are bucketed by their top
+`significant_bits` bits, so every recorded value is kept with a bounded
+relative error (under 1.6% with the default 7 bits) in constant memory,
+however many samples are recorded.
+"""
+from typing import Dict, Iterable
+
+
+class LatencyHistogram:
+    """Constant-memory histogram with percentile queries"""
+    
+    def __init__(self, significant_bits: int = 7):
+        self.significant_bits = significant_bits
+        self._half = 1 << (significant_bits - 1)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+    
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.significant_bits
+        if shift <= 0:
+            return value
+        return shift * self._half + (value >> shift)
+    
+    def _upper_bound(self, index: int) -> int:
+        """Largest value that falls into a bucket"""
+        if index < (self._half << 1):
+            return index
+        shift = index // self._half - 1
+        mantissa = index - shift * self._half
+        return ((mantissa + 1) << shift) - 1
+    
+    def record(self, value: int, count: int = 1):
+        """Record a non-negative integer value"""
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+    
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's samples (same significant_bits) into this one"""
+        if other.significant_bits != self.significant_bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+    
+    def percentile(self, p: float) -> int:
+        """Value at or below which p percent of samples fall (bucket upper bound)"""
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+    
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def summary(self, percentiles: Iterable[float] = (50, 90, 95, 99, 99.9),
+                scale: float = 1.0) -> Dict[str, float]:
+        """
+        Summarize the distribution
+        
+        Args:
+            percentiles: Percentiles to report (keys like "p99", "p99.9")
+            scale: Divide values by this, e.g. 1000 to turn ns into µs
+        """
+        result = {
+            "count": self.count,
+            "min": round((self.min or 0) / scale, 3),
+            "mean": round(self.mean() / scale, 3),
+            "max": round((self.max or 0) / scale, 3)
+        }
+        for p in percentiles:
+            result[f"p{p:g}"] = round(self.percentile(p) / scale, 3)
+        return result
@@ -0,0 +1,274 @@
+"""
+Load generator - Open- and closed-loop HTTP load against the generate API
+
+Closed loop: `--concurrency` clients each send a request as soon as the
+previous one finished. Open loop: requests are scheduled at a fixed
+`--rate` regardless of how fast the server answers, and latency is
+measured from the scheduled send time, so queueing delay is not hidden
+(no coordinated omission).
+
+Usage:
+    python run_local.py --port 8000 &
+    python -m benchmarks.load_test --mode open --rate 50 --duration 30 \\
+        --mix single=70,comparison=20,batch=10 --output load.json
+    GENERATE_RATE_LIMIT=0 python -m benchmarks.load_test --spawn --mode closed --concurrency 8
+
+A spawned server inherits the environment, so admission-control limits
+(GENERATE_RATE_LIMIT, GENERATE_MAX_IN_FLIGHT, ...) can be set the same way.
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .catalog import generate_catalog
+from .histogram import LatencyHistogram
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PAYLOAD_KINDS = ("single", "comparison", "batch")
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    """Parse "single=70,comparison=20,batch=10" into (kind, weight) pairs"""
+    pairs = []
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in PAYLOAD_KINDS:
+            raise ValueError(f"Unknown payload kind '{kind}'. Expected any of: {', '.join(PAYLOAD_KINDS)}")
+        pairs.append((kind, float(weight or 1)))
+    return pairs
+
+
+class PayloadFactory:
+    """Builds request bodies for each payload kind from a synthetic catalog"""
+    
+    def __init__(self, mix: List[Tuple[str, float]], batch_size: int = 20, seed: int = 42):
+        self.kinds = [kind for kind, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.batch_size = batch_size
+        self.products = list(generate_catalog(500, seed))
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def next(self) -> Tuple[str, str, bytes]:
+        """Return (kind, path, body) for the next request"""
+        with self._lock:
+            kind = self._rng.choices(self.kinds, weights=self.weights)[0]
+            products = self._rng.sample(self.products, self.batch_size if kind == "batch" else 2)
+        if kind == "single":
+            return kind, "/api/generate", json.dumps({"product_a": products[0]}).encode()
+        if kind == "comparison":
+            return kind, "/api/generate", json.dumps(
+                {"product_a": products[0], "product_b": products[1]}).encode()
+        return kind, "/api/jobs", json.dumps({"products": products}).encode()
+
+
+class LoadStats:
+    """Thread-safe latency histograms (µs) and status counts per payload kind"""
+    
+    def __init__(self):
+        self.histograms = {}
+        self.statuses = {}
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+    
+    def record(self, kind: str, status: int, latency_s: float, size: int):
+        with self._lock:
+            self.histograms.setdefault(kind, LatencyHistogram()).record(int(latency_s * 1e6))
+            key = str(status)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+            self.bytes_received += size
+    
+    def report(self, elapsed: float) -> Dict:
+        overall = LatencyHistogram()
+        for histogram in self.histograms.values():
+            overall.merge(histogram)
+        ok = sum(count for status, count in self.statuses.items() if status.startswith("2"))
+        return {
+            "requests": overall.count,
+            "successful": ok,
+            "statuses": dict(sorted(self.statuses.items())),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(overall.count / elapsed, 2) if elapsed else 0.0,
+            "bytes_received": self.bytes_received,
+            "latency_ms": overall.summary(scale=1000),
+            "latency_ms_by_kind": {
+                kind: histogram.summary(scale=1000)
+                for kind, histogram in sorted(self.histograms.items())
+            }
+        }
+
+
+class _Client:
+    """One persistent-when-possible HTTP connection"""
+    
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+    
+    def send(self, path: str, body: bytes) -> Tuple[int, int]:
+        """POST body and return (status, response size); status 0 means a transport error"""
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request("POST", path, body=body, headers={
+                "Content-Type": "application/json",
+                "Accept-Encoding": "gzip"
+            })
+            response = self.conn.getresponse()
+            data = response.read()
+            if response.will_close:
+                self.conn.close()
+                self.conn = None
+            return response.status, len(data)
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            return 0, 0
+
+
+def run_closed_loop(url: str, payloads: PayloadFactory, concurrency: int,
+                    duration: float, timeout: float = 30.0) -> Dict:
+    """`concurrency` clients send back-to-back requests for `duration` seconds"""
+    stats = LoadStats()
+    deadline = time.perf_counter() + duration
+    
+    def client_loop():
+        client = _Client(url, timeout)
+        while time.perf_counter() < deadline:
+            kind, path, body = payloads.next()
+            start = time.perf_counter()
+            status, size = client.send(path, body)
+            stats.record(kind, status, time.perf_counter() - start, size)
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client_loop, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = stats.report(time.perf_counter() - start)
+    report.update({"mode": "closed", "concurrency": concurrency})
+    return report
+
+
+def run_open_loop(url: str, payloads: PayloadFactory, rate: float, duration: float,
+                  max_connections: int = 256, timeout: float = 30.0) -> Dict:
+    """
+    Send requests at a fixed arrival rate for `duration` seconds
+    
+    Latency runs from each request's scheduled time, so when all
+    `max_connections` are busy the wait is counted, as a real client
+    would experience it.
+    """
+    stats = LoadStats()
+    schedule = queue.Queue()
+    start = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        schedule.put(start + i / rate)
+    
+    def sender():
+        client = _Client(url, timeout)
+        while True:
+            try:
+                scheduled = schedule.get_nowait()
+            except queue.Empty:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind, path, body = payloads.next()
+            status, size = client.send(path, body)
+            stats.record(kind, status, time.perf_counter() - scheduled, size)
+    
+    workers = min(max_connections, max(1, total))
+    threads = [threading.Thread(target=sender, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report = stats.report(time.perf_counter() - start)
+    report.update({"mode": "open", "target_rate_rps": rate})
+    return report
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Start run_local.py and wait until it accepts connections"""
+    proc = subprocess.Popen(
+        [sys.executable, "run_local.py", "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            http.client.HTTPConnection("127.0.0.1", port, timeout=1).connect()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError("run_local.py did not start")
+
+
+def run(args) -> Dict:
+    payloads = PayloadFactory(parse_mix(args.mix), batch_size=args.batch_size, seed=args.seed)
+    proc: Optional[subprocess.Popen] = None
+    url = args.url
+    if args.spawn:
+        proc = spawn_server(args.port)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        if args.mode == "open":
+            report = run_open_loop(url, payloads, args.rate, args.duration,
+                                   max_connections=args.max_connections, timeout=args.timeout)
+        else:
+            report = run_closed_loop(url, payloads, args.concurrency, args.duration, timeout=args.timeout)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    report.update({"url": url, "mix": args.mix, "duration_s": args.duration})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the generate API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL")
+    parser.add_argument("--spawn", action="store_true", help="Start run_local.py for the test")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --spawn")
+    parser.add_argument("--mode", choices=("open", "closed"), default="closed")
+    parser.add_argument("--rate", type=float, default=20, help="Open loop: requests per second")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed loop: concurrent clients")
+    parser.add_argument("--max-connections", type=int, default=256, help="Open loop: sender threads")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load")
+    parser.add_argument("--mix", default="single=70,comparison=20,batch=10")
+    parser.add_argument("--batch-size", type=int, default=20, help="Products per batch job")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
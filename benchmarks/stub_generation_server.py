@@ -0,0 +1,91 @@
+"""
+Stub generation server - A local stand-in for the HTTP answer backend
+
+Answers {"product", "questions"} requests with canned text after a
+configurable latency, and fails a configurable share of requests, so
+backend throughput, tail latency and fallbacks can be measured offline.
+
+Usage:
+    python -m benchmarks.stub_generation_server --port 8100 --latency 0.05 --jitter 0.02
+    ANSWER_BACKEND_URL=http://127.0.0.1:8100/generate python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+
+class StubGenerationHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler; latency settings live on the server object"""
+    
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.requests += 1
+        
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+        if random.random() < server.error_rate:
+            status, payload = 503, {"error": "stub failure"}
+        else:
+            name = request.get("product", {}).get("product_name", "this product")
+            status, payload = 200, {"answers": [
+                f"[stub] {name}: {q.get('question', '')}" for q in request.get("questions", [])
+            ]}
+        
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(port: int = 0, latency: float = 0.05, jitter: float = 0.0,
+                error_rate: float = 0.0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubGenerationHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.error_rate = error_rate
+    server.requests = 0
+    return server
+
+
+def spawn_stub(**settings) -> Tuple[ThreadingHTTPServer, str]:
+    """Start a stub server on a free port in a background thread; returns (server, url)"""
+    server = make_server(**settings)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/generate"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub text-generation server")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 503")
+    args = parser.parse_args()
+    
+    server = make_server(args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Stub generation server on http://127.0.0.1:{args.port}/generate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
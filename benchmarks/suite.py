@@ -0,0 +1,243 @@
+"""
+Stage benchmark suite - Throughput, latency percentiles and peak memory
+
+Benchmarks every agent, every block function in blocks/content_blocks.py,
+every page template and the full pipeline over a synthetic catalog, and
+compares throughput against a stored baseline.
+
+Usage:
+    python -m benchmarks.suite --products 1000 [--output report.json]
+    python -m benchmarks.suite --baseline benchmarks/baseline.json [--tolerance 0.25]
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --update-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import blocks
+import blocks.content_blocks as content_blocks
+from agents import DataParserAgent, QuestionGenerationAgent, FAQGenerationAgent, ContentAssemblyAgent
+from models.product import Product
+from orchestrator import WorkflowOrchestrator
+from templates.template_engine import TemplateEngine
+
+from .catalog import generate_catalog
+from .histogram import LatencyHistogram
+
+# Products used for the (slow, tracemalloc-instrumented) memory pass
+MEMORY_SAMPLE = 200
+
+
+def _prepare(raw: Dict, partner: Dict) -> Dict:
+    """Precompute every stage's inputs so each benchmark times only its own stage"""
+    product = Product.from_dict(raw)
+    product_b = Product.from_dict(partner)
+    questions = QuestionGenerationAgent().generate_questions(product)
+    answers = FAQGenerationAgent().generate_answers(product, questions)
+    page_blocks = {
+        "overview": content_blocks.generate_overview_block(product),
+        "benefits": content_blocks.generate_benefits_block(product),
+        "ingredients": content_blocks.generate_ingredients_block(product),
+        "usage": content_blocks.extract_usage_block(product),
+        "safety": content_blocks.extract_safety_block(product),
+        "pricing": content_blocks.generate_price_block(product)
+    }
+    comparison_blocks = {
+        "ingredients_comparison": content_blocks.compare_ingredients_block(product, product_b),
+        "benefits_comparison": content_blocks.compare_benefits_block(product, product_b),
+        "price_comparison": content_blocks.compare_price_block(product, product_b)
+    }
+    return {
+        "raw": raw, "raw_b": partner, "product": product, "product_b": product_b,
+        "questions": questions, "answers": answers,
+        "blocks": page_blocks, "comparison_blocks": comparison_blocks
+    }
+
+
+def build_targets() -> List[Tuple[str, Callable[[Dict], object]]]:
+    """Name and callable of every benchmarked stage; each takes a prepared input"""
+    parser = DataParserAgent()
+    question_agent = QuestionGenerationAgent()
+    faq_agent = FAQGenerationAgent()
+    assembler = ContentAssemblyAgent()
+    engine = TemplateEngine()
+    orchestrator = WorkflowOrchestrator()
+    
+    targets = [
+        ("agent.DataParserAgent.parse", lambda c: parser.parse(c["raw"])),
+        ("agent.QuestionGenerationAgent.generate_questions",
+         lambda c: question_agent.generate_questions(c["product"])),
+        ("agent.FAQGenerationAgent.generate_answers",
+         lambda c: faq_agent.generate_answers(c["product"], c["questions"])),
+        ("agent.ContentAssemblyAgent.assemble_faq_page",
+         lambda c: assembler.assemble_faq_page(c["product"], c["questions"], c["answers"])),
+        ("agent.ContentAssemblyAgent.assemble_product_page",
+         lambda c: assembler.assemble_product_page(c["product"])),
+        ("agent.ContentAssemblyAgent.assemble_comparison_page",
+         lambda c: assembler.assemble_comparison_page(c["product"], c["product_b"])),
+    ]
+    
+    for name in blocks.__all__:
+        function = getattr(content_blocks, name)
+        if name.startswith("compare_"):
+            targets.append((f"block.{name}", lambda c, f=function: f(c["product"], c["product_b"])))
+        else:
+            targets.append((f"block.{name}", lambda c, f=function: f(c["product"])))
+    
+    targets.extend([
+        ("template.faq", lambda c: engine.render_template(
+            "faq", product=c["product"], questions=c["questions"], answers=c["answers"])),
+        ("template.product", lambda c: engine.render_template(
+            "product", product=c["product"], **c["blocks"])),
+        ("template.comparison", lambda c: engine.render_template(
+            "comparison", product_a=c["product"], product_b=c["product_b"], **c["comparison_blocks"])),
+        # Outputs are lazy: materialize so every page is actually built
+        ("pipeline.execute_pipeline_from_data", lambda c: orchestrator.execute_pipeline_from_data(
+            c["raw"], c["raw_b"])["outputs"].materialize()),
+    ])
+    return targets
+
+
+def _prepared_inputs(products: int, seed: int):
+    previous = None
+    for raw in generate_catalog(products, seed):
+        yield _prepare(raw, previous or raw)
+        previous = raw
+
+
+def run_suite(products: int = 1000, seed: int = 42, only: Optional[str] = None) -> Dict:
+    """
+    Run every benchmark over a synthetic catalog
+    
+    Args:
+        products: Catalog size (inputs are streamed, so 1M is feasible)
+        seed: Catalog seed
+        only: Optional substring filter on benchmark names
+        
+    Returns:
+        Report with per-benchmark ops/sec, latency percentiles (µs) and peak memory (KiB)
+    """
+    targets = [(name, fn) for name, fn in build_targets() if not only or only in name]
+    histograms = {name: LatencyHistogram() for name, _ in targets}
+    elapsed = {name: 0 for name, _ in targets}
+    
+    clock = time.perf_counter_ns
+    for context in _prepared_inputs(products, seed):
+        for name, fn in targets:
+            start = clock()
+            fn(context)
+            duration = clock() - start
+            histograms[name].record(duration)
+            elapsed[name] += duration
+    
+    # Memory pass: tracemalloc slows everything down, so it runs separately
+    peaks = {}
+    sample = list(_prepared_inputs(min(products, MEMORY_SAMPLE), seed))
+    tracemalloc.start()
+    try:
+        for name, fn in targets:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            for context in sample:
+                fn(context)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[name] = round((peak - baseline) / 1024, 1)
+    finally:
+        tracemalloc.stop()
+    
+    results = {}
+    for name, _ in targets:
+        histogram = histograms[name]
+        results[name] = {
+            "ops_per_sec": round(histogram.count / (elapsed[name] / 1e9), 1) if elapsed[name] else 0.0,
+            "latency_us": histogram.summary(percentiles=(50, 95, 99), scale=1000),
+            "peak_memory_kib": peaks[name]
+        }
+    return {
+        "products": products,
+        "seed": seed,
+        "python": sys.version.split()[0],
+        "results": results
+    }
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float = 0.25) -> List[str]:
+    """
+    Find benchmarks that got slower than the baseline allows
+    
+    A benchmark regresses when its throughput drops by more than
+    `tolerance` (fraction) or its p99 latency grows by more than it.
+    
+    Returns:
+        Human-readable regression messages (empty when none)
+    """
+    regressions = []
+    for name, current in report["results"].items():
+        expected = baseline.get("results", {}).get(name)
+        if expected is None:
+            continue
+        floor = expected["ops_per_sec"] * (1 - tolerance)
+        if current["ops_per_sec"] < floor:
+            regressions.append(
+                f"{name}: {current['ops_per_sec']:.0f} ops/s < {floor:.0f} "
+                f"(baseline {expected['ops_per_sec']:.0f})"
+            )
+        ceiling = expected["latency_us"]["p99"] * (1 + tolerance)
+        if current["latency_us"]["p99"] > ceiling:
+            regressions.append(
+                f"{name}: p99 {current['latency_us']['p99']:.1f} µs > {ceiling:.1f} "
+                f"(baseline {expected['latency_us']['p99']:.1f})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agents, blocks, templates and the pipeline")
+    parser.add_argument("--products", type=int, default=1000, help="Synthetic catalog size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="Run benchmarks whose name contains this")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed throughput drop / p99 growth before failing (fraction)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Overwrite --baseline with this run instead of comparing")
+    args = parser.parse_args()
+    
+    report = run_suite(args.products, args.seed, args.only)
+    for name, row in report["results"].items():
+        latency = row["latency_us"]
+        print(f"{name:<55} {row['ops_per_sec']:>12,.0f} ops/s  "
+              f"p50 {latency['p50']:>8.1f}  p99 {latency['p99']:>8.1f} µs  "
+              f"peak {row['peak_memory_kib']:>8.1f} KiB")
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("\nPerformance regressions:")
+            for message in regressions:
+                print(f"  ✗ {message}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
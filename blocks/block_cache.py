@@ -0,0 +1,169 @@
+"""
+Block cache - Persistent block results shared by processes and runs
+
+Results are stored in SQLite under a content address: block name, block
+version and a hash of only the product fields the block reads. Worker
+processes pointing at the same file share entries; bump a block's version
+in BLOCK_VERSIONS whenever its output changes for the same inputs.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from models.product import Product
+
+# Product fields each block reads (for comparison blocks: read from both products)
+BLOCK_FIELDS = {
+    "generate_overview_block": ("product_name", "concentration", "suitable_for"),
+    "generate_benefits_block": ("product_name", "benefits"),
+    "generate_ingredients_block": ("key_ingredients",),
+    "extract_usage_block": ("how_to_use",),
+    "extract_safety_block": ("side_effects",),
+    "generate_price_block": ("price",),
+    "compare_ingredients_block": ("product_name", "key_ingredients"),
+    "compare_benefits_block": ("product_name", "benefits"),
+    "compare_price_block": ("product_name", "price")
+}
+
+# Output version of each block; part of the cache key
+BLOCK_VERSIONS = {name: 1 for name in BLOCK_FIELDS}
+BLOCK_VERSIONS.update(compare_ingredients_block=2, compare_benefits_block=2)  # deterministic list order
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    key TEXT PRIMARY KEY,
+    block TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+def block_key(name: str, products: Sequence[Product]) -> str:
+    """Content address of one block call"""
+    fields = BLOCK_FIELDS[name]
+    inputs = [[getattr(product, field) for field in fields] for product in products]
+    payload = json.dumps([name, BLOCK_VERSIONS[name], inputs], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BlockCache:
+    """
+    SQLite-backed block result cache
+    
+    Each thread (and each forked process) keeps its own connection. A page's
+    blocks are looked up with one query and misses are written back in one
+    transaction.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+    
+    @classmethod
+    def from_env(cls) -> Optional['BlockCache']:
+        """Shared cache for CONTENT_BLOCK_CACHE (a SQLite path), or None when unset"""
+        path = os.environ.get("CONTENT_BLOCK_CACHE")
+        if not path:
+            return None
+        with _instances_lock:
+            cache = _instances.get(path)
+            if cache is None:
+                cache = _instances[path] = cls(path)
+            return cache
+    
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict]:
+        keys = list(keys)
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, value FROM blocks WHERE key IN ({placeholders})", keys
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+    
+    def put_many(self, items: Iterable[Tuple[str, str, Dict]]):
+        """Store (key, block name, value) triples"""
+        now = time.time()
+        rows = [(key, name, json.dumps(value, ensure_ascii=False), now) for key, name, value in items]
+        if not rows:
+            return
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO blocks (key, block, value, created) VALUES (?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def compute(self, calls: Sequence[Tuple[Callable, Sequence[Product]]]) -> List[Dict]:
+        """
+        Run block functions through the cache
+        
+        Args:
+            calls: (block function, products) pairs; functions must appear in BLOCK_FIELDS
+            
+        Returns:
+            Block results in call order
+        """
+        keys = [block_key(function.__name__, products) for function, products in calls]
+        found = self.get_many(keys)
+        results = []
+        missing = []
+        for key, (function, products) in zip(keys, calls):
+            value = found.get(key)
+            if value is None:
+                value = function(*products)
+                missing.append((key, function.__name__, value))
+            results.append(value)
+        self.put_many(missing)
+        with self._stats_lock:
+            self.hits += len(calls) - len(missing)
+            self.misses += len(missing)
+        return results
+    
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            hits, misses = self.hits, self.misses
+        entries = self._connection().execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+        return {
+            "hits": hits,
+            "misses": misses,
+            "entries": entries,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+    
+    def prune(self, max_entries: int) -> int:
+        """Keep only the newest `max_entries` results; returns how many were removed"""
+        conn = self._connection()
+        cursor = conn.execute(
+            "DELETE FROM blocks WHERE key NOT IN (SELECT key FROM blocks ORDER BY created DESC LIMIT ?)",
+            (max_entries,)
+        )
+        return cursor.rowcount
+    
+    def clear(self):
+        self._connection().execute("DELETE FROM blocks")
+
+
+# Caches opened through from_env, one per path and process
+_instances: Dict[str, BlockCache] = {}
+_instances_lock = threading.Lock()
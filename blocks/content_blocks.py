@@ -115,14 +115,17 @@ def compare_ingredients_block(product_a: Product, product_b: Product) -> Dict[st
     Returns:
         Dictionary with comparison data
     """
-    common = set(product_a.key_ingredients) & set(product_b.key_ingredients)
-    unique_a = set(product_a.key_ingredients) - set(product_b.key_ingredients)
-    unique_b = set(product_b.key_ingredients) - set(product_a.key_ingredients)
+    # Ordered like the products' lists, so pages are identical in every process
+    ingredients_a = dict.fromkeys(product_a.key_ingredients)
+    ingredients_b = dict.fromkeys(product_b.key_ingredients)
+    common = [item for item in ingredients_a if item in ingredients_b]
+    unique_a = [item for item in ingredients_a if item not in ingredients_b]
+    unique_b = [item for item in ingredients_b if item not in ingredients_a]
     
     return {
-        "common_ingredients": list(common),
-        "unique_to_a": list(unique_a),
-        "unique_to_b": list(unique_b),
+        "common_ingredients": common,
+        "unique_to_a": unique_a,
+        "unique_to_b": unique_b,
         "summary": f"{len(common)} common components, {len(unique_a)} unique to {product_a.product_name}, {len(unique_b)} unique to {product_b.product_name}"
     }
 
@@ -138,14 +141,16 @@ def compare_benefits_block(product_a: Product, product_b: Product) -> Dict[str,
     Returns:
         Dictionary with benefit comparison
     """
-    common = set(product_a.benefits) & set(product_b.benefits)
-    unique_a = set(product_a.benefits) - set(product_b.benefits)
-    unique_b = set(product_b.benefits) - set(product_a.benefits)
+    benefits_a = dict.fromkeys(product_a.benefits)
+    benefits_b = dict.fromkeys(product_b.benefits)
+    common = [item for item in benefits_a if item in benefits_b]
+    unique_a = [item for item in benefits_a if item not in benefits_b]
+    unique_b = [item for item in benefits_b if item not in benefits_a]
     
     return {
-        "common_benefits": list(common),
-        "unique_to_a": list(unique_a),
-        "unique_to_b": list(unique_b),
+        "common_benefits": common,
+        "unique_to_a": unique_a,
+        "unique_to_b": unique_b,
         "advantage_a": f"{product_a.product_name} additionally provides: {', '.join(unique_a)}" if unique_a else None,
         "advantage_b": f"{product_b.product_name} additionally provides: {', '.join(unique_b)}" if unique_b else None
     }
@@ -1,18 +1,123 @@
 """
 Main entry point for the Multi-Agent Content Generation System
 """
-from orchestrator import WorkflowOrchestrator
+import argparse
+import json
+import os
+import sys
+from orchestrator import WorkflowOrchestrator, PipelineProfiler
 
 
-def main():
-    """Execute the complete content generation pipeline"""
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="AI Agentic Content Generation System",
+        epilog="Without catalog inputs, runs the demo on input_data.json and writes outputs/."
+    )
+    parser.add_argument("inputs", nargs="*",
+                        help="Catalog files or globs (.json product/list, .ndjson/.jsonl one product per line)")
+    parser.add_argument("--output", "-o", default="outputs",
+                        help="Output directory (json, html, markdown) or file (ndjson) (default: outputs)")
+    parser.add_argument("--format", choices=("json", "ndjson", "html", "markdown"), default="json",
+                        help="json/html/markdown: one directory per product; ndjson: one line per product")
+    parser.add_argument("--pages", help="Comma-separated page types to generate (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=32,
+                        help="Products handed to a worker at a time (default: 32)")
+    parser.add_argument("--compare-with",
+                        help="JSON file with the product to compare against when an entry has no compare_with")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only regenerate products whose input changed since the last run")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip products already recorded in the manifest of an interrupted run")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="Render only hash partition I of N (merge with: python -m orchestrator.sharding merge)")
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="Load the catalog once into shared memory; workers write pages directly")
+    parser.add_argument("--block-cache",
+                        help="SQLite file caching content blocks across workers and runs")
+    parser.add_argument("--versions",
+                        help="SQLite file recording each changed page as a JSON Patch against its previous version")
+    parser.add_argument("--patches-only", action="store_true",
+                        help="With --versions: record pages in the version store only, not in --output")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Do not print progress")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write cProfile .pstats and per-stage allocation reports")
+    parser.add_argument("--profile-dir", help="Directory for profiling artifacts (default: profiles/)")
+    return parser
+
+
+def run_batch(args) -> int:
+    """Generate pages for a catalog; returns the process exit code"""
+    from orchestrator.batch import BatchRunner, ProgressReporter
+    from orchestrator.sinks import make_sink
+    
+    if args.block_cache:
+        # Inherited by pool workers, whose agents open the same file
+        os.environ["CONTENT_BLOCK_CACHE"] = args.block_cache
+    
+    compare_with = None
+    if args.compare_with:
+        with open(args.compare_with, "r", encoding="utf-8") as f:
+            compare_with = json.load(f)
+    
+    if args.patches_only and not args.versions:
+        raise ValueError("--patches-only requires --versions")
+    sink = make_sink(args.output, args.format, append=args.incremental or args.resume)
+    if args.versions:
+        from orchestrator.page_versions import PageVersionStore, VersionedSink
+        sink = VersionedSink(sink, PageVersionStore(args.versions), patches_only=args.patches_only)
+    runner = BatchRunner(
+        sink,
+        pages=args.pages,
+        workers=args.workers,
+        compare_with=compare_with,
+        incremental=args.incremental,
+        resume=args.resume,
+        chunk_size=args.chunk_size,
+        shared_memory=args.shared_memory,
+        shard=args.shard,
+        progress=None if args.quiet else ProgressReporter()
+    )
+    
+    # Profiling covers the parent process; use --workers 1 to profile rendering
+    profile_run = None
+    if args.profile:
+        profile_run = PipelineProfiler(output_dir=args.profile_dir, label="batch").start_run("batch")
+    try:
+        summary = runner.run(args.inputs)
+    finally:
+        sink.close()
+        if profile_run is not None:
+            artifacts = profile_run.stop()
+            print(f"Profile: {artifacts['pstats']}", file=sys.stderr)
+    
+    print(f"Generated {summary['generated']} of {summary['total']} products "
+          f"({summary['skipped']} skipped, {summary['failed']} failed) "
+          f"in {summary['elapsed']:.2f}s - {summary['rate']:,.1f} products/s", file=sys.stderr)
+    for key, error in runner.failures[:20]:
+        print(f"  failed: {key}: {error}", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+def main(argv=None):
+    """Execute the content generation pipeline (catalog batch or single-product demo)"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.inputs:
+        try:
+            return run_batch(args)
+        except (FileNotFoundError, ValueError) as e:
+            parser.error(str(e))
     
     print("=" * 60)
     print("AI Agentic Content Generation System")
     print("=" * 60)
     
     # Initialize orchestrator
-    orchestrator = WorkflowOrchestrator()
+    profiler = PipelineProfiler(output_dir=args.profile_dir, label="cli") if args.profile else None
+    orchestrator = WorkflowOrchestrator(profiler=profiler)
     
     # Define Product B (fictional competitor product)
     product_b_data = {
@@ -41,6 +146,9 @@ def main():
     print("=" * 60)
     print(f"Agents Executed: {', '.join(results['agents_executed'])}")
     print(f"Pages Generated: {', '.join(results['outputs'].keys())}")
+    if "profile" in results:
+        print(f"Profile: {results['profile']['pstats']}")
+        print(f"Allocations: {results['profile']['allocations']}")
     
     # Print workflow state
     state = orchestrator.get_workflow_state()
@@ -56,4 +164,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
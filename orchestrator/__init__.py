@@ -1,3 +1,17 @@
-from .workflow import WorkflowOrchestrator
+from .pages import PAGE_TYPES, parse_pages
 
-__all__ = ['WorkflowOrchestrator']
+__all__ = ['WorkflowOrchestrator', 'PipelineProfiler', 'PAGE_TYPES', 'parse_pages']
+
+
+def __getattr__(name):
+    # Import the agent pipeline on first use so that page-selector helpers
+    # stay cheap to import (the API parses requests before it needs agents)
+    if name == 'WorkflowOrchestrator':
+        from .workflow import WorkflowOrchestrator
+        globals()[name] = WorkflowOrchestrator
+        return WorkflowOrchestrator
+    if name == 'PipelineProfiler':
+        from .profiling import PipelineProfiler
+        globals()[name] = PipelineProfiler
+        return PipelineProfiler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,396 @@
+"""
+Batch runner - Generates pages for whole catalogs with a process pool
+"""
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from .catalog import expand_paths, fingerprint, iter_catalog, product_key
+from .pages import parse_pages
+from .sharding import parse_shard, shard_of
+from .shared_table import SharedProductTable, encode_row
+
+# Orchestrator owned by this process (one per pool worker, created lazily)
+_worker_orchestrator = None
+
+# Shared-memory mode: the attached product table, sink and pages of this worker
+_worker_table = None
+_worker_sink = None
+_worker_pages = None
+
+
+def _orchestrator():
+    global _worker_orchestrator
+    if _worker_orchestrator is None:
+        from .workflow import WorkflowOrchestrator
+        _worker_orchestrator = WorkflowOrchestrator()
+    return _worker_orchestrator
+
+
+def output_fingerprint(data: Dict, partner: Optional[Dict], pages: Iterable[str]) -> str:
+    """Hash of everything that shapes a product's pages"""
+    return fingerprint({"product": data, "compare_with": partner, "pages": sorted(pages)})
+
+
+def render_chunk(tasks: List[Tuple[str, str, Dict, Optional[Dict]]],
+                 pages: Tuple[str, ...]) -> List[Tuple[str, str, Optional[Dict], Optional[str]]]:
+    """
+    Render a chunk of products (runs inside pool workers)
+    
+    Args:
+        tasks: (key, fingerprint, product_data, compare_with_data) tuples
+        pages: Page types to generate
+        
+    Returns:
+        (key, fingerprint, outputs, error) per task; outputs is None on error
+    """
+    orchestrator = _orchestrator()
+    rendered = []
+    for key, digest, data, partner in tasks:
+        try:
+            outputs = orchestrator.execute_pipeline_from_data(data, partner, pages=pages)["outputs"]
+            rendered.append((key, digest, outputs.materialize(), None))
+        except Exception as e:
+            rendered.append((key, digest, None, f"{type(e).__name__}: {e}"))
+    return rendered
+
+
+def _attach_worker(table_name: str, sink, pages: Tuple[str, ...]):
+    """Pool initializer for shared-memory mode"""
+    global _worker_table, _worker_sink, _worker_pages
+    _worker_table = SharedProductTable.attach(table_name)
+    _worker_sink = sink
+    _worker_pages = pages
+
+
+def render_rows(start: int, stop: int) -> List[Tuple[str, str, Optional[List[str]], Optional[str]]]:
+    """
+    Render table rows [start, stop) and write their pages to the worker's sink
+    
+    Returns:
+        (key, fingerprint, page types written, error) per row
+    """
+    orchestrator = _orchestrator()
+    rendered = []
+    for index in range(start, stop):
+        key, digest, data, partner_row = _worker_table.row(index)
+        try:
+            partner = _worker_table.row(partner_row)[2] if partner_row >= 0 else None
+            outputs = orchestrator.execute_pipeline_from_data(data, partner, pages=_worker_pages)["outputs"]
+            _worker_sink.write(key, outputs)
+            rendered.append((key, digest, list(outputs), None))
+        except Exception as e:
+            rendered.append((key, digest, None, f"{type(e).__name__}: {e}"))
+    _worker_sink.flush()
+    return rendered
+
+
+class Manifest:
+    """
+    Append-only NDJSON record of finished products
+    
+    Each line is {"key", "fingerprint", "pages", ...} or {"key", "deleted": true};
+    the last line per key wins. Lines without a key are headers (e.g. the
+    partition of a sharded run).
+    Resumed and incremental runs read it to decide what to skip.
+    """
+    
+    def __init__(self, path: str, keep: bool = False):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self.header: Dict = {}
+        if keep and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        if "key" not in entry:
+                            self.header = entry
+                        elif entry.get("deleted"):
+                            self.entries.pop(entry["key"], None)
+                        else:
+                            self.entries[entry["key"]] = entry
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a" if keep else "w", encoding="utf-8")
+    
+    def write_header(self, header: Dict):
+        self.header = header
+        self._file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        self._file.flush()
+    
+    def record(self, key: str, digest: str, pages: Iterable[str], **lineage):
+        """
+        Record a finished product
+        
+        Resumed runs skip recorded products, so the product's pages must
+        already be durable in the sink (written and flushed) when this is
+        called.
+        
+        `lineage` holds optional input fingerprints: "input" (the product),
+        "partner" and "partner_input" (its catalog comparison partner).
+        """
+        entry = {"key": key, "fingerprint": digest, "pages": sorted(pages), **lineage}
+        self.entries[key] = entry
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+    
+    def forget(self, key: str):
+        """Record that a product was deleted"""
+        self.entries.pop(key, None)
+        self._file.write(json.dumps({"key": key, "deleted": True}, ensure_ascii=False) + "\n")
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
+
+
+class ProgressReporter:
+    """Prints "done/total products, rate products/s" at most once per interval"""
+    
+    def __init__(self, stream=None, interval: float = 1.0):
+        self.stream = stream if stream is not None else sys.stderr
+        self.interval = interval
+        self._last = 0.0
+    
+    def __call__(self, done: int, total: int, rate: float, final: bool = False):
+        now = time.monotonic()
+        if not final and now - self._last < self.interval:
+            return
+        self._last = now
+        self.stream.write(f"\r  {done}/{total} products  {rate:,.1f} products/s")
+        if final:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+class BatchRunner:
+    """
+    Runs the pipeline over a catalog and writes pages to a sink
+    
+    Catalog entries may name a comparison partner with "compare_with": either
+    the sku/name of another catalog product or an inline product dictionary.
+    Entries without one are compared against `compare_with` when given.
+    """
+    
+    def __init__(self, sink, pages: Optional[Union[str, Iterable[str]]] = None,
+                 workers: int = 1, compare_with: Dict = None,
+                 incremental: bool = False, resume: bool = False,
+                 chunk_size: int = 32, manifest_path: str = None,
+                 progress: Callable = None, shared_memory: bool = False,
+                 shard: Union[str, Tuple[int, int], None] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.sink = sink
+        self.pages = parse_pages(pages)
+        self.workers = workers
+        self.compare_with = compare_with
+        self.incremental = incremental
+        self.resume = resume
+        self.chunk_size = chunk_size
+        self.manifest_path = manifest_path or sink.manifest_path
+        self.progress = progress
+        self.shared_memory = shared_memory
+        self.shard = parse_shard(shard)
+        self._lineage: Dict[str, Dict] = {}
+        self.failures: List[Tuple[str, str]] = []
+    
+    def _in_shard(self, key: str) -> bool:
+        return self.shard is None or shard_of(key, self.shard[1]) == self.shard[0]
+    
+    def _scan(self, patterns) -> Tuple[int, Dict[str, Dict]]:
+        """First pass: count products and collect referenced comparison partners"""
+        total = 0
+        wanted = set()
+        for index, data in enumerate(iter_catalog(patterns)):
+            if not self._in_shard(product_key(data) or f"item-{index}"):
+                continue
+            total += 1
+            if isinstance(data.get("compare_with"), str):
+                wanted.add(data["compare_with"])
+        partners = {}
+        if wanted and "comparison" in self.pages:
+            for data in iter_catalog(patterns):
+                key = product_key(data)
+                if key in wanted:
+                    partners[key] = data
+        return total, partners
+    
+    def _partner(self, data: Dict, partners: Dict[str, Dict]) -> Optional[Dict]:
+        if "comparison" not in self.pages:
+            return None
+        ref = data.get("compare_with")
+        if isinstance(ref, dict):
+            return ref
+        if isinstance(ref, str):
+            if ref not in partners:
+                raise ValueError(f"compare_with references unknown product '{ref}'")
+            return partners[ref]
+        return self.compare_with
+    
+    def _tasks(self, patterns, partners: Dict[str, Dict], manifest: Manifest,
+               skipped: List[int]) -> Iterator[Tuple[str, str, Dict, Optional[Dict]]]:
+        """Yield render tasks, skipping products the manifest says are current"""
+        for index, data in enumerate(iter_catalog(patterns)):
+            key = product_key(data) or f"item-{index}"
+            if not self._in_shard(key):
+                continue
+            try:
+                partner = self._partner(data, partners)
+            except ValueError as e:
+                self.failures.append((key, str(e)))
+                continue
+            digest = output_fingerprint(data, partner, self.pages)
+            done = manifest.entries.get(key)
+            if done is not None and (self.resume or done["fingerprint"] == digest):
+                skipped[0] += 1
+                continue
+            lineage = {"input": fingerprint(data)}
+            if isinstance(data.get("compare_with"), str) and partner is not None:
+                lineage["partner"] = data["compare_with"]
+                lineage["partner_input"] = fingerprint(partner)
+            self._lineage[key] = lineage
+            yield key, digest, data, partner
+    
+    def _chunks(self, tasks: Iterator) -> Iterator[List]:
+        chunk = []
+        for task in tasks:
+            chunk.append(task)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def _run_shared(self, tasks: Iterator, pages: Tuple[str, ...], finish: Callable):
+        """
+        Render through a shared-memory product table
+        
+        Products are encoded once; workers get index ranges, write pages to
+        the sink themselves and return only keys and fingerprints.
+        """
+        items = []
+        partner_rows = {}
+        partners = []
+        for key, digest, data, partner in tasks:
+            position = -1
+            if partner is not None:
+                position = partner_rows.get(id(partner))
+                if position is None:
+                    position = partner_rows[id(partner)] = len(partners)
+                    partners.append(partner)
+            items.append((key, digest, data, position))
+        if not items:
+            return
+        
+        count = len(items)
+        rows = [encode_row(key, digest, data, count + position if position >= 0 else -1)
+                for key, digest, data, position in items]
+        rows.extend(encode_row("", "", partner) for partner in partners)
+        del items, partners
+        table = SharedProductTable.build(rows)
+        del rows
+        
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_attach_worker,
+                                     initargs=(table.name, self.sink, pages)) as pool:
+                futures = [pool.submit(render_rows, start, min(start + self.chunk_size, count))
+                           for start in range(0, count, self.chunk_size)]
+                for future in as_completed(futures):
+                    finish(future.result())
+        finally:
+            table.close()
+    
+    def run(self, patterns: Union[str, Iterable[str]]) -> Dict:
+        """
+        Generate pages for every product matched by `patterns`
+        
+        Returns:
+            Summary with total, generated, skipped, failed, elapsed and rate
+        """
+        start = time.perf_counter()
+        # Never read back this run's own output or manifest (e.g. "*.ndjson")
+        own = {os.path.abspath(self.manifest_path), os.path.abspath(getattr(self.sink, "path", ""))}
+        patterns = [path for path in expand_paths(patterns) if os.path.abspath(path) not in own]
+        total, partners = self._scan(patterns)
+        manifest = Manifest(self.manifest_path, keep=self.incremental or self.resume)
+        if self.shard is not None:
+            manifest.write_header({
+                "shard": self.shard[0],
+                "shards": self.shard[1],
+                "format": self.sink.format,
+                "output": os.path.abspath(self.sink.location),
+                "pages": sorted(self.pages)
+            })
+        skipped = [0]
+        generated = 0
+        self.failures = []
+        
+        def report(final=False):
+            if self.progress is not None:
+                done = generated + skipped[0] + len(self.failures)
+                elapsed = time.perf_counter() - start
+                self.progress(done, total, generated / elapsed if elapsed > 0 else 0.0, final=final)
+        
+        def finish(rendered):
+            # (key, digest, page types, error) of pages already flushed to the sink
+            nonlocal generated
+            for key, digest, page_types, error in rendered:
+                if error is not None:
+                    self.failures.append((key, error))
+                    self._lineage.pop(key, None)
+                    continue
+                manifest.record(key, digest, page_types, **self._lineage.pop(key, {}))
+                generated += 1
+            report()
+        
+        def write(rendered):
+            for key, digest, outputs, error in rendered:
+                if error is None:
+                    self.sink.write(key, outputs)
+            # Buffered pages (NDJSONSink) must be on disk before the manifest
+            # claims them, or a killed run would resume without them
+            self.sink.flush()
+            finish([(key, digest, outputs and list(outputs), error)
+                    for key, digest, outputs, error in rendered])
+        
+        tasks = self._tasks(patterns, partners, manifest, skipped)
+        pages = tuple(sorted(self.pages))
+        chunks = self._chunks(tasks)
+        try:
+            if self.shared_memory and self.workers > 1:
+                self._run_shared(tasks, pages, finish)
+            elif self.workers == 1:
+                for chunk in chunks:
+                    write(render_chunk(chunk, pages))
+            else:
+                # Keep a bounded number of chunks in flight so memory stays
+                # flat however large the catalog is
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    pending = deque()
+                    for chunk in chunks:
+                        pending.append(pool.submit(render_chunk, chunk, pages))
+                        if len(pending) >= self.workers * 2:
+                            write(pending.popleft().result())
+                    while pending:
+                        write(pending.popleft().result())
+        finally:
+            manifest.close()
+        
+        report(final=True)
+        elapsed = time.perf_counter() - start
+        return {
+            "total": total,
+            "generated": generated,
+            "skipped": skipped[0],
+            "failed": len(self.failures),
+            "elapsed": elapsed,
+            "rate": generated / elapsed if elapsed > 0 else 0.0
+        }
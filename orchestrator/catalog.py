@@ -0,0 +1,66 @@
+"""
+Catalog input - Streams product records from JSON / NDJSON files and globs
+"""
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Union
+
+
+def expand_paths(patterns: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Expand file paths and glob patterns, preserving order and dropping duplicates
+    
+    Raises:
+        FileNotFoundError: If a pattern matches nothing
+    """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        matches = [path for path in matches if os.path.isfile(path)]
+        if not matches:
+            raise FileNotFoundError(f"No catalog files match: {pattern}")
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def iter_catalog(patterns: Union[str, Iterable[str]]) -> Iterator[Dict]:
+    """
+    Yield product dictionaries from catalog files
+    
+    Supported layouts:
+        *.ndjson / *.jsonl  one product per line
+        *.json              a single product, a list of products,
+                            or {"products": [...]}
+    """
+    for path in expand_paths(patterns):
+        if path.endswith((".ndjson", ".jsonl")):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+            continue
+        
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and isinstance(data.get("products"), list):
+            data = data["products"]
+        if isinstance(data, list):
+            yield from data
+        else:
+            yield data
+
+
+def product_key(data: Dict) -> str:
+    """Stable identity of a catalog product: its sku, else its name"""
+    return str(data.get("sku") or data.get("product_name") or "")
+
+
+def fingerprint(data: Dict) -> str:
+    """Content hash of a product record, used to detect changed products"""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,369 @@
+"""
+Change feed - Tails an NDJSON log of product upserts/deletes and regenerates
+only the affected pages (patching stored pages where only some fields changed)
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import ChainMap
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from models.product import Product
+from .batch import Manifest, output_fingerprint, render_chunk
+from .catalog import iter_catalog, product_key
+from .dependencies import PageUpdater, changed_fields
+from .pages import parse_pages
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+def parse_event(line: str) -> Tuple[str, str, Optional[Dict]]:
+    """
+    Parse one change-log line into (op, key, product)
+    
+    Formats:
+        {"op": "upsert", "product": {...}}      key from the product's sku/name
+        {"op": "delete", "sku": "SKU-1"}        or "key" / "product_name"
+    
+    Raises:
+        ValueError: If the line is not a valid event
+    """
+    event = json.loads(line)
+    if not isinstance(event, dict):
+        raise ValueError("Change event must be a JSON object")
+    op = event.get("op", UPSERT)
+    if op == UPSERT:
+        product = event.get("product")
+        if not isinstance(product, dict):
+            raise ValueError("Upsert event requires a 'product' object")
+        key = str(event.get("sku") or product_key(product))
+        if not key:
+            raise ValueError("Upsert event product has no sku or product_name")
+        return op, key, product
+    if op == DELETE:
+        key = str(event.get("sku") or event.get("key") or event.get("product_name") or "")
+        if not key:
+            raise ValueError("Delete event requires 'sku' or 'key'")
+        return op, key, None
+    raise ValueError(f"Unknown change op '{op}'. Expected '{UPSERT}' or '{DELETE}'")
+
+
+class ProductIndex:
+    """Current catalog state plus a reverse index of comparison references"""
+    
+    def __init__(self):
+        self.products: Dict[str, Dict] = {}
+        self.referrers: Dict[str, Set[str]] = {}
+    
+    def _reference(self, data: Optional[Dict]) -> Optional[str]:
+        ref = data.get("compare_with") if data else None
+        return ref if isinstance(ref, str) else None
+    
+    def upsert(self, key: str, data: Dict):
+        self.delete(key)
+        self.products[key] = data
+        ref = self._reference(data)
+        if ref is not None:
+            self.referrers.setdefault(ref, set()).add(key)
+    
+    def delete(self, key: str):
+        ref = self._reference(self.products.pop(key, None))
+        if ref is not None:
+            self.referrers.get(ref, set()).discard(key)
+    
+    def dependents(self, key: str) -> Set[str]:
+        """Products whose comparison page references `key`"""
+        return set(self.referrers.get(key, ()))
+
+
+class ChangeFeedConsumer:
+    """
+    Consumes a change log and keeps a sink's pages current
+    
+    Events are read from the committed byte offset, coalesced per key for
+    `window` seconds (the last event per key wins), then the changed products
+    and every product whose comparison references them are re-rendered. The
+    offset is committed only after their pages are written, so a restart
+    re-processes at most the last uncommitted batch.
+    
+    When the sink can read pages back and the stored pages match the previous
+    product state, only the blocks and answers that read a changed field are
+    recomputed and patched in (see PageUpdater).
+    """
+    
+    def __init__(self, log_path: str, sink, pages: Optional[Union[str, Iterable[str]]] = None,
+                 catalog: Union[str, Iterable[str], None] = None, compare_with: Dict = None,
+                 window: float = 1.0, max_batch: int = 1000, offset_path: str = None):
+        if window < 0:
+            raise ValueError("window must not be negative")
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.log_path = log_path
+        self.sink = sink
+        self.pages = parse_pages(pages)
+        self.compare_with = compare_with
+        self.window = window
+        self.max_batch = max_batch
+        self.offset_path = offset_path or log_path + ".offset"
+        self.manifest = Manifest(sink.manifest_path, keep=True)
+        
+        self.index = ProductIndex()
+        self.updater = PageUpdater()
+        self.pending: Dict[str, Tuple[str, Optional[Dict]]] = {}
+        self._pending_since: Optional[float] = None
+        self.invalid = 0
+        self.failures: List[Tuple[str, str]] = []
+        
+        if catalog:
+            for data in iter_catalog(catalog):
+                self.index.upsert(product_key(data), data)
+        
+        # Rebuild state from the already-committed part of the log
+        self.committed_offset = self._load_offset()
+        self._read_offset = 0
+        self._replaying = True
+        self.poll(limit=self.committed_offset)
+        for key, (op, data) in self.pending.items():
+            self._apply(op, key, data)
+        self.pending.clear()
+        self._pending_since = None
+        self._replaying = False
+    
+    def _load_offset(self) -> int:
+        try:
+            with open(self.offset_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+    
+    def _commit(self, offset: int):
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+        self.committed_offset = offset
+    
+    def poll(self, limit: int = None) -> int:
+        """
+        Read complete new lines from the log into the pending set
+        
+        Returns:
+            Number of events read
+        """
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+        if size < self._read_offset:
+            # The log was truncated or replaced: start over
+            self._read_offset = 0
+        end = size if limit is None else min(size, limit)
+        if end <= self._read_offset:
+            return 0
+        
+        with open(self.log_path, "rb") as f:
+            f.seek(self._read_offset)
+            data = f.read(end - self._read_offset)
+        # A trailing line without a newline is still being written
+        complete = data.rfind(b"\n") + 1
+        count = 0
+        for raw in data[:complete].splitlines():
+            if not raw.strip():
+                continue
+            try:
+                op, key, product = parse_event(raw.decode("utf-8"))
+            except ValueError as e:
+                self.invalid += 1
+                if not self._replaying:
+                    print(f"[ChangeFeed] Skipping invalid event: {e}", file=sys.stderr)
+                continue
+            self.pending[key] = (op, product)
+            count += 1
+        self._read_offset += complete
+        if count and self._pending_since is None:
+            self._pending_since = time.monotonic()
+        return count
+    
+    def due(self) -> bool:
+        """Whether the pending batch should be flushed now"""
+        if self._pending_since is None:
+            return self._read_offset > self.committed_offset
+        return (len(self.pending) >= self.max_batch
+                or time.monotonic() - self._pending_since >= self.window)
+    
+    def _apply(self, op: str, key: str, data: Optional[Dict]):
+        if op == UPSERT:
+            self.index.upsert(key, data)
+        else:
+            self.index.delete(key)
+    
+    def _partner(self, data: Dict, products: Dict[str, Dict] = None) -> Optional[Dict]:
+        if "comparison" not in self.pages:
+            return None
+        ref = data.get("compare_with")
+        if isinstance(ref, dict):
+            return ref
+        if isinstance(ref, str):
+            return (self.index.products if products is None else products).get(ref)
+        return self.compare_with
+    
+    def _patch(self, key: str, data: Dict, partner: Optional[Dict], digest: str,
+               before: ChainMap) -> bool:
+        """
+        Patch a product's stored pages in place of a full render
+        
+        Returns:
+            False when the stored pages cannot be trusted to match the
+            previous state (the caller then renders from scratch)
+        """
+        read = getattr(self.sink, "read", None)
+        entry = self.manifest.entries.get(key)
+        old = before.get(key)
+        if read is None or entry is None or old is None:
+            return False
+        old_partner = self._partner(old, before)
+        if (old.get("compare_with") != data.get("compare_with")
+                or (old_partner is None) != (partner is None)
+                or entry["fingerprint"] != output_fingerprint(old, old_partner, self.pages)):
+            return False
+        pages = {page_type: read(key, page_type) for page_type in entry["pages"]}
+        if any(page is None for page in pages.values()):
+            return False
+        
+        updated = self.updater.update(
+            pages, Product.from_dict(data), changed_fields(old, data),
+            Product.from_dict(partner) if partner is not None else None,
+            changed_fields(old_partner, partner)
+        )
+        self.sink.write(key, {page_type: pages[page_type] for page_type in updated})
+        self.manifest.record(key, digest, entry["pages"])
+        return True
+    
+    def flush(self) -> Dict:
+        """
+        Apply pending changes, regenerate affected pages and commit the offset
+        
+        Returns:
+            Summary with upserted, deleted, rendered and offset
+        """
+        changes, self.pending = self.pending, {}
+        self._pending_since = None
+        
+        # Product states before this batch (None: did not exist), for patching
+        before = ChainMap({key: self.index.products.get(key) for key in changes}, self.index.products)
+        affected = set()
+        deleted = []
+        for key, (op, data) in changes.items():
+            self._apply(op, key, data)
+            affected |= self.index.dependents(key)
+            if op == UPSERT:
+                affected.add(key)
+            else:
+                deleted.append(key)
+        
+        for key in deleted:
+            affected.discard(key)
+            self.sink.delete(key)
+            self.manifest.forget(key)
+        
+        tasks = []
+        patched = 0
+        for key in sorted(affected):
+            data = self.index.products.get(key)
+            if data is None:
+                continue
+            partner = self._partner(data)
+            digest = output_fingerprint(data, partner, self.pages)
+            try:
+                if self._patch(key, data, partner, digest, before):
+                    patched += 1
+                    continue
+            except Exception as e:
+                self.failures.append((key, f"{type(e).__name__}: {e}"))
+                continue
+            tasks.append((key, digest, data, partner))
+        
+        rendered = patched
+        for key, digest, outputs, error in render_chunk(tasks, tuple(sorted(self.pages))):
+            if error is not None:
+                self.failures.append((key, error))
+                continue
+            self.sink.write(key, outputs)
+            if "comparison" in self.pages and "comparison" not in outputs:
+                self.sink.discard(key, "comparison")
+            self.manifest.record(key, digest, outputs.keys())
+            rendered += 1
+        
+        self.sink.flush()
+        self._commit(self._read_offset)
+        return {
+            "upserted": len(changes) - len(deleted),
+            "deleted": len(deleted),
+            "rendered": rendered,
+            "patched": patched,
+            "offset": self.committed_offset
+        }
+    
+    def run(self, poll_interval: float = 0.2, stop_event: threading.Event = None,
+            on_flush=None):
+        """Tail the log until `stop_event` is set (or forever)"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.poll()
+            if self.due():
+                summary = self.flush()
+                if on_flush is not None:
+                    on_flush(summary)
+            stop_event.wait(poll_interval)
+    
+    def close(self):
+        self.manifest.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate pages from a product change log")
+    parser.add_argument("log", help="NDJSON change log ({'op': 'upsert'|'delete', ...} per line)")
+    parser.add_argument("--output", "-o", default="outputs", help="Output directory or NDJSON file")
+    parser.add_argument("--format", choices=("json", "ndjson", "html", "markdown"), default="json")
+    parser.add_argument("--catalog", nargs="*", help="Catalog files/globs the log applies on top of")
+    parser.add_argument("--compare-with", help="JSON file with the default comparison product")
+    parser.add_argument("--pages", help="Comma-separated page types to generate (default: all)")
+    parser.add_argument("--window", type=float, default=1.0,
+                        help="Seconds to coalesce updates before regenerating (default: 1.0)")
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--versions", help="SQLite file recording each changed page as a JSON Patch")
+    args = parser.parse_args()
+    
+    from .sinks import make_sink
+    compare_with = None
+    if args.compare_with:
+        with open(args.compare_with, "r", encoding="utf-8") as f:
+            compare_with = json.load(f)
+    
+    sink = make_sink(args.output, args.format, append=True)
+    if args.versions:
+        from .page_versions import PageVersionStore, VersionedSink
+        sink = VersionedSink(sink, PageVersionStore(args.versions))
+    consumer = ChangeFeedConsumer(args.log, sink, pages=args.pages, catalog=args.catalog,
+                                  compare_with=compare_with, window=args.window)
+    print(f"Tailing {args.log} from offset {consumer.committed_offset}")
+    
+    def report(summary):
+        print(f"offset {summary['offset']}: {summary['upserted']} upserted, "
+              f"{summary['deleted']} deleted, {summary['rendered']} pages regenerated "
+              f"({summary['patched']} patched)")
+    
+    try:
+        consumer.run(poll_interval=args.poll_interval, on_flush=report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        consumer.close()
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
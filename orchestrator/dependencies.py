@@ -0,0 +1,214 @@
+"""
+Field dependencies - Which product fields each page part reads, and
+partial re-rendering of stored pages when some of them change
+
+Blocks declare their fields in BLOCK_FIELDS, answers in ANSWER_INTENTS and
+questions in QUESTION_FIELDS. PageUpdater uses them to recompute only the
+blocks and answers whose fields changed and patch them into existing pages;
+a price-only update touches the pricing sections and the price answers.
+"""
+import functools
+import json
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from agents.faq_generation_agent import ANSWER_INTENTS, classify_intent
+from agents.question_generation_agent import QUESTION_FIELDS
+from blocks.block_cache import BLOCK_FIELDS
+from models.product import Product
+
+# Product page section -> block that renders it
+PRODUCT_SECTIONS = {
+    "overview": "generate_overview_block",
+    "benefits": "generate_benefits_block",
+    "ingredients": "generate_ingredients_block",
+    "usage": "extract_usage_block",
+    "safety": "extract_safety_block",
+    "pricing": "generate_price_block"
+}
+
+# Comparison page comparison -> block that renders it (reads both products)
+COMPARISON_SECTIONS = {
+    "ingredients": "compare_ingredients_block",
+    "benefits": "compare_benefits_block",
+    "pricing": "compare_price_block"
+}
+
+# Fields of each product copied into the comparison page's "products" summary
+COMPARISON_SUMMARY_FIELDS = ("product_name", "price", "concentration", "suitable_for")
+
+_NO_CHANGES: FrozenSet[str] = frozenset()
+
+
+def changed_fields(old: Optional[Dict], new: Optional[Dict]) -> FrozenSet[str]:
+    """
+    Product fields that differ between two product dicts (after defaults)
+    
+    Equal values of different types (10 and 10.0, 1 and True) render
+    different text, so values count as changed unless their JSON
+    encodings match too.
+    """
+    if old is None or new is None:
+        return _NO_CHANGES if old is new else frozenset(vars(Product.from_dict({})))
+    old_values, new_values = vars(Product.from_dict(old)), vars(Product.from_dict(new))
+    return frozenset(field for field, value in new_values.items() if not _same(old_values[field], value))
+
+
+def _same(old: Any, new: Any) -> bool:
+    if old.__class__ is str and new.__class__ is str:
+        return old == new
+    return old == new and json.dumps(old, ensure_ascii=False) == json.dumps(new, ensure_ascii=False)
+
+
+def answer_fields(product: Product, category: str, question: str) -> Tuple[str, ...]:
+    """Product fields the rule-based answer to one question reads"""
+    return _intent_fields(product.product_name, category, question)
+
+
+@functools.lru_cache(maxsize=8192)
+def _intent_fields(product_name: str, category: str, question: str) -> Tuple[str, ...]:
+    # Intent classification reads only the product name and the question
+    named = Product.from_dict({"product_name": product_name})
+    return ANSWER_INTENTS[classify_intent(named, category, question)][0]
+
+
+class _ReadRecorder:
+    """Product stand-in that records which attributes are read"""
+    
+    def __init__(self, product: Product, reads: Set[str]):
+        self._product = product
+        self._reads = reads
+    
+    def __getattr__(self, name: str):
+        self._reads.add(name)
+        return getattr(self._product, name)
+
+
+def traced_fields(function: Callable, *products: Product) -> Set[str]:
+    """Run `function` on the products and return the product fields it read"""
+    reads = set()
+    function(*(_ReadRecorder(product, reads) for product in products))
+    return reads
+
+
+class PageUpdater:
+    """
+    Patches stored pages after a product (or its comparison partner) changed
+    
+    Pages are updated in place; `update` returns which parts were recomputed
+    per page, and pages that need nothing are left out.
+    """
+    
+    def __init__(self, content_assembler=None, faq_generator=None):
+        if content_assembler is None:
+            from agents.content_assembly_agent import ContentAssemblyAgent
+            content_assembler = ContentAssemblyAgent()
+        if faq_generator is None:
+            from agents.faq_generation_agent import FAQGenerationAgent
+            faq_generator = FAQGenerationAgent()
+        self.content_assembler = content_assembler
+        self.faq_generator = faq_generator
+        self.question_generator = None
+    
+    def update(self, pages: Dict[str, Dict], product: Product, changed: Iterable[str],
+               partner: Product = None, partner_changed: Iterable[str] = ()) -> Dict[str, List[str]]:
+        """
+        Recompute the parts of `pages` that read a changed field
+        
+        Args:
+            pages: Stored pages by page type (patched in place)
+            product: The product as it is now
+            changed: Fields of `product` that changed since the pages were built
+            partner: Comparison partner as it is now
+            partner_changed: Fields of `partner` that changed
+            
+        Returns:
+            Page type -> recomputed parts, for pages that were modified
+        """
+        changed, partner_changed = frozenset(changed), frozenset(partner_changed)
+        updated = {}
+        if "product" in pages and changed:
+            parts = self._update_product_page(pages["product"], product, changed)
+            if parts:
+                updated["product"] = parts
+        if "faq" in pages and changed:
+            parts = self._update_faq_page(pages["faq"], product, changed)
+            if parts:
+                updated["faq"] = parts
+        if "comparison" in pages and partner is not None and (changed or partner_changed):
+            parts = self._update_comparison_page(pages["comparison"], product, changed,
+                                                 partner, partner_changed)
+            if parts:
+                updated["comparison"] = parts
+        return updated
+    
+    def _update_product_page(self, page: Dict, product: Product, changed: FrozenSet[str]) -> List[str]:
+        sections = [section for section, block in PRODUCT_SECTIONS.items()
+                    if changed.intersection(BLOCK_FIELDS[block])]
+        parts = []
+        if "product_name" in changed:
+            page["product_name"] = product.product_name
+            parts.append("product_name")
+        if sections:
+            computed = self.content_assembler.compute_blocks(
+                (product,), [PRODUCT_SECTIONS[section] for section in sections]
+            )
+            for section in sections:
+                page["sections"][section] = computed[PRODUCT_SECTIONS[section]]
+            parts.extend(f"sections.{section}" for section in sections)
+        return parts
+    
+    def _update_faq_page(self, page: Dict, product: Product, changed: FrozenSet[str]) -> List[str]:
+        if changed.intersection(QUESTION_FIELDS) or self.faq_generator.backend is not None:
+            # New question texts (and intents), or model answers that may read
+            # any field: rebuild the whole FAQ page
+            questions = self._questions(product)
+            answers = self.faq_generator.generate_answers(product, questions)
+            page.clear()
+            page.update(self.content_assembler.assemble_faq_page(product, questions, answers))
+            return ["*"]
+        
+        stale = [index for index, item in enumerate(page["faqs"])
+                 if changed.intersection(answer_fields(product, item["category"], item["question"]))]
+        if not stale:
+            return []
+        questions = [{"category": page["faqs"][index]["category"], "question": page["faqs"][index]["question"]}
+                     for index in stale]
+        for index, answer in zip(stale, self.faq_generator.generate_answers(product, questions)):
+            page["faqs"][index]["answer"] = answer
+        return [f"faqs.{index}.answer" for index in stale]
+    
+    def _questions(self, product: Product) -> List[Dict]:
+        if self.question_generator is None:
+            from agents.question_generation_agent import QuestionGenerationAgent
+            self.question_generator = QuestionGenerationAgent()
+        return self.question_generator.generate_questions(product)
+    
+    def _update_comparison_page(self, page: Dict, product: Product, changed: FrozenSet[str],
+                                partner: Product, partner_changed: FrozenSet[str]) -> List[str]:
+        both = changed | partner_changed
+        sections = [section for section, block in COMPARISON_SECTIONS.items()
+                    if both.intersection(BLOCK_FIELDS[block])]
+        summary = both.intersection(COMPARISON_SUMMARY_FIELDS)
+        if not sections and not summary:
+            return []
+        
+        # Re-render through the template, reusing the blocks that still hold
+        computed = self.content_assembler.compute_blocks(
+            (product, partner), [COMPARISON_SECTIONS[section] for section in sections]
+        )
+        comparisons = dict(page["comparisons"])
+        for section in sections:
+            comparisons[section] = computed[COMPARISON_SECTIONS[section]]
+        page.update(self.content_assembler.template_engine.render_template(
+            "comparison",
+            product_a=product,
+            product_b=partner,
+            ingredients_comparison=comparisons["ingredients"],
+            benefits_comparison=comparisons["benefits"],
+            price_comparison=comparisons["pricing"]
+        ))
+        parts = [f"comparisons.{section}" for section in sections]
+        if changed.intersection(COMPARISON_SUMMARY_FIELDS):
+            parts.append("products.product_a")
+        if partner_changed.intersection(COMPARISON_SUMMARY_FIELDS):
+            parts.append("products.product_b")
+        return parts
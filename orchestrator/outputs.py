@@ -0,0 +1,108 @@
+"""
+Page outputs - Page mapping whose pages are assembled on first access
+"""
+from collections.abc import ItemsView, ValuesView
+from typing import Callable, Dict
+
+
+class _Pending:
+    """Placeholder value of a page that has not been built yet"""
+    __slots__ = ()
+    
+    def __repr__(self):
+        return "<pending>"
+
+
+_PENDING = _Pending()
+
+
+class LazyOutputs(dict):
+    """
+    Dict of page type -> page that builds each page when it is first read
+    
+    Keys (the selected page types) are present from the start, so len(),
+    `in` and keys() never build anything. Reading a page runs its builder
+    once and memoizes the result; builders share upstream stages (questions,
+    answers) through the orchestrator, so those run only for pages that
+    need them. items(), values(), copy(), ==, json.dumps and pickling see
+    built pages, so callers that consume every page work unchanged.
+    """
+    __slots__ = ("_builders",)
+    
+    def __init__(self, builders: Dict[str, Callable[[], Dict]]):
+        super().__init__((name, _PENDING) for name in builders)
+        self._builders = dict(builders)
+    
+    def __getitem__(self, name: str) -> Dict:
+        page = dict.__getitem__(self, name)
+        if page is _PENDING:
+            page = self._builders.pop(name)()
+            dict.__setitem__(self, name, page)
+        return page
+    
+    def __setitem__(self, name: str, page: Dict):
+        self._builders.pop(name, None)
+        dict.__setitem__(self, name, page)
+    
+    def __iter__(self):
+        # Overriding __iter__ also stops dict(), {**outputs} and update()
+        # from copying placeholder values straight out of the dict storage
+        return dict.__iter__(self)
+    
+    def get(self, name: str, default=None):
+        return self[name] if name in self else default
+    
+    def items(self):
+        return ItemsView(self)
+    
+    def values(self):
+        return ValuesView(self)
+    
+    def pop(self, name: str, *default):
+        if name not in self:
+            return dict.pop(self, name, *default)
+        page = self[name]
+        dict.__delitem__(self, name)
+        return page
+    
+    def popitem(self):
+        name = next(reversed(self.keys()))
+        return name, self.pop(name)
+    
+    def setdefault(self, name: str, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+    
+    def copy(self) -> Dict[str, Dict]:
+        """Plain dict of every page (builds the pending ones)"""
+        return {name: self[name] for name in self}
+    
+    def __or__(self, other):
+        return self.copy() | other
+    
+    def __eq__(self, other):
+        self.materialize()
+        if isinstance(other, LazyOutputs):
+            other.materialize()
+        return dict.__eq__(self, other)
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    __hash__ = None
+    
+    def __reduce__(self):
+        # Builders close over agents and products: ship built pages instead
+        return dict, (self.copy(),)
+    
+    @property
+    def pending(self) -> tuple:
+        """Page types not built yet"""
+        return tuple(name for name, page in dict.items(self) if page is _PENDING)
+    
+    def materialize(self) -> "LazyOutputs":
+        """Build every pending page now; returns self"""
+        for name in self.pending:
+            self[name]
+        return self
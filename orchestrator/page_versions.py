@@ -0,0 +1,421 @@
+"""
+Page versions - RFC 6902 JSON Patch diffs of regenerated pages and a
+versioned change log consumers can sync from
+
+Every page write is compared with the stored previous version of that page;
+only a changed page gets a new version, recorded as a JSON Patch. Versions
+come from one global sequence, so a consumer keeps a single cursor and asks
+for "changes since N".
+
+Usage:
+    python main.py catalog.ndjson -o site/ --versions versions.sqlite3 [--patches-only]
+    python -m orchestrator.page_versions changes versions.sqlite3 --since 120 [--key SKU-1]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Change ops in the log: a page's first version, a patch, or a removal
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT NOT NULL,
+    page_type TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    page TEXT NOT NULL,
+    PRIMARY KEY (key, page_type)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    page_type TEXT NOT NULL,
+    op TEXT NOT NULL,
+    patch TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_key ON changes (key, version);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict]:
+    """
+    RFC 6902 patch turning `old` into `new`
+    
+    Objects are compared key by key and arrays index by index (growing or
+    shrinking at the end), so a changed answer is one "replace" of that
+    answer. Equal subtrees are skipped after C-level checks: == and, since
+    Python treats nested 1, 1.0 and True as equal, their JSON text.
+    """
+    if type(old) is type(new) and old == new:
+        if not isinstance(old, (dict, list)) or json.dumps(old) == json.dumps(new):
+            return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = []
+        for key in old:
+            if key not in new:
+                patch.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key in old:
+                patch.extend(diff(old[key], value, f"{path}/{_escape(key)}"))
+            else:
+                patch.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+        return patch
+    if isinstance(old, list) and isinstance(new, list):
+        patch = []
+        for index in range(min(len(old), len(new))):
+            patch.extend(diff(old[index], new[index], f"{path}/{index}"))
+        for index in range(len(old), len(new)):
+            patch.append({"op": "add", "path": f"{path}/{index}", "value": new[index]})
+        for index in range(len(old) - 1, len(new) - 1, -1):
+            patch.append({"op": "remove", "path": f"{path}/{index}"})
+        return patch
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _tokens(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise ValueError(f"Invalid JSON pointer '{pointer}'")
+    return [_unescape(token) for token in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, insert: bool = False) -> int:
+    if insert and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise ValueError(f"Invalid array index '{token}'")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not insert):
+        raise ValueError(f"Array index {index} out of range")
+    return index
+
+
+def _get(doc: Any, tokens: List[str]) -> Any:
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise ValueError(f"Path member '{token}' not found")
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, token)]
+        else:
+            raise ValueError(f"Cannot index into {type(doc).__name__} with '{token}'")
+    return doc
+
+
+def _set(doc: Any, tokens: List[str], op: str, value: Any = None) -> Any:
+    """Return a copy of `doc` with one add/replace/remove applied (copying only the path)"""
+    if not tokens:
+        if op == "remove":
+            raise ValueError("Cannot remove the whole document")
+        return value
+    token, rest = tokens[0], tokens[1:]
+    if isinstance(doc, dict):
+        copy = dict(doc)
+        if rest:
+            copy[token] = _set(_get(doc, [token]), rest, op, value)
+        elif op == "add":
+            copy[token] = value
+        else:
+            _get(doc, [token])
+            if op == "remove":
+                del copy[token]
+            else:
+                copy[token] = value
+        return copy
+    if isinstance(doc, list):
+        copy = list(doc)
+        if rest:
+            index = _index(doc, token)
+            copy[index] = _set(doc[index], rest, op, value)
+        elif op == "add":
+            copy.insert(_index(doc, token, insert=True), value)
+        elif op == "remove":
+            del copy[_index(doc, token)]
+        else:
+            copy[_index(doc, token)] = value
+        return copy
+    raise ValueError(f"Cannot index into {type(doc).__name__} with '{token}'")
+
+
+def apply_patch(doc: Any, patch: Iterable[Dict]) -> Any:
+    """
+    Apply an RFC 6902 patch and return the patched document
+    
+    `doc` is never modified: containers along each patched path are copied
+    and everything else is shared, which keeps pages that reference shared
+    read-only structures (template metadata) intact.
+    
+    Raises:
+        ValueError: If an operation is malformed, a path does not exist or
+            a "test" operation fails
+    """
+    for operation in patch:
+        op = operation.get("op")
+        try:
+            tokens = _tokens(operation["path"])
+            if op in ("add", "replace"):
+                doc = _set(doc, tokens, op, operation["value"])
+            elif op == "remove":
+                doc = _set(doc, tokens, op)
+            elif op in ("move", "copy"):
+                source = _tokens(operation["from"])
+                if op == "move" and tokens[:len(source)] == source and tokens != source:
+                    raise ValueError("Cannot move a value into one of its children")
+                value = _get(doc, source)
+                if op == "move":
+                    doc = _set(doc, source, "remove")
+                doc = _set(doc, tokens, "add", value)
+            elif op == "test":
+                if _get(doc, tokens) != operation["value"]:
+                    raise ValueError(f"Test failed at '{operation['path']}'")
+            else:
+                raise ValueError(f"Unknown patch op '{op}'")
+        except KeyError as e:
+            raise ValueError(f"Patch operation {op!r} is missing {e}")
+    return doc
+
+
+class PageVersionStore:
+    """
+    Latest version of every page plus the log of changes between versions
+    
+    Backed by SQLite; each call opens its own connection, so pool workers
+    and request threads can share one file.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+    
+    @classmethod
+    def from_env(cls) -> Optional['PageVersionStore']:
+        """Store at PAGE_VERSION_STORE (a SQLite path), or None when unset"""
+        path = os.environ.get("PAGE_VERSION_STORE")
+        return cls(path) if path else None
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A fresh autocommit connection, closed (rolling back any open transaction) on exit"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def record(self, key: str, outputs: Dict[str, Dict]) -> Dict[str, int]:
+        """
+        Store new versions of a product's pages
+        
+        Returns:
+            Page type -> new version, for pages that actually changed
+        """
+        texts = {page_type: json.dumps(page, ensure_ascii=False, separators=(",", ":"))
+                 for page_type, page in outputs.items()}
+        versions = {}
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = {row["page_type"]: row["page"] for row in conn.execute(
+                "SELECT page_type, page FROM pages WHERE key = ?", (key,))}
+            now = time.time()
+            for page_type, text in texts.items():
+                previous = stored.get(page_type)
+                if previous == text:
+                    continue
+                if previous is None:
+                    op, patch = CREATE, [{"op": "add", "path": "", "value": outputs[page_type]}]
+                else:
+                    op, patch = UPDATE, diff(json.loads(previous), outputs[page_type])
+                    if not patch:
+                        continue
+                version = conn.execute(
+                    "INSERT INTO changes (key, page_type, op, patch, created) VALUES (?, ?, ?, ?, ?)",
+                    (key, page_type, op, json.dumps(patch, ensure_ascii=False, separators=(",", ":")), now)
+                ).lastrowid
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (key, page_type, version, page) VALUES (?, ?, ?, ?)",
+                    (key, page_type, version, text)
+                )
+                versions[page_type] = version
+            conn.execute("COMMIT")
+        return versions
+    
+    def remove(self, key: str, page_types: Iterable[str] = None) -> Dict[str, int]:
+        """Record the removal of some (default: all) of a product's pages"""
+        versions = {}
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            stored = [row["page_type"] for row in conn.execute(
+                "SELECT page_type FROM pages WHERE key = ? ORDER BY page_type", (key,))]
+            now = time.time()
+            for page_type in stored:
+                if page_types is not None and page_type not in page_types:
+                    continue
+                versions[page_type] = conn.execute(
+                    "INSERT INTO changes (key, page_type, op, patch, created) VALUES (?, ?, ?, NULL, ?)",
+                    (key, page_type, DELETE, now)
+                ).lastrowid
+                conn.execute("DELETE FROM pages WHERE key = ? AND page_type = ?", (key, page_type))
+            conn.execute("COMMIT")
+        return versions
+    
+    def page(self, key: str, page_type: str) -> Optional[Tuple[int, Dict]]:
+        """(version, page) of the latest version of a page, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT version, page FROM pages WHERE key = ? AND page_type = ?",
+                               (key, page_type)).fetchone()
+        return (row["version"], json.loads(row["page"])) if row is not None else None
+    
+    def _pruned(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE name = 'pruned'").fetchone()
+        return row["value"] if row is not None else 0
+    
+    def version(self) -> int:
+        """Newest version in the store (0 when empty)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(version) AS version FROM changes").fetchone()
+            return max(row["version"] or 0, self._pruned(conn))
+    
+    def changes(self, since: int = 0, key: str = None, limit: int = 1000) -> Dict:
+        """
+        Changes after version `since`, oldest first
+        
+        Returns:
+            {"since", "version", "more", "reset", "changes": [{"version", "key",
+            "page_type", "op", "patch"}]}. Continue with since=version while
+            "more" is true. "reset" means changes after `since` were pruned:
+            resync from full pages (page()) instead.
+        """
+        query = "SELECT version, key, page_type, op, patch FROM changes WHERE version > ?"
+        args = [since]
+        if key is not None:
+            query += " AND key = ?"
+            args.append(key)
+        query += " ORDER BY version LIMIT ?"
+        args.append(limit + 1)
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+            pruned = self._pruned(conn)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        changes = [{
+            "version": row["version"],
+            "key": row["key"],
+            "page_type": row["page_type"],
+            "op": row["op"],
+            "patch": json.loads(row["patch"]) if row["patch"] is not None else None
+        } for row in rows]
+        return {
+            "since": since,
+            "version": changes[-1]["version"] if changes else max(since, pruned),
+            "more": more,
+            "reset": since < pruned,
+            "changes": changes
+        }
+    
+    def prune(self, through: int) -> int:
+        """Drop changes up to and including version `through`; returns rows deleted"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.execute("DELETE FROM changes WHERE version <= ?", (through,)).rowcount
+            conn.execute(
+                "INSERT INTO meta (name, value) VALUES ('pruned', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)",
+                (through,)
+            )
+            conn.execute("COMMIT")
+        return deleted
+
+
+class VersionedSink:
+    """
+    Sink wrapper that records a version (JSON Patch) for every changed page
+    
+    Pages still go to the wrapped sink unless `patches_only` is set; then the
+    store alone holds them, and reading pages back (for partial re-renders)
+    comes from the store.
+    """
+    
+    def __init__(self, sink, store: PageVersionStore, patches_only: bool = False):
+        self.sink = sink
+        self.store = store
+        self.patches_only = patches_only
+    
+    def __getattr__(self, name: str):
+        # Everything else (manifest_path, location, flush, ...) is the wrapped sink's
+        if name == "sink":
+            raise AttributeError(name)
+        return getattr(self.sink, name)
+    
+    def write(self, key: str, outputs: Dict[str, Dict]):
+        self.store.record(key, outputs)
+        if not self.patches_only:
+            self.sink.write(key, outputs)
+    
+    def read(self, key: str, page_type: str) -> Optional[Dict]:
+        if self.patches_only or not hasattr(self.sink, "read"):
+            stored = self.store.page(key, page_type)
+            return stored[1] if stored is not None else None
+        return self.sink.read(key, page_type)
+    
+    def discard(self, key: str, page_type: str):
+        self.store.remove(key, [page_type])
+        if not self.patches_only:
+            self.sink.discard(key, page_type)
+    
+    def delete(self, key: str):
+        self.store.remove(key)
+        if not self.patches_only:
+            self.sink.delete(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the page version log")
+    commands = parser.add_subparsers(dest="command", required=True)
+    changes_parser = commands.add_parser("changes", help="Print changes after a version as NDJSON")
+    changes_parser.add_argument("store", help="Page version store (SQLite file)")
+    changes_parser.add_argument("--since", type=int, default=0)
+    changes_parser.add_argument("--key", help="Only changes of this product")
+    changes_parser.add_argument("--limit", type=int, default=1000)
+    prune_parser = commands.add_parser("prune", help="Drop changes up to a version")
+    prune_parser.add_argument("store")
+    prune_parser.add_argument("--through", type=int, required=True)
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.store):
+        parser.error(f"No page version store at {args.store}")
+    store = PageVersionStore(args.store)
+    if args.command == "prune":
+        print(f"Pruned {store.prune(args.through)} changes")
+        return
+    result = store.changes(args.since, key=args.key, limit=args.limit)
+    for change in result["changes"]:
+        print(json.dumps(change, ensure_ascii=False))
+    print(json.dumps({"version": result["version"], "more": result["more"], "reset": result["reset"]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Page selection - Page types and selector parsing shared by the pipeline and API
+"""
+from typing import Iterable, Optional, Tuple, Union
+
+
+# Page types the pipeline can assemble, in output order
+PAGE_TYPES = ("faq", "product", "comparison")
+
+
+def parse_pages(pages: Optional[Union[str, Iterable[str]]] = None) -> Tuple[str, ...]:
+    """
+    Normalize a page selector into a tuple of page types
+    
+    Args:
+        pages: Comma-separated string ("product,faq") or iterable of page
+            names. None or empty selects every page.
+            
+    Returns:
+        Tuple of selected page types in pipeline order
+        
+    Raises:
+        ValueError: If an unknown page type is requested
+    """
+    if pages is None:
+        return PAGE_TYPES
+    if isinstance(pages, str):
+        pages = pages.split(",")
+    
+    selected = {str(page).strip().lower() for page in pages}
+    selected.discard("")
+    if not selected:
+        return PAGE_TYPES
+    
+    unknown = selected - set(PAGE_TYPES)
+    if unknown:
+        raise ValueError(
+            f"Unknown page type(s): {', '.join(sorted(unknown))}. "
+            f"Expected any of: {', '.join(PAGE_TYPES)}"
+        )
+    return tuple(page for page in PAGE_TYPES if page in selected)
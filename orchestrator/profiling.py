@@ -0,0 +1,156 @@
+"""
+Profiling - cProfile and per-stage tracemalloc artifacts for pipeline runs
+
+Enable for the CLI with `python main.py --profile`, for any orchestrator
+with CONTENT_PROFILE=1, and for a sampled fraction of API requests with
+GENERATE_PROFILE_SAMPLE_RATE (0.0-1.0). Artifacts go to CONTENT_PROFILE_DIR
+(default: profiles/):
+
+    <label>-<timestamp>-<id>.pstats            cProfile stats (pstats / snakeviz)
+    <label>-<timestamp>-<id>.allocations.json  top allocations per stage
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+# tracemalloc is process-wide: concurrent users (debug probes, profiled
+# requests) share one tracing session, started by the first and stopped by
+# the last. Tracing started outside this module is left running.
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def acquire_tracing():
+    """Register a tracemalloc user, starting tracing if it is not running"""
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def release_tracing():
+    """Unregister a tracemalloc user; the last one stops tracing it started"""
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users = max(0, _tracing_users - 1)
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class ProfileRun:
+    """One profiled pipeline run: a cProfile session plus stage allocation snapshots"""
+    
+    def __init__(self, output_dir: str, label: str, top: int):
+        self.output_dir = output_dir
+        self.label = label
+        self.top = top
+        self.stages = {}
+        self.id = f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self._profile = cProfile.Profile()
+        self._tracing = False
+    
+    def start(self):
+        acquire_tracing()
+        self._tracing = True
+        self._profile.enable()
+    
+    @contextmanager
+    def stage(self, name: str):
+        """Record the top allocation sites of a pipeline stage"""
+        # Snapshots are expensive; keep them out of the cProfile stats
+        self._profile.disable()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            self.stages[name] = {
+                "peak_traced_bytes": peak,
+                "top_allocations": self._top_allocations(after.compare_to(before, "lineno"))
+            }
+            self._profile.enable()
+    
+    def _top_allocations(self, diff) -> List[Dict]:
+        allocations = []
+        for stat in diff:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            if frame.filename == tracemalloc.__file__:
+                continue
+            allocations.append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_diff_bytes": stat.size_diff,
+                "count_diff": stat.count_diff
+            })
+            if len(allocations) >= self.top:
+                break
+        return allocations
+    
+    def stop(self) -> Dict[str, str]:
+        """
+        Stop profiling and write the artifacts
+        
+        Returns:
+            Paths of the written .pstats and allocation files
+        """
+        self._profile.disable()
+        if self._tracing:
+            self._tracing = False
+            release_tracing()
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, self.id)
+        pstats_path = base + ".pstats"
+        allocations_path = base + ".allocations.json"
+        self._profile.dump_stats(pstats_path)
+        with open(allocations_path, "w", encoding="utf-8") as f:
+            json.dump({"run": self.id, "stages": self.stages}, f, indent=2)
+        return {"pstats": pstats_path, "allocations": allocations_path}
+
+
+class PipelineProfiler:
+    """Factory for ProfileRun objects, shared by an orchestrator across runs"""
+    
+    def __init__(self, output_dir: str = None, top: int = 15, label: str = None):
+        self.output_dir = output_dir or os.environ.get("CONTENT_PROFILE_DIR", DEFAULT_PROFILE_DIR)
+        self.top = top
+        self.label = label
+    
+    @classmethod
+    def from_env(cls) -> Optional['PipelineProfiler']:
+        """A profiler when CONTENT_PROFILE is set, else None"""
+        return cls() if _env_flag("CONTENT_PROFILE") else None
+    
+    def start_run(self, label: str = "pipeline") -> ProfileRun:
+        run = ProfileRun(self.output_dir, self.label or label, self.top)
+        run.start()
+        return run
+
+
+def sample_rate() -> float:
+    """Fraction of API requests to profile (GENERATE_PROFILE_SAMPLE_RATE)"""
+    try:
+        return min(1.0, max(0.0, float(os.environ.get("GENERATE_PROFILE_SAMPLE_RATE", "0"))))
+    except ValueError:
+        return 0.0
@@ -0,0 +1,310 @@
+"""
+Sharding - Stable hash partitions of a catalog and the merge step
+
+Every shard reads the same catalog but renders only the products whose key
+hashes into its partition, so comparison partners in other shards are still
+resolved from the input. Each shard's manifest starts with a header naming
+its partition and output, and records per product the input fingerprint of
+its comparison partner. `merge` checks that all N shards are present,
+combines their outputs and manifests, and finds comparison pages whose
+partner changed between shard runs (re-rendering them when given the
+catalog).
+
+Usage:
+    python main.py catalog.ndjson --shard 0/4 -o out/shard-0    (one per node)
+    python -m orchestrator.sharding merge out/shard-* -o site/ [--catalog catalog.ndjson]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from .catalog import fingerprint, iter_catalog, product_key
+
+
+def parse_shard(shard: Union[str, Tuple[int, int], None]) -> Optional[Tuple[int, int]]:
+    """
+    Parse "i/N" (or an (i, N) tuple) into (i, N); None means unsharded
+    
+    Raises:
+        ValueError: If the selector is malformed or i is not in [0, N)
+    """
+    if shard is None:
+        return None
+    if isinstance(shard, str):
+        try:
+            index, count = (int(part) for part in shard.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{shard}'. Expected i/N, e.g. 0/4")
+    else:
+        index, count = shard
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {index}/{count}: need 0 <= i < N")
+    return index, count
+
+
+def shard_of(key: str, count: int) -> int:
+    """Stable partition of a product key (independent of PYTHONHASHSEED and platform)"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def _manifest_path(path: str) -> str:
+    """Accept a manifest file, a directory-sink output directory or an NDJSON output file"""
+    if os.path.isdir(path):
+        return os.path.join(path, "manifest.ndjson")
+    if os.path.exists(path + ".manifest.ndjson"):
+        return path + ".manifest.ndjson"
+    return path
+
+
+def read_manifest(path: str) -> Tuple[Dict, Dict[str, Dict]]:
+    """Return (header, entries by key) of a manifest, last record per key winning"""
+    header = {}
+    entries = {}
+    with open(_manifest_path(path), "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "key" not in entry:
+                header = entry
+            elif entry.get("deleted"):
+                entries.pop(entry["key"], None)
+            else:
+                entries[entry["key"]] = entry
+    return header, entries
+
+
+def _shard_output(path: str, header: Dict) -> str:
+    """
+    Local location of a shard's pages, found from the path given to merge
+    
+    The header records where the shard node wrote them, but shard outputs
+    are usually copied to the merge host, so only the given path is used:
+    the output directory itself, the NDJSON file, or the manifest beside it.
+    
+    Raises:
+        ValueError: If the pages are not where the path says
+    """
+    if os.path.isdir(path):
+        output = path
+    elif os.path.exists(path + ".manifest.ndjson"):
+        output = path
+    elif header["format"] == "ndjson" and path.endswith(".manifest.ndjson"):
+        output = path[:-len(".manifest.ndjson")]
+    else:
+        output = os.path.dirname(os.path.abspath(path))
+    is_file = header["format"] == "ndjson"
+    if not (os.path.isfile(output) if is_file else os.path.isdir(output)):
+        raise ValueError(f"Pages of shard {header['shard']}/{header['shards']} not found at {output}")
+    return output
+
+
+def _link_directory_pages(source: str, sink, entries: Dict[str, Dict]):
+    """
+    Hard-link (or copy) product directories into a merged directory sink
+    
+    Raises:
+        ValueError: If a page the manifest records is missing
+    """
+    from .sinks import PAGE_FILENAMES, slugify
+    for key, entry in entries.items():
+        src = os.path.join(source, slugify(key))
+        for page_type in entry["pages"]:
+            if not os.path.exists(os.path.join(src, PAGE_FILENAMES[page_type] + sink.extension)):
+                raise ValueError(f"Shard output {source} is missing the {page_type} page of '{key}'")
+        dst = sink.product_dir(key)
+        os.makedirs(dst, exist_ok=True)
+        for name in os.listdir(src):
+            target = os.path.join(dst, name)
+            if os.path.exists(target):
+                os.remove(target)
+            try:
+                os.link(os.path.join(src, name), target)
+            except OSError:
+                shutil.copy2(os.path.join(src, name), target)
+
+
+def _shard_outputs(header: Dict, entries: Dict[str, Dict]) -> Iterable[Tuple[str, Dict]]:
+    """Yield (key, outputs) for every product a shard rendered"""
+    from .sinks import DirectorySink
+    if header["format"] == "json":
+        source = DirectorySink(header["output"])
+        for key, entry in entries.items():
+            outputs = {}
+            for page_type in entry["pages"]:
+                path = source.page_path(key, page_type)
+                if not os.path.exists(path):
+                    raise ValueError(f"Shard output {header['output']} is missing the {page_type} page of '{key}'")
+                with open(path, "r", encoding="utf-8") as f:
+                    outputs[page_type] = json.load(f)
+            yield key, outputs
+        return
+    latest = {}
+    with open(header["output"], "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                latest[record["key"]] = record
+    for key in entries:
+        record = latest.get(key)
+        if record is None or record.get("deleted"):
+            raise ValueError(f"Shard output {header['output']} has no pages for '{key}'")
+        yield key, record["outputs"]
+
+
+def merge(shard_paths: List[str], output: str, output_format: str = None,
+          catalog: Union[str, Iterable[str], None] = None) -> Dict:
+    """
+    Combine shard outputs and manifests
+    
+    Args:
+        shard_paths: Shard output directories, NDJSON output files or their
+            manifests; pages are read from there, wherever the shards ran
+        output: Merged output directory (json, html, markdown) or file (ndjson)
+        output_format: Defaults to the shards' format
+        catalog: Catalog to re-render stale cross-shard comparisons from
+        
+    Returns:
+        Report with products, shards, cross_shard, stale, rerendered, dangling
+        
+    Raises:
+        ValueError: If shards are missing, duplicated, overlapping or inconsistent
+    """
+    from .batch import Manifest
+    from .sinks import DIRECTORY_FORMATS, make_sink
+    
+    shards = {}
+    for path in shard_paths:
+        header, entries = read_manifest(path)
+        if "shard" not in header:
+            raise ValueError(f"{path} is not a shard manifest")
+        index, count = header["shard"], header["shards"]
+        if index in shards:
+            raise ValueError(f"Shard {index}/{count} given twice")
+        shards[index] = (dict(header, output=_shard_output(path, header)), entries)
+    
+    counts = {header["shards"] for header, _ in shards.values()}
+    if len(counts) != 1:
+        raise ValueError(f"Shards come from different partitionings: {sorted(counts)}")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - set(shards))
+    if missing:
+        raise ValueError(f"Missing shards: {', '.join(f'{i}/{count}' for i in missing)}")
+    formats = {header["format"] for header, _ in shards.values()}
+    output_format = output_format or (formats.pop() if len(formats) == 1 else "json")
+    for header, _ in shards.values():
+        if header["format"] not in ("json", "ndjson", output_format):
+            # HTML/Markdown pages cannot be read back into page dicts
+            raise ValueError(f"Cannot merge {header['format']} shards into {output_format} output")
+    
+    # Global index: key -> (shard, manifest entry)
+    owners: Dict[str, Tuple[int, Dict]] = {}
+    for index, (_, entries) in sorted(shards.items()):
+        for key, entry in entries.items():
+            if key in owners:
+                raise ValueError(f"Product '{key}' appears in shards {owners[key][0]} and {index}")
+            owners[key] = (index, entry)
+    
+    # Comparison pages whose partner lives in another shard must have been
+    # rendered from the same partner data that shard saw
+    cross_shard, stale, dangling = [], [], []
+    for key, (index, entry) in owners.items():
+        partner = entry.get("partner")
+        if partner is None:
+            continue
+        owner = owners.get(partner)
+        if owner is None:
+            dangling.append(key)
+            continue
+        if owner[0] != index:
+            cross_shard.append(key)
+        if owner[1].get("input") != entry.get("partner_input"):
+            stale.append(key)
+    
+    sink = make_sink(output, output_format)
+    manifest = Manifest(sink.manifest_path)
+    try:
+        for index, (header, entries) in sorted(shards.items()):
+            if header["format"] == output_format and output_format in DIRECTORY_FORMATS:
+                _link_directory_pages(header["output"], sink, entries)
+            else:
+                for key, outputs in _shard_outputs(header, entries):
+                    sink.write(key, outputs)
+            for key, entry in entries.items():
+                manifest.record(key, entry["fingerprint"], entry["pages"],
+                                **{name: entry[name] for name in ("input", "partner", "partner_input") if name in entry})
+        
+        rerendered = 0
+        if stale and catalog:
+            rerendered = _rerender_comparisons(stale, owners, catalog, sink, manifest)
+    finally:
+        sink.close()
+        manifest.close()
+    
+    return {
+        "products": len(owners),
+        "shards": count,
+        "cross_shard": len(cross_shard),
+        "stale": sorted(stale),
+        "rerendered": rerendered,
+        "dangling": sorted(dangling)
+    }
+
+
+def _rerender_comparisons(keys: List[str], owners: Dict, catalog, sink, manifest) -> int:
+    """Render fresh pages for products whose comparison partner changed"""
+    from .batch import output_fingerprint
+    from .workflow import WorkflowOrchestrator
+    
+    wanted = set(keys) | {owners[key][1]["partner"] for key in keys}
+    products = {}
+    for data in iter_catalog(catalog):
+        key = product_key(data)
+        if key in wanted:
+            products[key] = data
+    
+    orchestrator = WorkflowOrchestrator()
+    rendered = 0
+    for key in keys:
+        data = products.get(key)
+        partner = products.get(owners[key][1]["partner"])
+        if data is None or partner is None:
+            continue
+        pages = owners[key][1]["pages"]
+        outputs = orchestrator.execute_pipeline_from_data(data, partner, pages=pages)["outputs"]
+        sink.write(key, outputs)
+        manifest.record(key, output_fingerprint(data, partner, pages), outputs.keys(),
+                        input=fingerprint(data), partner=owners[key][1]["partner"],
+                        partner_input=fingerprint(partner))
+        rendered += 1
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge sharded batch outputs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge_parser = commands.add_parser("merge", help="Combine shard outputs and manifests")
+    merge_parser.add_argument("shards", nargs="+", help="Shard outputs (directories or NDJSON files) or their manifests")
+    merge_parser.add_argument("--output", "-o", required=True, help="Merged output directory or NDJSON file")
+    merge_parser.add_argument("--format", choices=("json", "ndjson", "html", "markdown"), help="Default: the shards' format")
+    merge_parser.add_argument("--catalog", nargs="*", help="Catalog to re-render stale cross-shard comparisons")
+    args = parser.parse_args()
+    
+    try:
+        report = merge(args.shards, args.output, args.format, args.catalog)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(json.dumps(report, indent=2))
+    unresolved = len(report["stale"]) - report["rerendered"]
+    if unresolved:
+        print(f"{unresolved} comparison pages are stale; pass --catalog to re-render them", file=sys.stderr)
+    sys.exit(1 if unresolved else 0)
+
+
+if __name__ == "__main__":
+    main()
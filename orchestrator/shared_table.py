@@ -0,0 +1,169 @@
+"""
+Shared product table - Catalog rows in shared memory for process-pool workers
+
+The parent encodes every product to render once into a
+multiprocessing.shared_memory block. Workers attach by name and decode rows
+in place by index, so a task is just an index range and nothing but a short
+status list is pickled back (pages go straight to the sink).
+
+Layout (little-endian):
+    header   magic "PTB1", row count (uint32)
+    offsets  (count + 1) x uint64, byte offset of each row
+    rows     flag (uint8), partner row (int32, -1 = none), key, digest, then
+             either the eight Product fields (compact) or one JSON document
+
+Strings are uint32 length + UTF-8 (length 0xFFFFFFFF encodes None), lists
+are a uint16 count of strings. Rows whose values are not plain strings
+(e.g. a numeric price) fall back to JSON so they decode unchanged.
+"""
+import json
+import struct
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Optional, Tuple
+
+_MAGIC = b"PTB1"
+_HEADER = struct.Struct("<4sI")
+_OFFSET = struct.Struct("<Q")
+_ROW = struct.Struct("<Bi")
+_LEN = struct.Struct("<I")
+_COUNT = struct.Struct("<H")
+_NONE = 0xFFFFFFFF
+
+_COMPACT = 0
+_JSON = 1
+
+_STRING_FIELDS = ("product_name", "concentration", "suitable_for")
+_LIST_FIELDS = ("key_ingredients", "benefits")
+_TAIL_FIELDS = ("how_to_use", "side_effects", "price")
+
+
+def _put_str(out: bytearray, value: Optional[str]):
+    if value is None:
+        out += _LEN.pack(_NONE)
+        return
+    data = value.encode("utf-8")
+    out += _LEN.pack(len(data))
+    out += data
+
+
+def _compactable(data: Dict) -> bool:
+    for field in _STRING_FIELDS + ("how_to_use", "price"):
+        if not isinstance(data.get(field, ""), str):
+            return False
+    if not isinstance(data.get("side_effects"), (str, type(None))):
+        return False
+    for field in _LIST_FIELDS:
+        values = data.get(field, [])
+        if not isinstance(values, list) or len(values) > 0xFFFF or not all(isinstance(v, str) for v in values):
+            return False
+    return True
+
+
+def encode_row(key: str, digest: str, data: Dict, partner: int = -1) -> bytes:
+    """Encode one product row"""
+    compact = _compactable(data)
+    out = bytearray(_ROW.pack(_COMPACT if compact else _JSON, partner))
+    _put_str(out, key)
+    _put_str(out, digest)
+    if not compact:
+        _put_str(out, json.dumps(data, ensure_ascii=False))
+        return bytes(out)
+    for field in _STRING_FIELDS:
+        _put_str(out, data.get(field, ""))
+    for field in _LIST_FIELDS:
+        values = data.get(field, [])
+        out += _COUNT.pack(len(values))
+        for value in values:
+            _put_str(out, value)
+    _put_str(out, data.get("how_to_use", ""))
+    _put_str(out, data.get("side_effects"))
+    _put_str(out, data.get("price", ""))
+    return bytes(out)
+
+
+class SharedProductTable:
+    """Read-only product rows in a shared memory block"""
+    
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self._buf = shm.buf
+        magic, self.count = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Shared memory block '{shm.name}' is not a product table")
+    
+    @property
+    def name(self) -> str:
+        return self.shm.name
+    
+    @classmethod
+    def build(cls, rows: Iterable[bytes]) -> 'SharedProductTable':
+        """Copy encoded rows (see encode_row) into a new shared memory block"""
+        rows = list(rows)
+        offsets = []
+        position = _HEADER.size + _OFFSET.size * (len(rows) + 1)
+        for row in rows:
+            offsets.append(position)
+            position += len(row)
+        offsets.append(position)
+        
+        shm = shared_memory.SharedMemory(create=True, size=max(position, 1))
+        buf = shm.buf
+        _HEADER.pack_into(buf, 0, _MAGIC, len(rows))
+        for i, offset in enumerate(offsets):
+            _OFFSET.pack_into(buf, _HEADER.size + i * _OFFSET.size, offset)
+        for row, offset in zip(rows, offsets):
+            buf[offset:offset + len(row)] = row
+        return cls(shm, owner=True)
+    
+    @classmethod
+    def attach(cls, name: str) -> 'SharedProductTable':
+        """Open a table created by another process"""
+        # Pool workers share the parent's resource tracker, so attaching here
+        # does not hand ownership of the block to the worker
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _str(self, position: int) -> Tuple[Optional[str], int]:
+        (length,) = _LEN.unpack_from(self._buf, position)
+        position += _LEN.size
+        if length == _NONE:
+            return None, position
+        return str(self._buf[position:position + length], "utf-8"), position + length
+    
+    def row(self, index: int) -> Tuple[str, str, Dict, int]:
+        """Decode row `index` into (key, digest, product dict, partner row)"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        (position,) = _OFFSET.unpack_from(self._buf, _HEADER.size + index * _OFFSET.size)
+        flag, partner = _ROW.unpack_from(self._buf, position)
+        position += _ROW.size
+        key, position = self._str(position)
+        digest, position = self._str(position)
+        if flag == _JSON:
+            document, _ = self._str(position)
+            return key, digest, json.loads(document), partner
+        
+        data = {}
+        for field in _STRING_FIELDS:
+            data[field], position = self._str(position)
+        for field in _LIST_FIELDS:
+            (count,) = _COUNT.unpack_from(self._buf, position)
+            position += _COUNT.size
+            values = []
+            for _ in range(count):
+                value, position = self._str(position)
+                values.append(value)
+            data[field] = values
+        for field in _TAIL_FIELDS:
+            data[field], position = self._str(position)
+        return key, digest, data, partner
+    
+    def close(self):
+        """Detach; the creating process also frees the block"""
+        self._buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
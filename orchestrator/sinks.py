@@ -0,0 +1,211 @@
+"""
+Output sinks - Where batch runs write generated pages
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Optional
+
+# File name for each page type in directory outputs (matches save_outputs)
+PAGE_FILENAMES = {
+    "faq": "faq",
+    "product": "product_page",
+    "comparison": "comparison_page"
+}
+
+
+def slugify(key: str) -> str:
+    """Filesystem-safe directory name for a product key"""
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "-", key).strip("-.") or "product"
+    if slug != key:
+        # Keep distinct keys distinct after normalization
+        slug += "-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+    return slug
+
+
+class DirectorySink:
+    """One directory per product: <output_dir>/<slug>/faq.json, product_page.json, ..."""
+    
+    format = "json"
+    extension = ".json"
+    
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+    
+    @property
+    def location(self) -> str:
+        return self.output_dir
+    
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.output_dir, "manifest.ndjson")
+    
+    def product_dir(self, key: str) -> str:
+        return os.path.join(self.output_dir, slugify(key))
+    
+    def page_path(self, key: str, page_type: str) -> str:
+        return os.path.join(self.product_dir(key), PAGE_FILENAMES[page_type] + self.extension)
+    
+    def write(self, key: str, outputs: Dict[str, Dict]):
+        """Write every page of one product"""
+        os.makedirs(self.product_dir(key), exist_ok=True)
+        for page_type, page in outputs.items():
+            self.write_page(self.page_path(key, page_type), page)
+    
+    def read(self, key: str, page_type: str) -> Optional[Dict]:
+        """A stored page, or None if it was never written"""
+        try:
+            with open(self.page_path(key, page_type), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def write_page(self, path: str, page: Dict):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(page, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    
+    def discard(self, key: str, page_type: str):
+        """Remove one page of a product (e.g. a comparison whose partner is gone)"""
+        path = self.page_path(key, page_type)
+        if os.path.exists(path):
+            os.remove(path)
+    
+    def delete(self, key: str):
+        """Remove a product's pages"""
+        product_dir = self.product_dir(key)
+        if os.path.isdir(product_dir):
+            for name in os.listdir(product_dir):
+                os.remove(os.path.join(product_dir, name))
+            os.rmdir(product_dir)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+class RenderedPageSink(DirectorySink):
+    """
+    Directory sink writing HTML or Markdown pages (faq.html, product_page.md, ...)
+    
+    Pages are streamed to the file as they are rendered (templates.streaming).
+    Rendered pages cannot be read back, so change feeds re-render instead of
+    patching them.
+    """
+    
+    def __init__(self, output_dir: str, output_format: str):
+        from templates.streaming import get_renderer
+        self.renderer = get_renderer(output_format)
+        self.format = self.renderer.format
+        self.extension = self.renderer.extension
+        super().__init__(output_dir)
+    
+    def write(self, key: str, outputs: Dict[str, Dict]):
+        os.makedirs(self.product_dir(key), exist_ok=True)
+        for page_type, page in outputs.items():
+            path = self.page_path(key, page_type)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                self.renderer.render(page, f.write)
+            os.replace(tmp_path, path)
+    
+    def read(self, key: str, page_type: str) -> Optional[Dict]:
+        return None
+
+
+class NDJSONSink:
+    """
+    All products in one NDJSON file: {"key": ..., "outputs": {...}} per line
+    
+    Lines are buffered and flushed as one write() on an O_APPEND descriptor,
+    so several worker processes can append to the same file without tearing
+    lines. Pickling a sink reopens it for appending in the other process.
+    """
+    
+    format = "ndjson"
+    flush_size = 1 << 20
+    
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not append:
+            open(path, "wb").close()
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._pending = []
+        self._pending_size = 0
+    
+    def __getstate__(self):
+        return {"path": self.path}
+    
+    def __setstate__(self, state):
+        self.__init__(state["path"], append=True)
+    
+    @property
+    def location(self) -> str:
+        return self.path
+    
+    @property
+    def manifest_path(self) -> str:
+        return self.path + ".manifest.ndjson"
+    
+    def _append(self, record: Dict):
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._pending.append(line)
+        self._pending_size += len(line)
+        if self._pending_size >= self.flush_size:
+            self.flush()
+    
+    def write(self, key: str, outputs: Dict[str, Dict]):
+        self._append({"key": key, "outputs": outputs})
+    
+    def discard(self, key: str, page_type: str):
+        """Nothing to do: a product's newest record replaces all earlier ones"""
+    
+    def delete(self, key: str):
+        """Record a tombstone; readers keep the last record per key"""
+        self._append({"key": key, "deleted": True})
+    
+    def flush(self):
+        data = memoryview(b"".join(self._pending))
+        self._pending = []
+        self._pending_size = 0
+        while data:
+            data = data[os.write(self._fd, data):]
+    
+    def close(self):
+        if self._fd is not None:
+            self.flush()
+            os.close(self._fd)
+            self._fd = None
+
+
+SINK_FORMATS = ("json", "ndjson", "html", "markdown")
+# Formats written as one file per page under <output_dir>/<slug>/
+DIRECTORY_FORMATS = ("json", "html", "markdown")
+
+
+def make_sink(output: str, output_format: str = "json", append: bool = False):
+    """
+    Create a sink for a batch run
+    
+    Args:
+        output: Output directory (json, html, markdown) or file path (ndjson)
+        output_format: One of SINK_FORMATS
+        append: Keep existing NDJSON records (for resumed/incremental runs)
+    """
+    if output_format == "json":
+        return DirectorySink(output)
+    if output_format == "ndjson":
+        if os.path.isdir(output) or not output.endswith((".ndjson", ".jsonl")):
+            output = os.path.join(output, "pages.ndjson")
+        return NDJSONSink(output, append=append)
+    if output_format in DIRECTORY_FORMATS:
+        return RenderedPageSink(output, output_format)
+    raise ValueError(f"Unknown output format '{output_format}'. Expected any of: {', '.join(SINK_FORMATS)}")
@@ -1,9 +1,15 @@
 """
 Orchestrator - Coordinates the multi-agent workflow
 """
+import functools
 import json
-from typing import Dict
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Union
 from models.product import Product
+from .outputs import LazyOutputs
+from .pages import PAGE_TYPES, parse_pages
+from .profiling import PipelineProfiler
 from agents import (
     DataParserAgent,
     QuestionGenerationAgent,
@@ -12,6 +18,28 @@ from agents import (
 )
 
 
+def _profiled(label: str):
+    """Profile a pipeline method when the orchestrator has a profiler"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.profiler is None:
+                return method(self, *args, **kwargs)
+            run = self._profile_run = self.profiler.start_run(label)
+            try:
+                results = method(self, *args, **kwargs)
+                # Build lazy pages inside the run so their stages are profiled
+                if isinstance(results.get("outputs"), LazyOutputs):
+                    results["outputs"].materialize()
+            finally:
+                self._profile_run = None
+                artifacts = run.stop()
+            results["profile"] = artifacts
+            return results
+        return wrapper
+    return decorator
+
+
 class WorkflowOrchestrator:
     """
     Orchestrator that coordinates multiple agents in a pipeline workflow
@@ -23,7 +51,7 @@ class WorkflowOrchestrator:
     4. ContentAssemblyAgent: Assemble pages
     """
     
-    def __init__(self):
+    def __init__(self, profiler: Optional[PipelineProfiler] = None):
         self.name = "WorkflowOrchestrator"
         
         # Initialize agents
@@ -31,64 +59,99 @@ class WorkflowOrchestrator:
         self.question_generator = QuestionGenerationAgent()
         self.faq_generator = FAQGenerationAgent()
         self.content_assembler = ContentAssemblyAgent()
+        self._agent_order = [agent.name for agent in (
+            self.data_parser, self.question_generator, self.faq_generator, self.content_assembler
+        )]
         
         self.workflow_state = {}
+        
+        # Profiling: explicit profiler, else CONTENT_PROFILE=1 from the environment
+        self.profiler = profiler if profiler is not None else PipelineProfiler.from_env()
+        self._profile_run = None
     
-    def execute_pipeline(self, input_file: str, product_b_data: Dict = None) -> Dict[str, any]:
+    @contextmanager
+    def _stage(self, results: Dict, stage: str):
+        """Time a pipeline stage into results["timings"] (seconds)"""
+        start = time.perf_counter()
+        try:
+            if self._profile_run is not None:
+                with self._profile_run.stage(stage):
+                    yield
+            else:
+                yield
+        finally:
+            results["timings"][stage] = time.perf_counter() - start
+    
+    @_profiled("pipeline")
+    def execute_pipeline(self, input_file: str, product_b_data: Dict = None,
+                         pages: Optional[Union[str, Iterable[str]]] = None) -> Dict[str, any]:
         """
         Execute the complete workflow pipeline
         
         Args:
             input_file: Path to input JSON file
             product_b_data: Optional data for Product B (for comparison)
+            pages: Optional page selector (see parse_pages); stages whose
+                outputs are not requested are skipped
             
         Returns:
             Dictionary containing all generated outputs
         """
+        pages = parse_pages(pages)
         results = {
             "workflow": "Multi-Agent Content Generation Pipeline",
             "agents_executed": [],
-            "outputs": {}
+            "outputs": {},
+            "timings": {}
         }
         
         # Step 1: Parse product data
         print(f"[{self.name}] Step 1: Parsing product data...")
-        product_a = self.data_parser.parse_from_file(input_file)
+        with self._stage(results, "parse"):
+            product_a = self.data_parser.parse_from_file(input_file)
         results["agents_executed"].append(self.data_parser.name)
         self.workflow_state["product_a"] = product_a
         
-        # Step 2: Generate questions
-        print(f"[{self.name}] Step 2: Generating questions...")
-        questions = self.question_generator.generate_questions(product_a)
-        results["agents_executed"].append(self.question_generator.name)
-        self.workflow_state["questions"] = questions
-        print(f"[{self.name}] Generated {len(questions)} questions")
-        
-        # Step 3: Generate FAQ answers
-        print(f"[{self.name}] Step 3: Generating FAQ answers...")
-        answers = self.faq_generator.generate_answers(product_a, questions)
-        results["agents_executed"].append(self.faq_generator.name)
-        self.workflow_state["answers"] = answers
-        
-        # Step 4: Assemble FAQ page
-        print(f"[{self.name}] Step 4: Assembling FAQ page...")
-        faq_page = self.content_assembler.assemble_faq_page(product_a, questions, answers)
-        results["outputs"]["faq"] = faq_page
-        
-        # Step 5: Assemble Product page
-        print(f"[{self.name}] Step 5: Assembling Product page...")
-        product_page = self.content_assembler.assemble_product_page(product_a)
-        results["outputs"]["product"] = product_page
+        if "faq" in pages:
+            # Step 2: Generate questions
+            print(f"[{self.name}] Step 2: Generating questions...")
+            with self._stage(results, "questions"):
+                questions = self.question_generator.generate_questions(product_a)
+            results["agents_executed"].append(self.question_generator.name)
+            self.workflow_state["questions"] = questions
+            print(f"[{self.name}] Generated {len(questions)} questions")
+            
+            # Step 3: Generate FAQ answers
+            print(f"[{self.name}] Step 3: Generating FAQ answers...")
+            with self._stage(results, "answers"):
+                answers = self.faq_generator.generate_answers(product_a, questions)
+            results["agents_executed"].append(self.faq_generator.name)
+            self.workflow_state["answers"] = answers
+            
+            # Step 4: Assemble FAQ page
+            print(f"[{self.name}] Step 4: Assembling FAQ page...")
+            with self._stage(results, "faq_page"):
+                faq_page = self.content_assembler.assemble_faq_page(product_a, questions, answers)
+            results["outputs"]["faq"] = faq_page
+        
+        if "product" in pages:
+            # Step 5: Assemble Product page
+            print(f"[{self.name}] Step 5: Assembling Product page...")
+            with self._stage(results, "product_page"):
+                product_page = self.content_assembler.assemble_product_page(product_a)
+            results["outputs"]["product"] = product_page
         
         # Step 6: Assemble Comparison page (if Product B data provided)
-        if product_b_data:
+        if product_b_data and "comparison" in pages:
             print(f"[{self.name}] Step 6: Assembling Comparison page...")
             product_b = Product.from_dict(product_b_data)
             self.workflow_state["product_b"] = product_b
-            comparison_page = self.content_assembler.assemble_comparison_page(product_a, product_b)
+            with self._stage(results, "comparison_page"):
+                comparison_page = self.content_assembler.assemble_comparison_page(product_a, product_b)
             results["outputs"]["comparison"] = comparison_page
         
-        results["agents_executed"].append(self.content_assembler.name)
+        if results["outputs"]:
+            results["agents_executed"].append(self.content_assembler.name)
         
         print(f"[{self.name}] Pipeline execution complete!")
         return results
@@ -129,55 +192,97 @@ class WorkflowOrchestrator:
                 json.dump(outputs["comparison"], f, indent=2, ensure_ascii=False)
             print(f"[{self.name}] Saved: {comparison_path}")
     
-    def execute_pipeline_from_data(self, product_a_data: Dict, product_b_data: Dict = None) -> Dict[str, any]:
+    @_profiled("pipeline")
+    def execute_pipeline_from_data(self, product_a_data: Dict, product_b_data: Dict = None,
+                                   pages: Optional[Union[str, Iterable[str]]] = None) -> Dict[str, any]:
         """
         Execute the complete workflow pipeline from data dictionaries
         
         Args:
             product_a_data: Product A data dictionary
             product_b_data: Optional data for Product B (for comparison)
+            pages: Optional page selector (see parse_pages); stages whose
+                outputs are not requested are skipped
             
         Returns:
-            Dictionary containing all generated outputs
+            Dictionary whose "outputs" is a LazyOutputs mapping: each page
+            (and the stages feeding it) is built when first read.
+            "agents_executed" and "timings" grow as pages are built.
         """
+        pages = parse_pages(pages)
         results = {
             "workflow": "Multi-Agent Content Generation Pipeline",
             "agents_executed": [],
-            "outputs": {}
+            "outputs": None,
+            "timings": {}
         }
         
-        # Step 1: Parse product data
-        product_a = Product.from_dict(product_a_data)
+        # Step 1: Parse product data (eagerly, so invalid input fails here)
+        with self._stage(results, "parse"):
+            product_a = Product.from_dict(product_a_data)
         results["agents_executed"].append(self.data_parser.name)
         self.workflow_state["product_a"] = product_a
         
-        # Step 2: Generate questions
-        questions = self.question_generator.generate_questions(product_a)
-        results["agents_executed"].append(self.question_generator.name)
-        self.workflow_state["questions"] = questions
+        product_b = None
+        if product_b_data and "comparison" in pages:
+            product_b = Product.from_dict(product_b_data)
+            self.workflow_state["product_b"] = product_b
         
-        # Step 3: Generate FAQ answers
-        answers = self.faq_generator.generate_answers(product_a, questions)
-        results["agents_executed"].append(self.faq_generator.name)
-        self.workflow_state["answers"] = answers
+        # Steps 2-6 run when a page that needs them is first read
+        stages = {}
+        executed = results["agents_executed"]
         
-        # Step 4: Assemble FAQ page
-        faq_page = self.content_assembler.assemble_faq_page(product_a, questions, answers)
-        results["outputs"]["faq"] = faq_page
+        def ran(agent):
+            if agent.name not in executed:
+                executed.append(agent.name)
+                executed.sort(key=self._agent_order.index)
         
-        # Step 5: Assemble Product page
-        product_page = self.content_assembler.assemble_product_page(product_a)
-        results["outputs"]["product"] = product_page
+        def questions():
+            # Step 2: Generate questions
+            if "questions" not in stages:
+                with self._stage(results, "questions"):
+                    stages["questions"] = self.question_generator.generate_questions(product_a)
+                ran(self.question_generator)
+                self.workflow_state["questions"] = stages["questions"]
+            return stages["questions"]
         
-        # Step 6: Assemble Comparison page (if Product B data provided)
-        if product_b_data:
-            product_b = Product.from_dict(product_b_data)
-            self.workflow_state["product_b"] = product_b
-            comparison_page = self.content_assembler.assemble_comparison_page(product_a, product_b)
-            results["outputs"]["comparison"] = comparison_page
+        def answers():
+            # Step 3: Generate FAQ answers
+            if "answers" not in stages:
+                product_questions = questions()
+                with self._stage(results, "answers"):
+                    stages["answers"] = self.faq_generator.generate_answers(product_a, product_questions)
+                ran(self.faq_generator)
+                self.workflow_state["answers"] = stages["answers"]
+            return stages["answers"]
+        
+        def faq_page():
+            # Step 4: Assemble FAQ page
+            product_questions, product_answers = questions(), answers()
+            with self._stage(results, "faq_page"):
+                page = self.content_assembler.assemble_faq_page(product_a, product_questions, product_answers)
+            ran(self.content_assembler)
+            return page
+        
+        def product_page():
+            # Step 5: Assemble Product page
+            with self._stage(results, "product_page"):
+                page = self.content_assembler.assemble_product_page(product_a)
+            ran(self.content_assembler)
+            return page
         
-        results["agents_executed"].append(self.content_assembler.name)
+        def comparison_page():
+            # Step 6: Assemble Comparison page
+            with self._stage(results, "comparison_page"):
+                page = self.content_assembler.assemble_comparison_page(product_a, product_b)
+            ran(self.content_assembler)
+            return page
         
+        builders = {"faq": faq_page, "product": product_page, "comparison": comparison_page}
+        results["outputs"] = LazyOutputs({
+            page: builders[page] for page in pages
+            if page != "comparison" or product_b is not None
+        })
         return results
     
     def get_workflow_state(self) -> Dict:
@@ -1,10 +1,15 @@
-from http.server import HTTPServer
+import argparse
+from http.server import ThreadingHTTPServer
 from api.generate import handler
 
 def main():
-    port = 8000
-    server = HTTPServer(('0.0.0.0', port), handler)
-    print(f"Local server running: http://localhost:{port}")
+    parser = argparse.ArgumentParser(description="Run the generate API locally")
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    
+    port = args.port
+    server = ThreadingHTTPServer(('0.0.0.0', port), handler)
+    print(f"Local server running: http://localhost:{port}", flush=True)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
@@ -0,0 +1,23 @@
+from .projection import parse_fields, project
+from .compression import negotiate_encoding, compress, encode_body, StreamEncoder
+from .metrics import REGISTRY, record_cache_lookup, record_cache_stats
+from .timing import RequestTimer, DebugProbe
+from .admission import AdmissionController, Rejection
+from .static_files import StaticFiles
+
+__all__ = [
+    'parse_fields',
+    'project',
+    'negotiate_encoding',
+    'compress',
+    'encode_body',
+    'StreamEncoder',
+    'REGISTRY',
+    'record_cache_lookup',
+    'record_cache_stats',
+    'RequestTimer',
+    'DebugProbe',
+    'AdmissionController',
+    'Rejection',
+    'StaticFiles'
+]
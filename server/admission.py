@@ -0,0 +1,158 @@
+"""
+Admission control - Per-client rate limiting and bounded concurrency
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Rejection:
+    """Why a request was shed and how long the client should back off"""
+    status: int
+    reason: str
+    retry_after: int
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` stored"""
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+    
+    def try_acquire(self, now: float = None) -> float:
+        """
+        Take one token if available
+        
+        Returns:
+            0.0 when a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token bucket per client key, with least-recently-seen clients evicted"""
+    
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def check(self, client: str) -> Optional[Rejection]:
+        """Return a 429 rejection if the client is over its rate, else None"""
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            wait = bucket.try_acquire()
+        if wait:
+            return Rejection(429, "rate_limited", max(1, math.ceil(wait)))
+        return None
+
+
+class ConcurrencyLimiter:
+    """
+    Caps requests in flight; excess requests wait in a bounded FIFO queue
+    
+    A request that cannot get a slot before `queue_timeout` is rejected
+    with 503, so admitted requests keep flat latency under overload
+    instead of everyone slowing down together.
+    """
+    
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+    
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+    
+    def acquire(self) -> Optional[Rejection]:
+        """Take a slot, waiting in the queue if needed; returns a rejection on failure"""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                return Rejection(503, "queue_full", self._retry_after())
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        
+        if waiter.wait(self.queue_timeout):
+            return None
+        with self._lock:
+            if waiter.is_set():
+                # Slot was handed over just as we timed out
+                return None
+            self._waiters.remove(waiter)
+        return Rejection(503, "queue_timeout", self._retry_after())
+    
+    def release(self):
+        """Free a slot, handing it directly to the oldest waiter if any"""
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self.in_flight -= 1
+
+
+class AdmissionController:
+    """Rate limit per client, then bound concurrency, for one process"""
+    
+    def __init__(self, rate: float, burst: float, max_in_flight: int,
+                 max_queue: int, queue_timeout: float):
+        self.rate_limiter = RateLimiter(rate, burst)
+        self.concurrency = ConcurrencyLimiter(max_in_flight, max_queue, queue_timeout)
+    
+    @classmethod
+    def from_env(cls) -> 'AdmissionController':
+        """Build a controller from GENERATE_* environment variables"""
+        return cls(
+            rate=float(os.environ.get("GENERATE_RATE_LIMIT", "20")),
+            burst=float(os.environ.get("GENERATE_RATE_BURST", "40")),
+            max_in_flight=int(os.environ.get("GENERATE_MAX_IN_FLIGHT", str(os.cpu_count() or 4))),
+            max_queue=int(os.environ.get("GENERATE_MAX_QUEUE", "32")),
+            queue_timeout=float(os.environ.get("GENERATE_QUEUE_TIMEOUT", "2.0"))
+        )
+    
+    def admit(self, client: str) -> Optional[Rejection]:
+        """
+        Decide whether to serve a request
+        
+        Args:
+            client: Client identity (address or forwarded-for value)
+            
+        Returns:
+            None when admitted (caller must call release()), else a Rejection
+        """
+        rejection = self.rate_limiter.check(client)
+        if rejection:
+            return rejection
+        return self.concurrency.acquire()
+    
+    def release(self):
+        self.concurrency.release()
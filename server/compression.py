@@ -0,0 +1,162 @@
+"""
+Response compression - Content-Encoding negotiation with gzip/deflate
+"""
+import os
+import zlib
+from typing import Any, Callable, Optional, Tuple
+
+# Encodings we can produce, in server preference order
+SUPPORTED_ENCODINGS = ("gzip", "deflate")
+
+# Bodies smaller than this are sent as-is; compression would not pay off
+DEFAULT_MIN_SIZE = int(os.environ.get("GENERATE_COMPRESSION_MIN_SIZE", "1024"))
+
+# zlib level 1 (fastest) .. 9 (smallest); 6 matches the zlib default
+DEFAULT_LEVEL = int(os.environ.get("GENERATE_COMPRESSION_LEVEL", "6"))
+
+# Streamed bodies are passed on in pieces of at least this many bytes
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a content encoding from an Accept-Encoding header
+    
+    Args:
+        accept_encoding: Raw header value, e.g. "gzip;q=0.8, deflate"
+        
+    Returns:
+        "gzip", "deflate" or None when the response should stay uncompressed
+    """
+    if not accept_encoding:
+        return None
+    
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding] = q
+    
+    wildcard = qualities.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = qualities.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int = DEFAULT_LEVEL) -> bytes:
+    """
+    Compress a response body with the given content encoding
+    
+    Args:
+        body: Uncompressed bytes
+        encoding: "gzip" or "deflate" (zlib-wrapped, per RFC 9110)
+        level: Compression level 1-9
+        
+    Returns:
+        Compressed bytes
+    """
+    if encoding == "gzip":
+        import gzip
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "deflate":
+        return zlib.compress(body, level)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def compressor(encoding: str, level: int = DEFAULT_LEVEL):
+    """
+    Incremental compressor for a body written in pieces
+    
+    Args:
+        encoding: "gzip" or "deflate"
+        level: Compression level 1-9
+        
+    Returns:
+        zlib compress object; its output is the same format as compress()
+    """
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if encoding == "deflate":
+        return zlib.compressobj(level, zlib.DEFLATED, 15)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+class StreamEncoder:
+    """
+    Content-Encoding for a body that is produced in fragments
+    
+    write() collects fragments and passes them to send() in pieces of at
+    least chunk_size bytes, compressed when an encoding is given. close()
+    sends whatever is left (and the end of the compressed stream).
+    """
+    
+    def __init__(self, send: Callable[[bytes], Any], encoding: Optional[str] = None,
+                 chunk_size: int = STREAM_CHUNK_SIZE, level: int = DEFAULT_LEVEL):
+        self.send = send
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.bytes_sent = 0
+        self._compressor = compressor(encoding, level) if encoding else None
+        self._buffer = []
+        self._buffered = 0
+    
+    def write(self, fragment: bytes):
+        self._buffer.append(fragment)
+        self._buffered += len(fragment)
+        if self._buffered >= self.chunk_size:
+            self._send(self._take())
+    
+    def close(self):
+        data = self._take()
+        if self._compressor is not None:
+            data += self._compressor.flush()
+        self._send(data)
+    
+    def _take(self) -> bytes:
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        return data
+    
+    def _send(self, data: bytes):
+        if data:
+            self.send(data)
+            self.bytes_sent += len(data)
+
+
+def encode_body(body: bytes, accept_encoding: Optional[str],
+                min_size: int = DEFAULT_MIN_SIZE,
+                level: int = DEFAULT_LEVEL) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a body if the client accepts it and it is large enough
+    
+    Args:
+        body: Uncompressed response bytes
+        accept_encoding: Client Accept-Encoding header
+        min_size: Smallest body worth compressing
+        level: Compression level 1-9
+        
+    Returns:
+        Tuple of (body to send, Content-Encoding value or None)
+    """
+    if len(body) < min_size:
+        return body, None
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding, level), encoding
@@ -0,0 +1,361 @@
+"""
+Job queue - Durable SQLite-backed batch jobs with a worker pool
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+DEFAULT_DB_PATH = os.environ.get("GENERATE_JOBS_DB", "jobs.sqlite3")
+
+# Seconds a claimed job stays leased to its worker without a renewal;
+# workers renew between products, and expired leases are taken over
+DEFAULT_LEASE = float(os.environ.get("GENERATE_JOB_LEASE", "300"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    request TEXT NOT NULL,
+    error TEXT,
+    worker TEXT,
+    lease_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+CREATE TABLE IF NOT EXISTS results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    product_name TEXT,
+    outputs TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+
+class JobStore:
+    """
+    Durable job queue in a local SQLite database
+    
+    Each call opens its own connection, so one store can be shared by
+    request threads and worker threads, and several processes can point
+    at the same file.
+    
+    A claimed job is leased to one worker (see DEFAULT_LEASE). Progress
+    writes and renewals only succeed for the worker holding the lease, so
+    a job whose lease expired and was claimed again is never run twice.
+    """
+    
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Databases created before leases were added
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "worker" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL NOT NULL DEFAULT 0")
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A fresh autocommit connection, closed (rolling back any open transaction) on exit"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def submit(self, products: List[Dict], product_b: Dict = None, pages=None) -> str:
+        """
+        Queue a catalog for generation
+        
+        Args:
+            products: Catalog entries; each is a product dict, or a
+                {"product_a": ..., "product_b": ...} pair
+            product_b: Optional comparison product for entries without their own
+            pages: Optional page selector passed to the orchestrator
+            
+        Returns:
+            New job id
+        """
+        if not isinstance(products, list) or not products:
+            raise ValueError("products must be a non-empty list")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        request = json.dumps({"products": products, "product_b": product_b, "pages": pages})
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created, updated, total, request) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, now, now, len(products), request)
+            )
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return job status and progress, or None if unknown"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, status, created, updated, total, completed, failed, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        done = job["completed"] + job["failed"]
+        job["progress"] = round(done / job["total"], 4) if job["total"] else 1.0
+        return job
+    
+    def request(self, job_id: str) -> Dict:
+        """Return the submitted request payload of a job"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT request FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["request"])
+    
+    def claim_next(self, worker: str = None, lease: float = DEFAULT_LEASE) -> Optional[str]:
+        """
+        Atomically lease the oldest queued job (or running job whose lease
+        expired) to a worker and return its id
+        
+        Args:
+            worker: Worker id (default: this process and thread)
+            lease: Seconds until the lease expires unless renewed
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY created LIMIT 1",
+                (QUEUED, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, updated = ? WHERE id = ?",
+                (RUNNING, worker or _worker_id(), now + lease, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        return row["id"]
+    
+    def renew(self, job_id: str, worker: str = None, lease: float = DEFAULT_LEASE) -> bool:
+        """Extend a worker's lease on a running job; False if it was cancelled or claimed by another worker"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND status = ? AND worker = ?",
+                (now + lease, now, job_id, RUNNING, worker or _worker_id())
+            )
+        return cursor.rowcount > 0
+    
+    def done_indices(self, job_id: str) -> set:
+        """Indices already processed, so a requeued job resumes where it stopped"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT idx FROM results WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["idx"] for row in rows}
+    
+    def record_result(self, job_id: str, idx: int, product_name: str,
+                      outputs: Dict = None, error: str = None, worker: str = None) -> bool:
+        """
+        Store one product's outputs (or error) and advance job progress
+        
+        Returns:
+            False (and nothing is stored) if the worker no longer holds the job
+        """
+        counter = "failed" if error else "completed"
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                f"UPDATE jobs SET {counter} = {counter} + 1, updated = ? WHERE id = ? AND worker = ?",
+                (time.time(), job_id, worker or _worker_id())
+            )
+            if cursor.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO results (job_id, idx, product_name, outputs, error) VALUES (?, ?, ?, ?, ?)",
+                (job_id, idx, product_name,
+                 json.dumps(outputs, ensure_ascii=False) if outputs is not None else None, error)
+            )
+            conn.execute("COMMIT")
+        return True
+    
+    def finish(self, job_id: str, status: str, error: str = None, worker: str = None):
+        """Mark a running job finished, unless it was cancelled or claimed by another worker meanwhile"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ? AND status = ? AND worker = ?",
+                (status, error, time.time(), job_id, RUNNING, worker or _worker_id())
+            )
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it already finished"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            )
+        return cursor.rowcount > 0
+    
+    def status(self, job_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+    
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict]:
+        """Return processed products of a job in catalog order"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT idx, product_name, outputs, error FROM results WHERE job_id = ? "
+                "ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset)
+            ).fetchall()
+        return [
+            {
+                "index": row["idx"],
+                "product_name": row["product_name"],
+                "outputs": json.loads(row["outputs"]) if row["outputs"] else None,
+                "error": row["error"]
+            }
+            for row in rows
+        ]
+    
+    def requeue_stale(self) -> int:
+        """Put running jobs whose worker let its lease expire back in the queue"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, updated = ? WHERE status = ? AND lease_until < ?",
+                (QUEUED, now, RUNNING, now)
+            )
+        return cursor.rowcount
+
+
+def _worker_id() -> str:
+    """Default worker id: this process and thread"""
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def run_job(store: JobStore, job_id: str, orchestrator=None, worker: str = None):
+    """
+    Generate every product of a job, renewing its lease between products
+    
+    Stops early if the job was cancelled or its lease was lost to
+    another worker.
+    
+    Args:
+        store: Job store holding the job
+        job_id: Id of a job claimed by this worker
+        orchestrator: Optional WorkflowOrchestrator to reuse
+        worker: Worker id the job was claimed with (default: this process and thread)
+    """
+    from orchestrator import WorkflowOrchestrator
+    
+    orchestrator = orchestrator or WorkflowOrchestrator()
+    worker = worker or _worker_id()
+    request = store.request(job_id)
+    done = store.done_indices(job_id)
+    
+    for idx, entry in enumerate(request["products"]):
+        if idx in done:
+            continue
+        if not store.renew(job_id, worker):
+            return
+        
+        product_name = None
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("catalog entry must be an object")
+            product_a = entry.get("product_a", entry)
+            product_b = entry.get("product_b", request.get("product_b"))
+            if isinstance(product_a, dict):
+                product_name = product_a.get("product_name")
+            results = orchestrator.execute_pipeline_from_data(
+                product_a_data=product_a,
+                product_b_data=product_b,
+                pages=request.get("pages")
+            )
+            store.record_result(job_id, idx, product_name, outputs=results["outputs"].materialize(), worker=worker)
+        except Exception as e:
+            store.record_result(job_id, idx, product_name, error=str(e), worker=worker)
+    
+    store.finish(job_id, COMPLETED, worker=worker)
+
+
+class JobWorkerPool:
+    """Threads that claim queued jobs from a store and run them"""
+    
+    def __init__(self, store: JobStore, workers: int = 2, poll_interval: float = 0.5):
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+    
+    def start(self):
+        self.store.requeue_stale()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+    
+    def _work(self):
+        from orchestrator import WorkflowOrchestrator
+        
+        orchestrator = WorkflowOrchestrator()
+        worker = f"{_worker_id()}-{uuid.uuid4().hex[:8]}"
+        while not self._stop.is_set():
+            job_id = self.store.claim_next(worker)
+            if job_id is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            try:
+                run_job(self.store, job_id, orchestrator, worker)
+            except Exception as e:
+                self.store.finish(job_id, FAILED, error=str(e), worker=worker)
+
+
+def main():
+    """Run a standalone worker pool against a job database"""
+    parser = argparse.ArgumentParser(description="Process queued generation jobs")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite job database")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Worker threads")
+    args = parser.parse_args()
+    
+    pool = JobWorkerPool(JobStore(args.db), workers=args.workers)
+    pool.start()
+    print(f"Processing jobs from {args.db} with {args.workers} workers")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
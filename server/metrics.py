@@ -0,0 +1,220 @@
+"""
+Metrics - Prometheus text exposition for the generate API
+"""
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds (Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """Base metric: a named family of labelled series"""
+    
+    type_name = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Return exposition lines for every series"""
+    
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}"
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+    
+    type_name = "counter"
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+    
+    def set_total(self, value: float, **labels):
+        """Publish a cumulative total counted elsewhere (e.g. by a cache)"""
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+    
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in series
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    
+    type_name = "gauge"
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+
+class Histogram(Metric):
+    """Cumulative bucketed observations with sum and count"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+    
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series["counts"]) if series else 0
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted(
+                (key, (list(data["counts"]), data["sum"]))
+                for key, data in self._series.items()
+            )
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /metrics"""
+    
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+    
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric '{metric.name}' already registered")
+        self.metrics[metric.name] = metric
+        return metric
+    
+    def add_collector(self, collect: Callable[[], None]):
+        """Call `collect` before every render to refresh values kept elsewhere"""
+        self.collectors.append(collect)
+    
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        for collect in self.collectors:
+            collect()
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "generate_requests_total",
+    "HTTP requests handled, by method and status code",
+    ("method", "status")
+))
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "generate_request_duration_seconds",
+    "End-to-end POST /api/generate latency",
+))
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "generate_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    ("stage",)
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "generate_requests_in_flight",
+    "Requests currently being processed"
+))
+IN_FLIGHT.set(0)
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "generate_cache_requests_total",
+    "Cache lookups, by cache and result (hit or miss)",
+    ("cache", "result")
+))
+SHED = REGISTRY.register(Counter(
+    "generate_requests_shed_total",
+    "Requests rejected by admission control, by reason",
+    ("reason",)
+))
+BYTES_SERVED = REGISTRY.register(Counter(
+    "generate_response_bytes_total",
+    "Response body bytes written, after compression",
+    ("encoding",)
+))
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache lookup so hit rates show up on /metrics"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_cache_stats(cache: str, hits: int, misses: int):
+    """Publish hit/miss totals of a cache that keeps its own counters"""
+    CACHE_REQUESTS.set_total(hits, cache=cache, result="hit")
+    CACHE_REQUESTS.set_total(misses, cache=cache, result="miss")
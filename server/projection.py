@@ -0,0 +1,73 @@
+"""
+Response projection - Trims generated pages down to requested field paths
+"""
+from typing import Any, Dict, Iterable, Optional, Union
+
+
+def parse_fields(fields: Optional[Union[str, Iterable[str]]]) -> Optional[Dict[str, Any]]:
+    """
+    Parse a field selector into a projection tree
+    
+    Args:
+        fields: Comma-separated dotted paths ("faq.faqs.question,product.sections")
+            or an iterable of dotted paths. None or empty disables projection.
+            
+    Returns:
+        Nested dict where each key is a path segment and None marks a
+        selected leaf, or None when no projection was requested
+        
+    Raises:
+        ValueError: If a path is malformed (empty segments)
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    
+    tree = {}
+    for path in fields:
+        path = str(path).strip()
+        if not path:
+            continue
+        segments = path.split(".")
+        if any(not segment for segment in segments):
+            raise ValueError(f"Invalid field path: '{path}'")
+        
+        node = tree
+        for segment in segments[:-1]:
+            child = node.get(segment, {})
+            if child is None:
+                # A shorter path already selects the whole subtree
+                break
+            node = node.setdefault(segment, child)
+        else:
+            node[segments[-1]] = None
+    
+    return tree or None
+
+
+def project(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    """
+    Apply a projection tree to a page value
+    
+    Lists are projected element-wise, so "faqs.question" keeps only the
+    question of every FAQ item. Missing keys are silently dropped.
+    
+    Args:
+        value: Page data (dict, list or scalar)
+        tree: Projection tree from parse_fields, or None to keep everything
+        
+    Returns:
+        Projected copy of the selected parts of value
+    """
+    if tree is None:
+        return value
+    if isinstance(value, dict):
+        return {
+            key: project(value[key], subtree)
+            for key, subtree in tree.items()
+            if key in value
+        }
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    return value
@@ -0,0 +1,109 @@
+"""
+Serialization - Single-pass compact JSON encoding of pipeline outputs
+
+Pages are encoded straight to UTF-8 bytes with one shared JSONEncoder and
+joined into the response buffer, instead of building one large indented
+string and encoding it again. Values that never change between requests
+(static template metadata) are encoded once and reused.
+"""
+import json
+from typing import Any, Dict
+
+# Reused encoder: compact separators, UTF-8 output (no \\u escapes)
+_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+_encode = _ENCODER.encode
+
+# id(obj) -> (obj, encoded bytes); holding obj keeps the id valid
+_STATIC_FRAGMENTS = {}
+_KEY_CACHE = {}
+# templates.compiler.hoisted_count once templates are loaded, and how many
+# hoisted constants are registered so far
+_hoisted_count = None
+_static_count = 0
+
+_RESPONSE_PREFIX = b'{"success":true,"outputs":'
+
+
+def register_static(obj: Any) -> bytes:
+    """
+    Pre-encode a value that is shared, unchanged, by every response
+    
+    Args:
+        obj: JSON-serializable object that callers never mutate
+        
+    Returns:
+        Its encoded bytes
+    """
+    encoded = _encode(obj).encode('utf-8')
+    _STATIC_FRAGMENTS[id(obj)] = (obj, encoded)
+    return encoded
+
+
+def _load_template_constants():
+    """Register constants hoisted by compiled page schemas since the last call"""
+    global _hoisted_count, _static_count
+    # Imported on first use to keep templates out of the API cold start
+    # (constants hoisted by compiled page schemas, including the metadata)
+    import templates.template_engine
+    from templates.compiler import hoisted_constants, hoisted_count
+    for constant in hoisted_constants(_static_count):
+        register_static(constant)
+        _static_count += 1
+    _hoisted_count = hoisted_count
+
+
+def _encode_key(key: str) -> bytes:
+    encoded = _KEY_CACHE.get(key)
+    if encoded is None:
+        encoded = _KEY_CACHE[key] = _encode(key).encode('utf-8') + b':'
+    return encoded
+
+
+def encode_value(value: Any) -> bytes:
+    """Encode one value, using the pre-encoded bytes of registered static values"""
+    static = _STATIC_FRAGMENTS.get(id(value))
+    if static is not None and static[0] is value:
+        return static[1]
+    return _encode(value).encode('utf-8')
+
+
+def encode_page(page: Dict[str, Any]) -> bytes:
+    """
+    Encode a page dict as compact JSON bytes
+    
+    Top-level values are encoded separately so static sub-structures
+    (e.g. metadata blocks) come from the fragment cache.
+    """
+    # Schemas registered at runtime hoist more constants; pick them up lazily
+    if _hoisted_count is None or _hoisted_count() != _static_count:
+        _load_template_constants()
+    return b'{' + b','.join(_encode_key(key) + encode_value(value) for key, value in page.items()) + b'}'
+
+
+def encode_outputs(outputs: Dict[str, Any]) -> bytes:
+    """Encode the page mapping, each page serialized once"""
+    return b'{' + b','.join(
+        _encode_key(name) + (encode_page(page) if isinstance(page, dict) else encode_value(page))
+        for name, page in outputs.items()
+    ) + b'}'
+
+
+def encode_response(outputs: Dict[str, Any], **extra: Any) -> bytes:
+    """
+    Build a complete success response body in one buffer
+    
+    Args:
+        outputs: Page mapping from the orchestrator (possibly projected)
+        **extra: Additional top-level fields, e.g. agents_executed or debug
+        
+    Returns:
+        b'{"success":true,"outputs":{...},...}'
+    """
+    parts = [_RESPONSE_PREFIX, encode_outputs(outputs)]
+    for key, value in extra.items():
+        if value is not None:
+            parts.append(b',')
+            parts.append(_encode_key(key))
+            parts.append(encode_value(value))
+    parts.append(b'}')
+    return b''.join(parts)
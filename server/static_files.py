@@ -0,0 +1,153 @@
+"""
+Static files - In-memory cached assets with validators and sendfile
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from .compression import compress, negotiate_encoding
+from .metrics import record_cache_lookup
+
+
+@dataclass
+class StaticEntry:
+    """One asset: validators plus its bytes when small enough to keep in memory"""
+    path: str
+    size: int
+    mtime_ns: int
+    content_type: str
+    etag: str
+    last_modified: str
+    body: Optional[bytes] = None
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+class StaticFiles:
+    """
+    Serves files from a directory with an mtime-invalidated memory cache
+    
+    Small files are read once and kept in memory (with their compressed
+    variants); a stat() per request notices edits on disk. Files above
+    `max_cached_size` are streamed with os.sendfile instead.
+    """
+    
+    def __init__(self, root: str, cache_control: str = "public, max-age=300, must-revalidate",
+                 max_cached_size: int = 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.cache_control = cache_control
+        self.max_cached_size = max_cached_size
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def resolve(self, url_path: str) -> Optional[str]:
+        """Map a URL path to a file under root, or None (missing or outside root)"""
+        from urllib.parse import unquote
+        
+        relative = unquote(url_path).lstrip("/") or "index.html"
+        path = os.path.abspath(os.path.join(self.root, relative))
+        if os.path.commonpath([path, self.root]) != self.root or not os.path.isfile(path):
+            return None
+        return path
+    
+    def lookup(self, path: str) -> StaticEntry:
+        """Return the cached entry for a file, reloading it if it changed on disk"""
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            record_cache_lookup("static", True)
+            return entry
+        
+        record_cache_lookup("static", False)
+        entry = StaticEntry(
+            path=path,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            content_type=_content_type(path),
+            etag=f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+            last_modified=formatdate(stat.st_mtime, usegmt=True)
+        )
+        if stat.st_size <= self.max_cached_size:
+            with open(path, "rb") as f:
+                entry.body = f.read()
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+    
+    def is_not_modified(self, entry: StaticEntry, if_none_match: Optional[str],
+                        if_modified_since: Optional[str]) -> bool:
+        """Evaluate conditional request headers (If-None-Match takes precedence)"""
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(entry.mtime_ns // 1_000_000_000) <= since
+        return False
+    
+    def encoded_body(self, entry: StaticEntry, accept_encoding: Optional[str]):
+        """
+        Pick the body variant for a client, compressing once per encoding
+        
+        Returns:
+            Tuple of (bytes, Content-Encoding or None)
+        """
+        encoding = negotiate_encoding(accept_encoding) if _compressible(entry.content_type) else None
+        if encoding is None or entry.size < 1024:
+            return entry.body, None
+        body = entry.encoded.get(encoding)
+        if body is None:
+            body = entry.encoded[encoding] = compress(entry.body, encoding, level=9)
+        return body, encoding
+    
+    def headers(self, entry: StaticEntry) -> Dict[str, str]:
+        """Caching headers common to 200 and 304 responses"""
+        return {
+            "ETag": entry.etag,
+            "Last-Modified": entry.last_modified,
+            "Cache-Control": self.cache_control
+        }
+
+
+def sendfile(connection, wfile, path: str, size: int) -> None:
+    """
+    Copy a file to the client with os.sendfile (zero-copy)
+    
+    Falls back to buffered writes through wfile when sendfile is not
+    available, e.g. on Windows or for TLS-wrapped sockets.
+    """
+    with open(path, "rb") as f:
+        offset = 0
+        try:
+            out_fd = connection.fileno()
+            while offset < size:
+                sent = os.sendfile(out_fd, f.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            return
+        except (AttributeError, OSError):
+            if offset:
+                raise
+        import shutil
+        shutil.copyfileobj(f, wfile)
+
+
+def _content_type(path: str) -> str:
+    import mimetypes
+    
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith("text/") or content_type.split(";")[0] in (
+        "application/javascript", "application/json", "image/svg+xml"
+    )
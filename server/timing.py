@@ -0,0 +1,108 @@
+"""
+Request timing - Server-Timing headers and per-request debug probes
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class RequestTimer:
+    """Collects named stage durations for one request"""
+    
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+    
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block of work under the given stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+    
+    def add(self, name: str, seconds: float):
+        """Record (or accumulate) a stage duration in seconds"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+    
+    def update(self, timings: Dict[str, float]):
+        """Merge stage durations, e.g. the orchestrator's results["timings"]"""
+        for name, seconds in timings.items():
+            self.add(name, seconds)
+    
+    def header(self) -> str:
+        """
+        Format the Server-Timing header value
+        
+        Returns:
+            e.g. "read;dur=0.12, answers;dur=0.35, total;dur=1.02" (milliseconds)
+        """
+        entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.3f}")
+        return ", ".join(entries)
+
+
+class DebugProbe:
+    """
+    CPU time and allocation accounting for a single request
+    
+    CPU time is the handling thread's own (time.thread_time), so requests
+    served concurrently are not included. tracemalloc is process-wide, so
+    their allocations are counted together; use those for attribution, not
+    billing.
+    Overlapping probes share one tracing session (orchestrator.profiling),
+    and allocation stats that cannot be taken are reported as None.
+    """
+    
+    def __init__(self):
+        self._tracing = False
+        self._cpu_start = 0.0
+        self._snapshot = None
+    
+    def start(self):
+        # Imported lazily: only debug requests pay for tracemalloc
+        import tracemalloc
+        from orchestrator.profiling import acquire_tracing
+        acquire_tracing()
+        self._tracing = True
+        try:
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        except RuntimeError:
+            # Tracing was stopped outside acquire/release_tracing
+            self._snapshot = None
+        self._cpu_start = time.thread_time()
+    
+    def stop(self) -> Dict[str, float]:
+        """
+        Stop the probe and report what the request cost
+        
+        Returns:
+            Dictionary with cpu_time_ms, allocated_blocks, allocated_bytes
+            and peak_traced_bytes
+        """
+        import tracemalloc
+        from orchestrator.profiling import release_tracing
+        cpu_ms = (time.thread_time() - self._cpu_start) * 1000
+        stats = {
+            "cpu_time_ms": round(cpu_ms, 3),
+            "allocated_blocks": None,
+            "allocated_bytes": None,
+            "peak_traced_bytes": None
+        }
+        try:
+            if self._snapshot is not None:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                diff = snapshot.compare_to(self._snapshot, "filename")
+                stats["allocated_blocks"] = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+                stats["allocated_bytes"] = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+                stats["peak_traced_bytes"] = peak
+        except RuntimeError:
+            pass
+        finally:
+            if self._tracing:
+                self._tracing = False
+                release_tracing()
+        return stats
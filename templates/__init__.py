@@ -1,15 +1,31 @@
 from .template_engine import (
     Template,
+    CompiledTemplate,
     FAQTemplate,
     ProductPageTemplate,
     ComparisonPageTemplate,
     TemplateEngine
 )
+from .compiler import PageSchema, Arg, Attr, Key, Each, Call, compile_schema
+from .streaming import PageRenderer, HTMLRenderer, MarkdownRenderer, get_renderer, STREAM_FORMATS
 
 __all__ = [
     'Template',
+    'CompiledTemplate',
     'FAQTemplate',
     'ProductPageTemplate',
     'ComparisonPageTemplate',
-    'TemplateEngine'
+    'TemplateEngine',
+    'PageSchema',
+    'Arg',
+    'Attr',
+    'Key',
+    'Each',
+    'Call',
+    'compile_schema',
+    'PageRenderer',
+    'HTMLRenderer',
+    'MarkdownRenderer',
+    'get_renderer',
+    'STREAM_FORMATS'
 ]
@@ -0,0 +1,232 @@
+"""
+Template compiler - Generates specialized render functions from declarative
+page schemas
+
+A schema body is a JSON-like literal (dicts, lists, scalars) whose dynamic
+parts are expression nodes:
+
+    Arg("product")                         a render argument, let or loop variable
+    Attr("product", "price")               product.price
+    Key("q", "category", "General")        q.get("category", "General")  (no default: q["category"])
+    Each({"q": Arg("questions")}, {...})   [{...} for q in questions]  (several sources: zip)
+    Call(len, Arg("faqs"))                 len(faqs)
+
+compile_schema() turns a schema into the source of one function that
+returns a single nested literal, e.g.
+
+    def render_faq(product, questions, answers):
+        faq_items = [{'category': q.get('category', 'General'), ...} for q, answer in zip(questions, answers)]
+        return {'page_type': 'faq', 'product_name': product.product_name, 'faqs': faq_items, ...}
+
+and compiles it once. Dicts and lists without dynamic parts are hoisted
+into constants shared by every rendered page (read-only, like the template
+metadata), scalars are inlined as literals.
+"""
+import keyword
+import linecache
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+_MISSING = object()
+
+# Every hoisted constant, one shared object per distinct value (keyed by
+# repr, which tells 1, 1.0, True and lists from tuples apart). Recompiling
+# or re-registering an equal schema reuses them, so this only grows with
+# new content. Insertion-ordered, so serializers can pick up new ones.
+_HOISTED: Dict[str, Any] = {}
+
+
+@dataclass(frozen=True)
+class Arg:
+    """A render argument, a `lets` binding or an Each loop variable"""
+    name: str
+
+
+@dataclass(frozen=True)
+class Attr:
+    """Attribute of an expression (a string target means Arg(target))"""
+    target: Any
+    name: str
+
+
+@dataclass(frozen=True)
+class Key:
+    """Dict lookup on an expression, with an optional default"""
+    target: Any
+    key: str
+    default: Any = _MISSING
+
+
+@dataclass(frozen=True)
+class Each:
+    """List built from one item schema per element of the sources (zipped)"""
+    sources: Dict[str, Any]
+    item: Any
+
+
+@dataclass(frozen=True, init=False)
+class Call:
+    """Call of a Python function on expressions"""
+    function: Callable
+    args: Tuple[Any, ...] = ()
+    
+    def __init__(self, function: Callable, *args: Any):
+        object.__setattr__(self, "function", function)
+        object.__setattr__(self, "args", args)
+
+
+@dataclass
+class PageSchema:
+    """
+    Declarative page template
+    
+    Args:
+        name: Page type; the generated function is render_<name>
+        params: Render argument names, in call order
+        body: Page literal with expression nodes
+        lets: Ordered name -> expression bindings computed before the body
+            (each may use the params and earlier bindings)
+    """
+    name: str
+    params: Tuple[str, ...]
+    body: Any
+    lets: Dict[str, Any] = field(default_factory=dict)
+
+
+_NODES = (Arg, Attr, Key, Each, Call)
+_SCALARS = (str, int, bool, type(None))
+
+
+def _check_name(name: str, what: str):
+    if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_"):
+        raise ValueError(f"Invalid {what} name '{name}': use a plain identifier without leading underscore")
+
+
+def _is_dynamic(value: Any) -> bool:
+    if isinstance(value, _NODES):
+        return True
+    if isinstance(value, dict):
+        return any(_is_dynamic(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_is_dynamic(item) for item in value)
+    return False
+
+
+class _Generator:
+    """Emits Python source for one schema; non-literal values go to the namespace"""
+    
+    def __init__(self):
+        self.namespace: Dict[str, Any] = {}
+        self.constants: List[Any] = []
+    
+    def _hoist(self, value: Any, prefix: str) -> str:
+        name = f"_{prefix}{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+    
+    def expr(self, node: Any, scope: Tuple[str, ...]) -> str:
+        if isinstance(node, Arg):
+            if node.name not in scope:
+                raise ValueError(f"Unknown name '{node.name}'. Expected any of: {', '.join(scope)}")
+            return node.name
+        if isinstance(node, Attr):
+            _check_name(node.name, "attribute")
+            return f"{self.target(node.target, scope)}.{node.name}"
+        if isinstance(node, Key):
+            target = self.target(node.target, scope)
+            if node.default is _MISSING:
+                return f"{target}[{node.key!r}]"
+            return f"{target}.get({node.key!r}, {self.expr(node.default, scope)})"
+        if isinstance(node, Call):
+            args = ", ".join(self.expr(arg, scope) for arg in node.args)
+            return f"{self._hoist(node.function, 'f')}({args})"
+        if isinstance(node, Each):
+            if not node.sources:
+                raise ValueError("Each needs at least one source")
+            for name in node.sources:
+                _check_name(name, "loop variable")
+            sources = [self.expr(source, scope) for source in node.sources.values()]
+            inner = scope + tuple(node.sources)
+            targets = ", ".join(node.sources)
+            iterable = sources[0] if len(sources) == 1 else f"zip({', '.join(sources)})"
+            return f"[{self.expr(node.item, inner)} for {targets} in {iterable}]"
+        if isinstance(node, dict):
+            for key in node:
+                if not isinstance(key, str):
+                    raise ValueError(f"Page keys must be strings, got {key!r}")
+            if node and not _is_dynamic(node):
+                return self.constant(node)
+            return "{" + ", ".join(f"{key!r}: {self.expr(value, scope)}" for key, value in node.items()) + "}"
+        if isinstance(node, (list, tuple)):
+            if node and not _is_dynamic(node):
+                return self.constant(node)
+            return "[" + ", ".join(self.expr(item, scope) for item in node) + "]"
+        if type(node) in _SCALARS:
+            return repr(node)
+        # Floats (nan/inf have no literal) and other values are referenced by name
+        return self._hoist(node, "v")
+    
+    def target(self, target: Any, scope: Tuple[str, ...]) -> str:
+        return self.expr(Arg(target) if isinstance(target, str) else target, scope)
+    
+    def constant(self, value: Any) -> str:
+        value = _HOISTED.setdefault(repr(value), value)
+        self.constants.append(value)
+        return self._hoist(value, "c")
+
+
+def schema_source(schema: PageSchema) -> Tuple[str, Dict[str, Any], List[Any]]:
+    """
+    Generate the render function source of a schema
+    
+    Returns:
+        (source, namespace the source needs, hoisted constants)
+    
+    Raises:
+        ValueError: If the schema uses unknown names or invalid identifiers
+    """
+    _check_name(schema.name, "page")
+    for name in schema.params:
+        _check_name(name, "parameter")
+    if len(set(schema.params)) != len(schema.params):
+        raise ValueError(f"Duplicate parameters in schema '{schema.name}'")
+    
+    generator = _Generator()
+    scope = tuple(schema.params)
+    lines = [f"def render_{schema.name}({', '.join(scope)}):"]
+    for name, value in schema.lets.items():
+        _check_name(name, "binding")
+        if name in scope:
+            raise ValueError(f"Binding '{name}' shadows another name")
+        lines.append(f"    {name} = {generator.expr(value, scope)}")
+        scope += (name,)
+    lines.append(f"    return {generator.expr(schema.body, scope)}")
+    return "\n".join(lines) + "\n", generator.namespace, generator.constants
+
+
+def compile_schema(schema: PageSchema) -> Callable[..., Dict]:
+    """
+    Compile a schema into its render function
+    
+    The function takes the schema's params (positionally or by keyword) and
+    keeps its generated code in `render.source`.
+    """
+    source, namespace, constants = schema_source(schema)
+    filename = f"<template {schema.name}>"
+    # Registered so tracebacks through generated code show its lines
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    exec(compile(source, filename, "exec"), namespace)
+    render = namespace[f"render_{schema.name}"]
+    render.source = source
+    render.constants = tuple(constants)
+    return render
+
+
+def hoisted_constants(start: int = 0) -> Tuple[Any, ...]:
+    """Constants shared by the pages of every compiled schema, from the start-th hoisted"""
+    return tuple(_HOISTED.values())[start:]
+
+
+def hoisted_count() -> int:
+    """Number of distinct hoisted constants (grows as schemas are compiled)"""
+    return len(_HOISTED)
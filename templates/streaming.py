@@ -0,0 +1,358 @@
+"""
+Streaming page renderers - HTML and Markdown straight to a writer
+
+Renderers walk a rendered page (the dict a Template returns, whose sections
+are the content blocks themselves) and pass encoded fragments to a
+`write(bytes)` callable: a binary file's write, socket.sendall, or
+list.append to collect a response body. Neither a JSON string nor the
+whole document string is ever built.
+
+Markup that never changes (document prologue, wrapper tags) is encoded
+once per class; escaped labels, block titles, FAQ categories and template
+names are cached per renderer. Page text is escaped as it is written.
+"""
+import html
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+Writer = Callable[[bytes], Any]
+
+# Characters html.escape() replaces
+_HTML_SPECIAL = re.compile(r"[&<>\"']")
+
+# Cached label fragments per renderer (block titles, field names, ...);
+# beyond this, fragments are escaped every time instead of cached
+STATIC_CACHE_SIZE = 4096
+
+# Headings for comparison sections (other keys fall back to _label)
+COMPARISON_HEADINGS = {
+    "ingredients": "Ingredients",
+    "benefits": "Benefits",
+    "pricing": "Pricing"
+}
+
+
+def _label(name: str) -> str:
+    """Human-readable label of a field name: key_spec -> Key spec"""
+    return name.replace("_", " ").strip().capitalize() or name
+
+
+def _text(value: Any) -> str:
+    """Display text of a scalar page value"""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    return value if isinstance(value, str) else str(value)
+
+
+def _page_title(page: Dict) -> str:
+    if page.get("page_type") == "comparison":
+        products = page.get("products", {})
+        names = [_text(item.get("name", "")) for item in products.values() if isinstance(item, dict)]
+        if names:
+            return " vs ".join(names)
+    return _text(page.get("product_name", page.get("page_type", "Page")))
+
+
+class PageRenderer(ABC):
+    """
+    Base streaming renderer
+    
+    Subclasses set format, extension and content_type, implement escape()
+    and one method per page type (faq, product, comparison). Other page
+    types (see TemplateEngine.register) are written by generic().
+    """
+    
+    format: str = None
+    extension: str = None
+    content_type: str = None
+    page_types = ("faq", "product", "comparison")
+    
+    def __init__(self):
+        self._static: Dict[str, bytes] = {}
+    
+    @abstractmethod
+    def escape(self, text: str) -> str:
+        """Text made safe to write in this format"""
+    
+    def static(self, text: str) -> bytes:
+        """Escaped, encoded fragment for text that repeats across pages"""
+        fragment = self._static.get(text)
+        if fragment is None:
+            fragment = self.escape(text).encode("utf-8")
+            if len(self._static) < STATIC_CACHE_SIZE:
+                self._static[text] = fragment
+        return fragment
+    
+    def text(self, value: Any) -> bytes:
+        """Escaped, encoded page text"""
+        if value.__class__ is not str:
+            value = _text(value)
+        return self.escape(value).encode("utf-8")
+    
+    def render(self, page: Dict, write: Writer, standalone: bool = True):
+        """
+        Write one page
+        
+        Args:
+            page: Rendered page (outputs[page_type])
+            write: Called with each encoded fragment
+            standalone: Wrap the page in a complete document
+        """
+        if standalone:
+            self.open_document(_page_title(page), write)
+        page_type = page.get("page_type")
+        method = getattr(self, page_type) if page_type in self.page_types else self.generic
+        method(page, write)
+        if standalone:
+            self.close_document(write)
+    
+    def render_pages(self, pages: Dict[str, Dict], write: Writer, title: Optional[str] = None):
+        """Write several pages (e.g. one pipeline run's outputs) as one document"""
+        if title is None:
+            first = next(iter(pages.values()), {})
+            title = _page_title(first) if first else ""
+        self.open_document(title, write)
+        for page in pages.values():
+            self.render(page, write, standalone=False)
+        self.close_document(write)
+    
+    def render_bytes(self, pages: Dict[str, Dict]) -> bytes:
+        """All pages as one encoded document"""
+        chunks = []
+        self.render_pages(pages, chunks.append)
+        return b"".join(chunks)
+    
+    def open_document(self, title: str, write: Writer):
+        pass
+    
+    def close_document(self, write: Writer):
+        pass
+
+
+class HTMLRenderer(PageRenderer):
+    """HTML5 pages: one <article> per page, sections per content block"""
+    
+    format = "html"
+    extension = ".html"
+    content_type = "text/html; charset=utf-8"
+    
+    _DOCUMENT_OPEN = b'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n<title>'
+    _DOCUMENT_BODY = b"</title>\n</head>\n<body>\n"
+    _DOCUMENT_CLOSE = b"</body>\n</html>\n"
+    
+    def escape(self, text: str) -> str:
+        return html.escape(text, quote=True) if _HTML_SPECIAL.search(text) else text
+    
+    def open_document(self, title: str, write: Writer):
+        write(self._DOCUMENT_OPEN)
+        write(self.text(title))
+        write(self._DOCUMENT_BODY)
+    
+    def close_document(self, write: Writer):
+        write(self._DOCUMENT_CLOSE)
+    
+    def _open_article(self, page_type: str, heading: bytes, write: Writer):
+        write(b'<article class="page page-' + self.static(page_type) + b'">\n<h1>' + heading + b"</h1>\n")
+    
+    def _close_article(self, page: Dict, write: Writer):
+        generated_from = (page.get("metadata") or {}).get("generated_from")
+        if generated_from:
+            write(b"<footer>Generated from " + self.static(generated_from) + b"</footer>\n")
+        write(b"</article>\n")
+    
+    def faq(self, page: Dict, write: Writer):
+        self._open_article("faq", self.text(page.get("product_name", "")) + b": Frequently Asked Questions", write)
+        category = None
+        for item in page.get("faqs", ()):
+            if item.get("category") != category:
+                if category is not None:
+                    write(b"</dl>\n</section>\n")
+                category = item.get("category")
+                write(b'<section class="faq-category">\n<h2>' + self.static(_text(category)) + b"</h2>\n<dl>\n")
+            write(b"<dt>" + self.text(item.get("question", "")) + b"</dt>\n<dd>" + self.text(item.get("answer", "")) + b"</dd>\n")
+        if category is not None:
+            write(b"</dl>\n</section>\n")
+        self._close_article(page, write)
+    
+    def product(self, page: Dict, write: Writer):
+        self._open_article("product", self.text(page.get("product_name", "")), write)
+        for name, block in page.get("sections", {}).items():
+            self._section(name, block, _label(name), write)
+        self._close_article(page, write)
+    
+    def comparison(self, page: Dict, write: Writer):
+        self._open_article("comparison", self.text(_page_title(page)), write)
+        products = [item for item in page.get("products", {}).values() if isinstance(item, dict)]
+        if products:
+            write(b'<table class="products">\n<thead>\n<tr><th></th>')
+            for item in products:
+                write(b"<th>" + self.text(item.get("name", "")) + b"</th>")
+            write(b"</tr>\n</thead>\n<tbody>\n")
+            for field in products[0]:
+                if field == "name":
+                    continue
+                write(b"<tr><th>" + self.static(_label(field)) + b"</th>")
+                for item in products:
+                    write(b"<td>" + self.text(item.get(field, "")) + b"</td>")
+                write(b"</tr>\n")
+            write(b"</tbody>\n</table>\n")
+        for name, block in page.get("comparisons", {}).items():
+            self._section(name, block, COMPARISON_HEADINGS.get(name) or _label(name), write)
+        self._close_article(page, write)
+    
+    def generic(self, page: Dict, write: Writer):
+        self._open_article(_text(page.get("page_type", "page")), self.text(_page_title(page)), write)
+        for name, value in page.items():
+            if name not in ("page_type", "product_name", "metadata"):
+                self._field(name, value, write)
+        self._close_article(page, write)
+    
+    def _section(self, name: str, block: Any, heading: str, write: Writer):
+        write(b'<section class="section" data-section="' + self.static(name) + b'">\n<h2>')
+        if isinstance(block, dict):
+            write(self.static(_text(block.get("title") or heading)) + b"</h2>\n")
+            for field, value in block.items():
+                if field != "title":
+                    self._field(field, value, write)
+        else:
+            write(self.static(heading) + b"</h2>\n")
+            self._field(name, block, write)
+        write(b"</section>\n")
+    
+    def _field(self, name: str, value: Any, write: Writer):
+        if value is None or value == [] or value == {}:
+            return
+        attribute = b' data-field="' + self.static(name) + b'"'
+        if isinstance(value, (list, tuple)):
+            write(b"<ul" + attribute + b">\n")
+            for item in value:
+                write(b"<li>" + self.text(item) + b"</li>\n")
+            write(b"</ul>\n")
+        elif isinstance(value, dict):
+            write(b"<dl" + attribute + b">\n")
+            for key, item in value.items():
+                write(b"<dt>" + self.static(_label(key)) + b"</dt><dd>" + self.text(item) + b"</dd>\n")
+            write(b"</dl>\n")
+        else:
+            write(b"<p" + attribute + b">" + self.text(value) + b"</p>\n")
+
+
+# Characters with inline meaning in CommonMark, plus "&" (entities)
+_MARKDOWN_SPECIAL = re.compile(r"[\\`*_\[\]<>|#&]")
+# Text that would start a list, quote or heading underline at line start;
+# the backslash goes where the match ends (before "-", after "10" in "10.")
+_MARKDOWN_LINE_START = re.compile(r"(?=[-+=>])|\d{1,9}(?=[.)](?:[ \t]|$))")
+# Most page text needs none of the rewriting below
+_MARKDOWN_REWRITE = re.compile(r"[\\`*_\[\]<>|#&\r\n]")
+
+
+class MarkdownRenderer(PageRenderer):
+    """CommonMark pages: headings per block, lists and a products table"""
+    
+    format = "markdown"
+    extension = ".md"
+    content_type = "text/markdown; charset=utf-8"
+    
+    def escape(self, text: str) -> str:
+        if _MARKDOWN_REWRITE.search(text):
+            text = _MARKDOWN_SPECIAL.sub(r"\\\g<0>", text)
+            text = text.replace("\r\n", " ").replace("\n", " ").replace("\r", " ")
+        match = _MARKDOWN_LINE_START.match(text)
+        if match is not None:
+            text = text[:match.end()] + "\\" + text[match.end():]
+        return text
+    
+    def _close_page(self, page: Dict, write: Writer):
+        generated_from = (page.get("metadata") or {}).get("generated_from")
+        if generated_from:
+            write(b"---\n\n*Generated from " + self.static(generated_from) + b"*\n\n")
+    
+    def faq(self, page: Dict, write: Writer):
+        write(b"# " + self.text(page.get("product_name", "")) + b": Frequently Asked Questions\n\n")
+        category = None
+        for item in page.get("faqs", ()):
+            if item.get("category") != category:
+                category = item.get("category")
+                write(b"## " + self.static(_text(category)) + b"\n\n")
+            write(b"### " + self.text(item.get("question", "")) + b"\n\n" + self.text(item.get("answer", "")) + b"\n\n")
+        self._close_page(page, write)
+    
+    def product(self, page: Dict, write: Writer):
+        write(b"# " + self.text(page.get("product_name", "")) + b"\n\n")
+        for name, block in page.get("sections", {}).items():
+            self._section(name, block, _label(name), write)
+        self._close_page(page, write)
+    
+    def comparison(self, page: Dict, write: Writer):
+        write(b"# " + self.text(_page_title(page)) + b"\n\n")
+        products = [item for item in page.get("products", {}).values() if isinstance(item, dict)]
+        if products:
+            write(b"| |")
+            for item in products:
+                write(b" " + self.text(item.get("name", "")) + b" |")
+            write(b"\n|---|" + b"---|" * len(products) + b"\n")
+            for field in products[0]:
+                if field == "name":
+                    continue
+                write(b"| **" + self.static(_label(field)) + b"** |")
+                for item in products:
+                    write(b" " + self.text(item.get(field, "")) + b" |")
+                write(b"\n")
+            write(b"\n")
+        for name, block in page.get("comparisons", {}).items():
+            self._section(name, block, COMPARISON_HEADINGS.get(name) or _label(name), write)
+        self._close_page(page, write)
+    
+    def generic(self, page: Dict, write: Writer):
+        write(b"# " + self.text(_page_title(page)) + b"\n\n")
+        for name, value in page.items():
+            if name not in ("page_type", "product_name", "metadata"):
+                self._field(name, value, write)
+        self._close_page(page, write)
+    
+    def _section(self, name: str, block: Any, heading: str, write: Writer):
+        if isinstance(block, dict):
+            write(b"## " + self.static(_text(block.get("title") or heading)) + b"\n\n")
+            for field, value in block.items():
+                if field != "title":
+                    self._field(field, value, write)
+        else:
+            write(b"## " + self.static(heading) + b"\n\n")
+            self._field(name, block, write)
+    
+    def _field(self, name: str, value: Any, write: Writer):
+        if value is None or value == [] or value == {}:
+            return
+        if isinstance(value, (list, tuple)):
+            write(b"**" + self.static(_label(name)) + b"**\n\n")
+            for item in value:
+                write(b"- " + self.text(item) + b"\n")
+            write(b"\n")
+        elif isinstance(value, dict):
+            write(b"**" + self.static(_label(name)) + b"**\n\n")
+            for key, item in value.items():
+                write(b"- " + self.static(_label(key)) + b": " + self.text(item) + b"\n")
+            write(b"\n")
+        else:
+            write(b"**" + self.static(_label(name)) + b":** " + self.text(value) + b"\n\n")
+
+
+RENDERERS = {
+    "html": HTMLRenderer,
+    "markdown": MarkdownRenderer
+}
+STREAM_FORMATS = tuple(RENDERERS)
+
+
+def get_renderer(output_format: str) -> PageRenderer:
+    """
+    A renderer for an output format (one of STREAM_FORMATS)
+    
+    Raises:
+        ValueError: If the format is unknown
+    """
+    renderer = RENDERERS.get(output_format)
+    if renderer is None:
+        raise ValueError(f"Unknown page format '{output_format}'. Expected any of: {', '.join(STREAM_FORMATS)}")
+    return renderer()
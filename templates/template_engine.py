@@ -3,6 +3,19 @@ Template Engine - Defines and manages page templates
 """
 from typing import Dict, List, Callable, Any
 from models.product import Product
+from .compiler import Arg, Attr, Call, Each, Key, PageSchema, compile_schema
+
+
+# Static page metadata, built once at import time. These dicts are shared
+# by every rendered page, so treat them as read-only.
+PRODUCT_PAGE_METADATA = {
+    "generated_from": "Product Page Template",
+    "section_count": 6
+}
+COMPARISON_PAGE_METADATA = {
+    "generated_from": "Comparison Page Template",
+    "comparison_categories": ["ingredients", "benefits", "pricing"]
+}
 
 
 class Template:
@@ -43,135 +56,126 @@ class Template:
         return result
 
 
-class FAQTemplate(Template):
-    """FAQ page template"""
+def _categories(faq_items: List[Dict]) -> List[str]:
+    """Distinct FAQ categories in order of first appearance"""
+    return list(dict.fromkeys(item["category"] for item in faq_items))
+
+
+# Page schemas, compiled into render functions once at import time
+FAQ_SCHEMA = PageSchema(
+    "faq",
+    params=("product", "questions", "answers"),
+    lets={
+        # One item per question that has an answer
+        "faq_items": Each({"q": Arg("questions"), "answer": Arg("answers")}, {
+            "category": Key("q", "category", "General"),
+            "question": Key("q", "question", ""),
+            "answer": Arg("answer")
+        })
+    },
+    body={
+        "page_type": "faq",
+        "product_name": Attr("product", "product_name"),
+        "faq_count": Call(len, Arg("faq_items")),
+        "faqs": Arg("faq_items"),
+        "metadata": {
+            "generated_from": "FAQ Template",
+            "categories": Call(_categories, Arg("faq_items"))
+        }
+    }
+)
+
+PRODUCT_PAGE_SCHEMA = PageSchema(
+    "product",
+    params=("product", "overview", "benefits", "ingredients", "usage", "safety", "pricing"),
+    body={
+        "page_type": "product",
+        "product_name": Attr("product", "product_name"),
+        "sections": {
+            "overview": Arg("overview"),
+            "benefits": Arg("benefits"),
+            "ingredients": Arg("ingredients"),
+            "usage": Arg("usage"),
+            "safety": Arg("safety"),
+            "pricing": Arg("pricing")
+        },
+        "metadata": PRODUCT_PAGE_METADATA
+    }
+)
+
+COMPARISON_PAGE_SCHEMA = PageSchema(
+    "comparison",
+    params=("product_a", "product_b", "ingredients_comparison", "benefits_comparison", "price_comparison"),
+    body={
+        "page_type": "comparison",
+        "products": {
+            "product_a": {
+                "name": Attr("product_a", "product_name"),
+                "price": Attr("product_a", "price"),
+                "key_spec": Attr("product_a", "concentration"),
+                "suitable_for": Attr("product_a", "suitable_for")
+            },
+            "product_b": {
+                "name": Attr("product_b", "product_name"),
+                "price": Attr("product_b", "price"),
+                "key_spec": Attr("product_b", "concentration"),
+                "suitable_for": Attr("product_b", "suitable_for")
+            }
+        },
+        "comparisons": {
+            "ingredients": Arg("ingredients_comparison"),
+            "benefits": Arg("benefits_comparison"),
+            "pricing": Arg("price_comparison")
+        },
+        "metadata": COMPARISON_PAGE_METADATA
+    }
+)
+
+
+class CompiledTemplate(Template):
+    """
+    Template whose render function is generated from a PageSchema
+    
+    Subclasses set `schema` and are compiled once when the class is
+    created; instances given a schema (TemplateEngine.register) are
+    compiled when constructed.
+    """
+    schema: PageSchema = None
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "schema" in cls.__dict__:
+            cls.render = staticmethod(compile_schema(cls.schema))
+    
+    def __init__(self, name: str, schema: PageSchema = None):
+        super().__init__(name)
+        if schema is not None:
+            self.schema = schema
+            self.render = compile_schema(schema)
+
+
+class FAQTemplate(CompiledTemplate):
+    """FAQ page template: render(product, questions, answers)"""
+    schema = FAQ_SCHEMA
     
     def __init__(self):
         super().__init__("FAQ")
-        
-    def render(self, product: Product, questions: List[Dict], answers: List[str]) -> Dict:
-        """
-        Render FAQ page
-        
-        Args:
-            product: Product model
-            questions: List of question dictionaries
-            answers: List of answers corresponding to questions
-            
-        Returns:
-            Structured FAQ page data
-        """
-        faq_items = []
-        
-        # Take at least 5 questions for FAQ
-        for i, q in enumerate(questions[:min(len(questions), len(answers))]):
-            faq_items.append({
-                "category": q.get("category", "General"),
-                "question": q.get("question", ""),
-                "answer": answers[i] if i < len(answers) else ""
-            })
-        
-        return {
-            "page_type": "faq",
-            "product_name": product.product_name,
-            "faq_count": len(faq_items),
-            "faqs": faq_items,
-            "metadata": {
-                "generated_from": "FAQ Template",
-                "categories": list(set([item["category"] for item in faq_items]))
-            }
-        }
 
 
-class ProductPageTemplate(Template):
-    """Product description page template"""
+class ProductPageTemplate(CompiledTemplate):
+    """Product description page template: render(product, overview, benefits, ingredients, usage, safety, pricing)"""
+    schema = PRODUCT_PAGE_SCHEMA
     
     def __init__(self):
         super().__init__("ProductPage")
-        
-    def render(self, product: Product, overview: Dict, benefits: Dict, 
-               ingredients: Dict, usage: Dict, safety: Dict, pricing: Dict) -> Dict:
-        """
-        Render product page
-        
-        Args:
-            product: Product model
-            overview: Overview block data
-            benefits: Benefits block data
-            ingredients: Ingredients block data
-            usage: Usage block data
-            safety: Safety block data
-            pricing: Pricing block data
-            
-        Returns:
-            Structured product page data
-        """
-        return {
-            "page_type": "product",
-            "product_name": product.product_name,
-            "sections": {
-                "overview": overview,
-                "benefits": benefits,
-                "ingredients": ingredients,
-                "usage": usage,
-                "safety": safety,
-                "pricing": pricing
-            },
-            "metadata": {
-                "generated_from": "Product Page Template",
-                "section_count": 6
-            }
-        }
 
 
-class ComparisonPageTemplate(Template):
-    """Comparison page template"""
+class ComparisonPageTemplate(CompiledTemplate):
+    """Comparison page template: render(product_a, product_b, ingredients_comparison, benefits_comparison, price_comparison)"""
+    schema = COMPARISON_PAGE_SCHEMA
     
     def __init__(self):
         super().__init__("ComparisonPage")
-        
-    def render(self, product_a: Product, product_b: Product,
-               ingredients_comparison: Dict, benefits_comparison: Dict,
-               price_comparison: Dict) -> Dict:
-        """
-        Render comparison page
-        
-        Args:
-            product_a: First product
-            product_b: Second product
-            ingredients_comparison: Ingredients comparison block
-            benefits_comparison: Benefits comparison block
-            price_comparison: Price comparison block
-            
-        Returns:
-            Structured comparison page data
-        """
-        return {
-            "page_type": "comparison",
-            "products": {
-                "product_a": {
-                    "name": product_a.product_name,
-                    "price": product_a.price,
-                    "key_spec": product_a.concentration,
-                    "suitable_for": product_a.suitable_for
-                },
-                "product_b": {
-                    "name": product_b.product_name,
-                    "price": product_b.price,
-                    "key_spec": product_b.concentration,
-                    "suitable_for": product_b.suitable_for
-                }
-            },
-            "comparisons": {
-                "ingredients": ingredients_comparison,
-                "benefits": benefits_comparison,
-                "pricing": price_comparison
-            },
-            "metadata": {
-                "generated_from": "Comparison Page Template",
-                "comparison_categories": ["ingredients", "benefits", "pricing"]
-            }
-        }
 
 
 class TemplateEngine:
@@ -184,6 +188,17 @@ class TemplateEngine:
             "comparison": ComparisonPageTemplate()
         }
     
+    def register(self, template_name: str, schema: PageSchema) -> Template:
+        """
+        Add a page type from a schema (compiled now; see templates.compiler)
+        
+        Raises:
+            ValueError: If the schema is invalid
+        """
+        template = CompiledTemplate(template_name, schema)
+        self.templates[template_name] = template
+        return template
+    
     def get_template(self, template_name: str) -> Template:
         """Get template by name"""
         if template_name not in self.templates:
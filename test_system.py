@@ -3,11 +3,48 @@ Test suite for the Multi-Agent Content Generation System
 """
 import json
 import os
+import threading
+import time
+import http.client
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer
 from models.product import Product
 from agents import DataParserAgent, QuestionGenerationAgent, FAQGenerationAgent, ContentAssemblyAgent
 from orchestrator import WorkflowOrchestrator
 
 
+def _load_input_data():
+    with open("input_data.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@contextmanager
+def _local_server():
+    """Run the API handler on a throwaway local port; yields the port"""
+    from api.generate import handler
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _api_request(method, path, body=None, headers=None):
+    """Send one request to a throwaway local API server; returns (status, headers, body bytes)"""
+    with _local_server() as port:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        payload = json.dumps(body).encode() if body is not None else None
+        conn.request(method, path, body=payload, headers=headers or {})
+        response = conn.getresponse()
+        result = (response.status, dict(response.getheaders()), response.read())
+        conn.close()
+        return result
+
+
 def test_product_model():
     """Test Product model creation and conversion"""
     print("Testing Product model...")
@@ -231,6 +268,1368 @@ def test_comparison_page_structure():
     print("✓ Comparison page structure valid")
 
 
+def test_page_selection():
+    """Test that unrequested pages and their stages are pruned"""
+    print("Testing page selection...")
+    
+    orchestrator = WorkflowOrchestrator()
+    results = orchestrator.execute_pipeline_from_data(_load_input_data(), pages="product")
+    
+    assert list(results["outputs"].keys()) == ["product"]
+    assert "QuestionGenerationAgent" not in results["agents_executed"]
+    assert "FAQGenerationAgent" not in results["agents_executed"]
+    assert orchestrator.get_workflow_state()["state"]["questions_generated"] == 0
+    
+    try:
+        orchestrator.execute_pipeline_from_data(_load_input_data(), pages="product,reviews")
+        assert False, "Unknown page type should be rejected"
+    except ValueError:
+        pass
+    
+    status, _, body = _api_request('POST', '/api/generate?pages=faq',
+                                   {"product_a": _load_input_data()})
+    assert status == 200
+    assert list(json.loads(body)["outputs"].keys()) == ["faq"]
+    
+    status, _, _ = _api_request('POST', '/api/generate',
+                                {"product_a": _load_input_data(), "pages": ["nope"]})
+    assert status == 400
+    
+    print("✓ Page selection tests passed")
+
+
+def test_field_projection():
+    """Test fields= projection and compact output on the API"""
+    print("Testing field projection...")
+    
+    from server import parse_fields, project
+    
+    tree = parse_fields("faq.faqs.question,product.sections.pricing")
+    page = {"faqs": [{"question": "Q1", "answer": "A1"}, {"question": "Q2", "answer": "A2"}]}
+    assert project(page, tree["faq"]) == {"faqs": [{"question": "Q1"}, {"question": "Q2"}]}
+    assert parse_fields("product,product.sections") == {"product": None}
+    
+    status, _, full = _api_request('POST', '/api/generate', {"product_a": _load_input_data()})
+    status, _, body = _api_request('POST', '/api/generate?compact=1', {
+        "product_a": _load_input_data(),
+        "fields": "faq.faqs.question,product.sections.pricing"
+    })
+    assert status == 200
+    data = json.loads(body)
+    assert set(data["outputs"].keys()) == {"faq", "product"}
+    assert "agents_executed" not in data
+    assert all(list(item.keys()) == ["question"] for item in data["outputs"]["faq"]["faqs"])
+    assert list(data["outputs"]["product"]["sections"].keys()) == ["pricing"]
+    assert b"\n" not in body
+    assert len(body) * 3 < len(full)
+    
+    print(f"✓ Field projection tests passed ({len(body)} of {len(full)} bytes)")
+
+
+def test_response_compression():
+    """Test Accept-Encoding negotiation on API responses"""
+    print("Testing response compression...")
+    
+    import gzip
+    import zlib
+    from server import negotiate_encoding
+    
+    assert negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert negotiate_encoding("gzip;q=0.5, deflate") == "deflate"
+    assert negotiate_encoding("gzip;q=0, *;q=0.1") == "deflate"
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding(None) is None
+    
+    request = {"product_a": _load_input_data()}
+    _, headers, plain = _api_request('POST', '/api/generate', request)
+    assert "Content-Encoding" not in headers
+    
+    _, headers, body = _api_request('POST', '/api/generate', request, {"Accept-Encoding": "gzip"})
+    assert headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == plain
+    
+    _, headers, body = _api_request('POST', '/api/generate', request, {"Accept-Encoding": "deflate"})
+    assert headers["Content-Encoding"] == "deflate"
+    assert zlib.decompress(body) == plain
+    
+    # Small error bodies stay below the threshold
+    _, headers, _ = _api_request('POST', '/api/generate', {}, {"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in headers
+    
+    print("✓ Response compression tests passed")
+
+
+def test_metrics_endpoint():
+    """Test Prometheus-style /metrics exposition"""
+    print("Testing /metrics endpoint...")
+    
+    from server.metrics import REQUESTS, Histogram, Metric
+    
+    try:
+        Metric("incomplete", "No samples()")
+        assert False, "Should reject a metric without samples()"
+    except TypeError:
+        pass
+    
+    histogram = Histogram("demo_seconds", "Demo", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    assert 'demo_seconds_bucket{le="0.1"} 1' in histogram.render()
+    assert 'demo_seconds_bucket{le="+Inf"} 2' in histogram.render()
+    
+    before = REQUESTS.value(method="POST", status="200")
+    _api_request('POST', '/api/generate', {"product_a": _load_input_data()})
+    assert REQUESTS.value(method="POST", status="200") == before + 1
+    
+    status, headers, body = _api_request('GET', '/metrics')
+    text = body.decode()
+    assert status == 200
+    assert headers["Content-type"].startswith("text/plain")
+    for name in ("generate_requests_total", "generate_request_duration_seconds_bucket",
+                 "generate_stage_duration_seconds_count{stage=\"answers\"}",
+                 "generate_requests_in_flight", "generate_response_bytes_total"):
+        assert name in text, f"Missing {name}"
+    
+    print("✓ Metrics endpoint tests passed")
+
+
+def test_server_timing():
+    """Test Server-Timing header and debug body field"""
+    print("Testing Server-Timing...")
+    
+    status, headers, body = _api_request('POST', '/api/generate?debug=1',
+                                         {"product_a": _load_input_data()})
+    assert status == 200
+    timing = headers["Server-Timing"]
+    stages = [entry.split(";")[0] for entry in timing.split(", ")]
+    for stage in ("read", "parse", "questions", "answers", "faq_page", "product_page", "encode", "total"):
+        assert stage in stages, f"Missing stage {stage} in {timing}"
+    
+    debug = json.loads(body)["debug"]
+    assert debug["cpu_time_ms"] >= 0
+    assert debug["allocated_blocks"] > 0
+    assert "answers" in debug["stages_ms"]
+    
+    _, _, body = _api_request('POST', '/api/generate', {"product_a": _load_input_data()})
+    assert "debug" not in json.loads(body)
+    
+    # Overlapping probes share tracing: the first to stop must not end the other's
+    import tracemalloc
+    from server import DebugProbe
+    first, second = DebugProbe(), DebugProbe()
+    first.start()
+    second.start()
+    assert first.stop()["allocated_blocks"] is not None
+    assert tracemalloc.is_tracing()
+    assert second.stop()["allocated_blocks"] is not None
+    assert not tracemalloc.is_tracing()
+    
+    # CPU time is the probing thread's own, not that of concurrent requests
+    def burn():
+        start = time.thread_time()
+        while time.thread_time() - start < 0.3:
+            pass
+    
+    probe = DebugProbe()
+    probe.start()
+    busy = threading.Thread(target=burn)
+    busy.start()
+    busy.join()
+    assert probe.stop()["cpu_time_ms"] < 150
+    
+    print("✓ Server-Timing tests passed")
+
+
+def test_admission_control():
+    """Test rate limiting, bounded concurrency and fast rejections"""
+    print("Testing admission control...")
+    
+    from server.admission import AdmissionController, ConcurrencyLimiter, RateLimiter
+    from api.generate import handler
+    
+    limiter = RateLimiter(rate=1, burst=2)
+    assert limiter.check("a") is None and limiter.check("a") is None
+    rejection = limiter.check("a")
+    assert rejection.status == 429 and rejection.retry_after >= 1
+    assert limiter.check("b") is None
+    
+    concurrency = ConcurrencyLimiter(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+    assert concurrency.acquire() is None
+    assert concurrency.acquire().reason == "queue_timeout"
+    
+    # A waiter queued behind the busy slot gets it on release; the next one is shed
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(concurrency.acquire()))
+    concurrency.queue_timeout = 5
+    waiter.start()
+    while not concurrency._waiters:
+        time.sleep(0.001)
+    assert concurrency.acquire().reason == "queue_full"
+    concurrency.release()
+    waiter.join()
+    assert admitted == [None] and concurrency.in_flight == 1
+    
+    original = handler.admission
+    handler.admission = AdmissionController(rate=1, burst=1, max_in_flight=4,
+                                            max_queue=4, queue_timeout=1)
+    try:
+        request = {"product_a": _load_input_data(), "pages": "product"}
+        assert _api_request('POST', '/api/generate', request)[0] == 200
+        status, headers, body = _api_request('POST', '/api/generate', request)
+        assert status == 429
+        assert int(headers["Retry-After"]) >= 1
+        assert json.loads(body)["reason"] == "rate_limited"
+        
+        # A client-chosen X-Forwarded-For does not get a fresh bucket...
+        spoofed = {'X-Forwarded-For': '203.0.113.7'}
+        assert _api_request('POST', '/api/generate', request, spoofed)[0] == 429
+        # ...but behind a trusted proxy, the hop it appended identifies the client
+        handler.trusted_proxies = 1
+        proxied = {'X-Forwarded-For': '203.0.113.7, 198.51.100.1'}
+        assert _api_request('POST', '/api/generate', request, proxied)[0] == 200
+        assert _api_request('POST', '/api/generate', request, proxied)[0] == 429
+        proxied = {'X-Forwarded-For': '203.0.113.7, 198.51.100.2'}
+        assert _api_request('POST', '/api/generate', request, proxied)[0] == 200
+    finally:
+        handler.admission = original
+        handler.trusted_proxies = 0
+    
+    print("✓ Admission control tests passed")
+
+
+def test_job_api():
+    """Test asynchronous job submission, progress, results and cancellation"""
+    print("Testing job API...")
+    
+    import tempfile
+    from server.jobs import JobStore, JobWorkerPool, run_job, COMPLETED, CANCELLED
+    from api.generate import handler
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(os.path.join(tmp, "jobs.sqlite3"))
+        
+        # Cancelled jobs are never claimed
+        job_id = store.submit([_load_input_data()])
+        assert store.cancel(job_id)
+        assert store.claim_next() is None
+        assert store.get(job_id)["status"] == CANCELLED
+        
+        # A malformed catalog entry fails only its own item
+        job_id = store.submit([5, _load_input_data()], pages="product")
+        assert store.claim_next() == job_id
+        run_job(store, job_id)
+        job = store.get(job_id)
+        assert job["status"] == COMPLETED and (job["completed"], job["failed"]) == (1, 1)
+        assert store.results(job_id)[0]["error"] == "catalog entry must be an object"
+        
+        # A running job is only taken over once its worker's lease expires
+        job_id = store.submit([_load_input_data()], pages="product")
+        assert store.claim_next("slow", lease=60) == job_id
+        assert store.requeue_stale() == 0 and store.claim_next("other") is None
+        assert not store.renew(job_id, "other") and store.renew(job_id, "slow", lease=0)
+        time.sleep(0.01)
+        assert store.claim_next("other") == job_id
+        assert not store.renew(job_id, "slow") and not store.record_result(job_id, 0, "late", worker="slow")
+        run_job(store, job_id, worker="other")
+        job = store.get(job_id)
+        assert job["status"] == COMPLETED and (job["completed"], job["failed"]) == (1, 0)
+        
+        pool = JobWorkerPool(store, workers=1, poll_interval=0.05)
+        original = (handler.job_store, handler.job_workers)
+        handler.job_store, handler.job_workers = store, pool
+        pool.start()
+        try:
+            catalog = [dict(_load_input_data(), product_name=f"Serum {i}") for i in range(3)]
+            status, headers, body = _api_request('POST', '/api/jobs', {"products": catalog, "pages": "product"})
+            assert status == 202
+            job_id = json.loads(body)["job_id"]
+            assert headers["Location"] == f"/api/jobs/{job_id}"
+            
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                job = json.loads(_api_request('GET', f'/api/jobs/{job_id}')[2])
+                if job["status"] == COMPLETED:
+                    break
+                time.sleep(0.05)
+            assert job["status"] == COMPLETED and job["progress"] == 1.0
+            assert job["completed"] == 3
+            
+            _, _, body = _api_request('GET', f'/api/jobs/{job_id}/results?limit=2')
+            results = json.loads(body)["results"]
+            assert [r["product_name"] for r in results] == ["Serum 0", "Serum 1"]
+            assert list(results[0]["outputs"].keys()) == ["product"]
+            _, _, body = _api_request('GET', f'/api/jobs/{job_id}/results?limit=-1')
+            assert len(json.loads(body)["results"]) == 1
+            for query in ("offset=-1", "limit=all", "offset=1.5"):
+                assert _api_request('GET', f'/api/jobs/{job_id}/results?{query}')[0] == 400
+            
+            assert _api_request('DELETE', f'/api/jobs/{job_id}')[0] == 409
+            assert _api_request('GET', '/api/jobs/missing')[0] == 404
+            assert _api_request('POST', '/api/jobs', {"products": []})[0] == 400
+        finally:
+            pool.stop()
+            handler.job_store, handler.job_workers = original
+    
+    print("✓ Job API tests passed")
+
+
+def test_cold_start_imports():
+    """Test that importing the API does not load the agent pipeline"""
+    print("Testing cold-start imports...")
+    
+    import subprocess
+    import sys
+    
+    code = ("import sys, api.generate; "
+            "print(sorted(m for m in ('agents', 'templates', 'blocks', 'server.jobs') if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == "[]", proc.stdout
+    
+    from benchmarks.cold_start import measure_import_time
+    report = measure_import_time("orchestrator.pages")
+    assert report["cumulative_us"] > 0
+    
+    print("✓ Cold-start import tests passed")
+
+
+def test_serialization_fast_path():
+    """Test single-pass compact encoding matches json.dumps"""
+    print("Testing serialization fast path...")
+    
+    from server import serialization
+    from templates.template_engine import PRODUCT_PAGE_METADATA
+    
+    orchestrator = WorkflowOrchestrator()
+    product_b = dict(_load_input_data(), product_name="RadiantGlow Essence", price="₹899")
+    results = orchestrator.execute_pipeline_from_data(_load_input_data(), product_b)
+    
+    for name, page in results["outputs"].items():
+        assert json.loads(serialization.encode_page(page)) == page, name
+    
+    body = serialization.encode_response(results["outputs"], agents_executed=results["agents_executed"], debug=None)
+    decoded = json.loads(body)
+    assert decoded == {"success": True, "outputs": results["outputs"],
+                       "agents_executed": results["agents_executed"]}
+    assert "₹".encode() in body
+    
+    # Static metadata is served from the pre-encoded fragment cache
+    assert serialization.encode_value(PRODUCT_PAGE_METADATA) is serialization.encode_value(PRODUCT_PAGE_METADATA)
+    
+    _, headers, pretty = _api_request('POST', '/api/generate?compact=false', {"product_a": _load_input_data()})
+    assert b"\n  " in pretty
+    assert headers["Content-type"] == "application/json"
+    
+    print("✓ Serialization fast path tests passed")
+
+
+def test_static_files():
+    """Test cached static assets, validators and conditional GETs"""
+    print("Testing static file serving...")
+    
+    import gzip
+    import tempfile
+    from server import StaticFiles
+    from api.generate import handler
+    
+    status, headers, body = _api_request('GET', '/')
+    assert status == 200 and body.startswith(b"<!DOCTYPE html>")
+    assert headers["Content-type"] == "text/html; charset=utf-8"
+    etag, last_modified = headers["ETag"], headers["Last-Modified"]
+    assert "max-age" in headers["Cache-Control"]
+    
+    assert _api_request('GET', '/index.html', headers={"If-None-Match": etag})[0] == 304
+    assert _api_request('GET', '/', headers={"If-Modified-Since": last_modified})[0] == 304
+    assert _api_request('GET', '/', headers={"If-None-Match": '"stale"'})[0] == 200
+    
+    _, headers, zipped = _api_request('GET', '/', headers={"Accept-Encoding": "gzip"})
+    assert headers["Content-Encoding"] == "gzip" and gzip.decompress(zipped) == body
+    
+    assert _api_request('GET', '/../api/generate.py')[0] == 404
+    assert _api_request('GET', '/%2e%2e/input_data.json')[0] == 404
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        asset = os.path.join(tmp, "data.bin")
+        with open(asset, "wb") as f:
+            f.write(os.urandom(200000))
+        original = handler.static_files
+        handler.static_files = StaticFiles(tmp, max_cached_size=1024)
+        try:
+            status, headers, served = _api_request('GET', '/data.bin')
+            assert status == 200 and len(served) == 200000
+            with open(asset, "rb") as f:
+                assert served == f.read()
+            
+            # Edits on disk invalidate the cached entry
+            entry = handler.static_files.lookup(asset)
+            with open(asset, "ab") as f:
+                f.write(b"more")
+            assert handler.static_files.lookup(asset).size == entry.size + 4
+        finally:
+            handler.static_files = original
+    
+    print("✓ Static file tests passed")
+
+
+def test_benchmark_suite():
+    """Test synthetic catalog determinism and baseline regression checks"""
+    print("Testing benchmark suite...")
+    
+    from benchmarks.catalog import generate_catalog
+    from benchmarks.suite import run_suite, compare_to_baseline
+    
+    first = list(generate_catalog(50, seed=7))
+    assert first == list(generate_catalog(50, seed=7))
+    assert first != list(generate_catalog(50, seed=8))
+    assert len({p["sku"] for p in first}) == 50
+    assert all(1 <= len(p["key_ingredients"]) <= 10 and p["benefits"] for p in first)
+    
+    report = run_suite(products=20, only="block.")
+    assert len(report["results"]) == 9
+    row = report["results"]["block.generate_overview_block"]
+    assert row["ops_per_sec"] > 0 and row["latency_us"]["p99"] >= row["latency_us"]["p50"]
+    
+    assert compare_to_baseline(report, report) == []
+    faster = json.loads(json.dumps(report))
+    faster["results"]["block.generate_overview_block"]["ops_per_sec"] *= 10
+    regressions = compare_to_baseline(report, faster)
+    assert len(regressions) == 1 and "generate_overview_block" in regressions[0]
+    
+    print("✓ Benchmark suite tests passed")
+
+
+def test_load_generator():
+    """Test open- and closed-loop load generation reports"""
+    print("Testing load generator...")
+    
+    from benchmarks.load_test import PayloadFactory, parse_mix, run_open_loop, run_closed_loop
+    from server import AdmissionController
+    from api.generate import handler
+    
+    try:
+        parse_mix("single=1,bulk=2")
+        assert False, "Unknown payload kind should be rejected"
+    except ValueError:
+        pass
+    
+    payloads = PayloadFactory(parse_mix("single=3,comparison=1"), seed=1)
+    original = handler.admission
+    handler.admission = AdmissionController(rate=0, burst=0, max_in_flight=8, max_queue=8, queue_timeout=5)
+    try:
+        with _local_server() as port:
+            url = f"http://127.0.0.1:{port}"
+            report = run_open_loop(url, payloads, rate=40, duration=0.5)
+            assert report["mode"] == "open" and report["requests"] == 20
+            assert report["statuses"] == {"200": 20}
+            assert report["latency_ms"]["p99"] >= report["latency_ms"]["p50"] > 0
+            assert set(report["latency_ms_by_kind"]) <= {"single", "comparison"}
+            
+            report = run_closed_loop(url, payloads, concurrency=2, duration=0.3)
+            assert report["mode"] == "closed" and report["successful"] == report["requests"] > 0
+    finally:
+        handler.admission = original
+    
+    print("✓ Load generator tests passed")
+
+
+def test_profiling_mode():
+    """Test cProfile and per-stage allocation artifacts, CLI and sampled API"""
+    print("Testing profiling mode...")
+    
+    import pstats
+    import tempfile
+    from orchestrator import PipelineProfiler
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        orchestrator = WorkflowOrchestrator(profiler=PipelineProfiler(output_dir=tmp))
+        results = orchestrator.execute_pipeline_from_data(_load_input_data())
+        artifacts = results["profile"]
+        
+        stats = pstats.Stats(artifacts["pstats"])
+        assert any(func[2] == "generate_answers" for func in stats.stats)
+        with open(artifacts["allocations"], 'r', encoding='utf-8') as f:
+            allocations = json.load(f)
+        assert set(allocations["stages"]) == set(results["timings"])
+        assert allocations["stages"]["answers"]["top_allocations"]
+        
+        # A debug probe ending mid-run does not stop the run's tracing
+        from server import DebugProbe
+        probe = DebugProbe()
+        probe.start()
+        run = PipelineProfiler(output_dir=tmp).start_run("overlap")
+        probe.stop()
+        with run.stage("after_probe"):
+            _load_input_data()
+        assert "after_probe" in run.stages
+        run.stop()
+        
+        saved = {key: os.environ.get(key) for key in ("GENERATE_PROFILE_SAMPLE_RATE", "CONTENT_PROFILE_DIR")}
+        os.environ.update(GENERATE_PROFILE_SAMPLE_RATE="1", CONTENT_PROFILE_DIR=tmp)
+        try:
+            _, headers, _ = _api_request('POST', '/api/generate', {"product_a": _load_input_data()})
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        assert headers["X-Profile-Id"].startswith("api-")
+        assert os.path.exists(os.path.join(tmp, headers["X-Profile-Id"] + ".pstats"))
+    
+    assert "profile" not in WorkflowOrchestrator().execute_pipeline_from_data(_load_input_data())
+    
+    print("✓ Profiling mode tests passed")
+
+
+def test_catalog_cli():
+    """Test the catalog batch CLI: formats, comparisons, incremental and resume"""
+    print("Testing catalog CLI...")
+    
+    import tempfile
+    import main as cli
+    from benchmarks.catalog import generate_catalog
+    from orchestrator.sinks import slugify
+    
+    catalog = list(generate_catalog(6, seed=3))
+    catalog[0]["compare_with"] = catalog[1]["sku"]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "a.ndjson"), 'w', encoding='utf-8') as f:
+            for product in catalog[:4]:
+                f.write(json.dumps(product, ensure_ascii=False) + "\n")
+        with open(os.path.join(tmp, "b.json"), 'w', encoding='utf-8') as f:
+            json.dump(catalog[4:], f, ensure_ascii=False)
+        pattern = os.path.join(tmp, "*.*json")
+        out = os.path.join(tmp, "out")
+        
+        assert cli.main([pattern, "-o", out, "--workers", "2", "--quiet"]) == 0
+        first = os.path.join(out, slugify(catalog[0]["sku"]))
+        assert sorted(os.listdir(first)) == ["comparison_page.json", "faq.json", "product_page.json"]
+        assert "comparison_page.json" not in os.listdir(os.path.join(out, slugify(catalog[2]["sku"])))
+        with open(os.path.join(first, "comparison_page.json"), 'r', encoding='utf-8') as f:
+            comparison = json.load(f)
+        assert catalog[1]["product_name"] in json.dumps(comparison, ensure_ascii=False)
+        
+        # Incremental: only the edited product is regenerated
+        from orchestrator.batch import BatchRunner
+        from orchestrator.sinks import make_sink
+        catalog[5]["price"] = "₹1"
+        with open(os.path.join(tmp, "b.json"), 'w', encoding='utf-8') as f:
+            json.dump(catalog[4:], f, ensure_ascii=False)
+        sink = make_sink(out, "json")
+        summary = BatchRunner(sink, incremental=True).run(pattern)
+        assert summary["generated"] == 1 and summary["skipped"] == 5
+        
+        # NDJSON sink, page selection, resume
+        ndjson = os.path.join(tmp, "pages.ndjson")
+        assert cli.main([pattern, "-o", ndjson, "--format", "ndjson", "--pages", "product",
+                         "--workers", "1", "--quiet"]) == 0
+        with open(ndjson, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 6 and all(list(r["outputs"]) == ["product"] for r in records)
+        sink = make_sink(ndjson, "ndjson", append=True)
+        assert BatchRunner(sink, pages="product", resume=True).run(pattern)["skipped"] == 6
+        sink.close()
+        
+        # A killed run never records products whose pages were still buffered,
+        # so resuming it yields every product
+        import subprocess
+        import sys
+        big = os.path.join(tmp, "big.ndjson")
+        with open(big, 'w', encoding='utf-8') as f:
+            for product in generate_catalog(3000, seed=5):
+                f.write(json.dumps(product, ensure_ascii=False) + "\n")
+        ndjson = os.path.join(tmp, "killed.ndjson")
+        proc = subprocess.Popen([sys.executable, "main.py", big, "-o", ndjson, "--format", "ndjson",
+                                 "--workers", "1", "-q"], stderr=subprocess.DEVNULL)
+        deadline = time.time() + 60
+        while time.time() < deadline and proc.poll() is None:
+            if os.path.exists(ndjson + ".manifest.ndjson") and os.path.getsize(ndjson + ".manifest.ndjson") > 40000:
+                break
+            time.sleep(0.01)
+        proc.kill()
+        proc.wait()
+        
+        def written():
+            with open(ndjson, 'r', encoding='utf-8') as f:
+                return {json.loads(line)["key"] for line in f}
+        
+        with open(ndjson + ".manifest.ndjson", 'r', encoding='utf-8') as f:
+            recorded = {json.loads(line)["key"] for line in f}
+        assert recorded and recorded <= written()
+        assert cli.main([big, "-o", ndjson, "--format", "ndjson", "--workers", "1", "--resume", "-q"]) == 0
+        assert len(written()) == 3000
+    
+    print("✓ Catalog CLI tests passed")
+
+
+def test_change_feed():
+    """Test change-log coalescing, dependent comparisons, deletes and offsets"""
+    print("Testing change feed...")
+    
+    import tempfile
+    from orchestrator.change_feed import ChangeFeedConsumer
+    from orchestrator.sinks import make_sink
+    
+    base = _load_input_data()
+    rival = dict(base, sku="B", product_name="Rival Serum")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "changes.ndjson")
+        out = os.path.join(tmp, "site")
+        
+        def append(*events):
+            with open(log, 'a', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        
+        def page(key, name):
+            path = os.path.join(out, key, name + ".json")
+            if not os.path.exists(path):
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        
+        sink = make_sink(out, "json")
+        consumer = ChangeFeedConsumer(log, sink, window=0)
+        append({"op": "upsert", "product": rival},
+               {"op": "upsert", "product": dict(base, sku="A", price="₹1", compare_with="B")},
+               {"op": "upsert", "product": dict(base, sku="A", price="₹2", compare_with="B")})
+        assert consumer.poll() == 3 and len(consumer.pending) == 2
+        summary = consumer.flush()
+        assert summary["upserted"] == 2 and summary["rendered"] == 2
+        assert "₹2" in json.dumps(page("A", "product_page"), ensure_ascii=False)
+        assert page("A", "comparison_page") is not None
+        
+        # Updating B regenerates A's comparison too
+        append({"op": "upsert", "product": dict(rival, product_name="Rival Serum v2")})
+        consumer.poll()
+        assert consumer.flush()["rendered"] == 2
+        assert "Rival Serum v2" in json.dumps(page("A", "comparison_page"))
+        
+        # A partial trailing line waits; deleting B drops A's comparison page
+        with open(log, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"op": "delete", "sku": "B"}) + "\n" + '{"op": "ups')
+        consumer.poll()
+        summary = consumer.flush()
+        assert summary["deleted"] == 1 and page("B", "faq") is None
+        assert page("A", "comparison_page") is None and page("A", "faq") is not None
+        committed = summary["offset"]
+        assert committed == os.path.getsize(log) - len('{"op": "ups')
+        consumer.close()
+        
+        # A restarted consumer resumes from the committed offset with its state rebuilt
+        with open(log, 'a', encoding='utf-8') as f:
+            f.write('ert", "product": ' + json.dumps(rival) + '}\n')
+        restarted = ChangeFeedConsumer(log, sink, window=0)
+        assert restarted.committed_offset == committed and set(restarted.index.products) == {"A"}
+        restarted.poll()
+        assert restarted.flush()["rendered"] == 2
+        assert page("A", "comparison_page") is not None
+        restarted.close()
+    
+    print("✓ Change feed tests passed")
+
+
+def test_answer_backend():
+    """Test the HTTP answer backend: batching, pooling, retries and fallback"""
+    print("Testing answer backend...")
+    
+    from agents.answer_backends import HTTPAnswerBackend
+    from benchmarks.stub_generation_server import spawn_stub
+    
+    product = Product.from_dict(_load_input_data())
+    questions = QuestionGenerationAgent().generate_questions(product)
+    rule_based = FAQGenerationAgent(backend=None).generate_answers(product, questions)
+    
+    server, url = spawn_stub(latency=0.01)
+    backend = HTTPAnswerBackend(url, batch_size=5, concurrency=4, timeout=2.0, backoff=0.001)
+    try:
+        answers = FAQGenerationAgent(backend=backend).generate_answers(product, questions)
+        assert len(answers) == len(questions)
+        assert all(a.startswith("[stub]") and q["question"] in a for a, q in zip(answers, questions))
+        assert server.requests == backend.stats["requests"] == -(-len(questions) // 5)
+        
+        # Also usable from code already running an event loop
+        import asyncio
+        
+        async def from_coroutine():
+            return FAQGenerationAgent(backend=backend).generate_answers(product, questions)
+        
+        assert asyncio.run(from_coroutine()) == answers
+        
+        # Failing backend: retried, then rule-based answers
+        server.error_rate = 1.0
+        answers = FAQGenerationAgent(backend=backend).generate_answers(product, questions)
+        assert answers == rule_based
+        assert backend.stats["retries"] > 0 and backend.stats["fallbacks"] == len(questions)
+    finally:
+        backend.close()
+        server.shutdown()
+        server.server_close()
+    
+    # Unreachable backend falls back too
+    backend = HTTPAnswerBackend("http://127.0.0.1:9/generate", retries=0, timeout=0.5)
+    assert FAQGenerationAgent(backend=backend).generate_answers(product, questions) == rule_based
+    backend.close()
+    
+    # Agents built from the environment share one backend (pool, executor, bound)
+    saved = os.environ.get("ANSWER_BACKEND_URL")
+    os.environ["ANSWER_BACKEND_URL"] = "http://127.0.0.1:9/generate"
+    try:
+        shared = FAQGenerationAgent().backend
+        assert shared is FAQGenerationAgent().backend is HTTPAnswerBackend.from_env()
+        os.environ["ANSWER_BACKEND_URL"] = "http://127.0.0.1:9/other"
+        assert HTTPAnswerBackend.from_env() is not shared
+    finally:
+        if saved is None:
+            os.environ.pop("ANSWER_BACKEND_URL")
+        else:
+            os.environ["ANSWER_BACKEND_URL"] = saved
+    
+    print("✓ Answer backend tests passed")
+
+
+def test_answer_cache():
+    """Test memoized FAQ answers: sharing across variants, LRU bound, stats"""
+    print("Testing answer cache...")
+    
+    from agents.answer_cache import AnswerCache
+    
+    data = _load_input_data()
+    variant = dict(data, product_name="GlowBoost Mini", price="₹399")
+    question_agent = QuestionGenerationAgent()
+    uncached = FAQGenerationAgent(cache=AnswerCache(0))
+    cached = FAQGenerationAgent(cache=AnswerCache(64))
+    
+    for product_data in (data, variant, data):
+        product = Product.from_dict(product_data)
+        questions = question_agent.generate_questions(product)
+        assert cached.generate_answers(product, questions) == uncached.generate_answers(product, questions)
+    
+    stats = cached.cache.stats()
+    # The variant reuses every answer that reads neither name nor price;
+    # the repeated product is served entirely from cache
+    assert stats["hits"] >= len(questions) + 5
+    assert 0 < stats["hit_rate"] < 1 and stats["size"] <= 64
+    
+    small = FAQGenerationAgent(cache=AnswerCache(4))
+    product = Product.from_dict(data)
+    small.generate_answers(product, question_agent.generate_questions(product))
+    assert small.cache.stats()["size"] == 4 and small.cache.stats()["evictions"] > 0
+    
+    # Equal but differently typed values render differently, so they bypass the cache
+    for price in (10.0, 10, True, {"amount": 10}, ["₹10"]):
+        product = Product.from_dict(dict(data, price=price))
+        questions = question_agent.generate_questions(product)
+        assert cached.generate_answers(product, questions) == uncached.generate_answers(product, questions)
+        assert any(answer.endswith(f"is priced at {price}.") for answer in cached.generate_answers(product, questions))
+    
+    # Shared cache totals are published on /metrics
+    _api_request('POST', '/api/generate', {"product_a": data})
+    _, _, body = _api_request('GET', '/metrics')
+    assert 'generate_cache_requests_total{cache="faq_answers",result="hit"}' in body.decode()
+    
+    print("✓ Answer cache tests passed")
+
+
+def test_block_cache():
+    """Test the shared on-disk block cache: reuse across agents, versioning"""
+    print("Testing block cache...")
+    
+    import tempfile
+    from blocks import block_cache
+    from blocks.block_cache import BlockCache
+    
+    product = Product.from_dict(_load_input_data())
+    variant = Product.from_dict(dict(_load_input_data(), price="₹399"))
+    plain = ContentAssemblyAgent(block_cache=None)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "blocks.sqlite3")
+        first = ContentAssemblyAgent(block_cache=BlockCache(path))
+        assert first.assemble_product_page(product) == plain.assemble_product_page(product)
+        assert first.block_cache.stats()["misses"] == 6
+        
+        # A second cache on the same file (as in another process) reads everything back
+        second = ContentAssemblyAgent(block_cache=BlockCache(path))
+        assert second.assemble_product_page(product) == plain.assemble_product_page(product)
+        assert second.block_cache.stats()["hits"] == 6
+        
+        # Only the price block depends on price
+        second.assemble_product_page(variant)
+        assert second.block_cache.stats()["misses"] == 1
+        
+        # Bumping a block version invalidates only that block
+        saved = block_cache.BLOCK_VERSIONS["extract_usage_block"]
+        block_cache.BLOCK_VERSIONS["extract_usage_block"] = saved + 1
+        try:
+            second.assemble_product_page(product)
+        finally:
+            block_cache.BLOCK_VERSIONS["extract_usage_block"] = saved
+        assert second.block_cache.stats()["misses"] == 2
+        
+        assert second.block_cache.prune(3) == 5
+        assert second.block_cache.stats()["entries"] == 3
+    
+    print("✓ Block cache tests passed")
+
+
+def test_shared_memory_batch():
+    """Test the shared-memory product table and the batch mode built on it"""
+    print("Testing shared-memory batch mode...")
+    
+    import tempfile
+    from benchmarks.catalog import generate_catalog
+    from orchestrator.batch import BatchRunner
+    from orchestrator.shared_table import SharedProductTable, encode_row
+    from orchestrator.sinks import make_sink
+    
+    data = _load_input_data()
+    odd = dict(data, price=699, side_effects=None)
+    table = SharedProductTable.build([
+        encode_row("A", "d1", data, partner=1),
+        encode_row("B", "d2", dict(data, side_effects=None, benefits=[])),
+        encode_row("C", "d3", odd)
+    ])
+    try:
+        attached = SharedProductTable.attach(table.name)
+        assert len(attached) == 3
+        key, digest, decoded, partner = attached.row(0)
+        assert (key, digest, partner) == ("A", "d1", 1)
+        assert Product.from_dict(decoded) == Product.from_dict(data)
+        assert attached.row(1)[2]["side_effects"] is None and attached.row(1)[2]["benefits"] == []
+        assert attached.row(2)[2] == odd
+        attached.close()
+    finally:
+        table.close()
+    
+    catalog = list(generate_catalog(40, seed=5))
+    catalog[0]["compare_with"] = catalog[1]["sku"]
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "catalog.json")
+        with open(source, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False)
+        
+        records = {}
+        for mode, shared in (("plain", False), ("shared", True)):
+            out = os.path.join(tmp, mode + ".ndjson")
+            sink = make_sink(out, "ndjson")
+            summary = BatchRunner(sink, workers=2, chunk_size=7, shared_memory=shared).run(source)
+            sink.close()
+            assert summary["generated"] == 40
+            with open(out, 'r', encoding='utf-8') as f:
+                records[mode] = {r["key"]: r["outputs"] for r in map(json.loads, f)}
+        
+        assert records["plain"].keys() == records["shared"].keys()
+        for key, outputs in records["shared"].items():
+            assert outputs["product"] == records["plain"][key]["product"]
+        assert "comparison" in records["shared"][catalog[0]["sku"]]
+    
+    print("✓ Shared-memory batch mode tests passed")
+
+
+def test_sharded_batch():
+    """Test hash-partitioned batch runs and the shard merge step"""
+    print("Testing sharded batch and merge...")
+    
+    import tempfile
+    import main as cli
+    from benchmarks.catalog import generate_catalog
+    from orchestrator.sharding import merge, parse_shard, read_manifest, shard_of
+    from orchestrator.sinks import slugify
+    
+    assert parse_shard("2/4") == (2, 4) and parse_shard(None) is None
+    for bad in ("4/4", "-1/2", "1", "a/b"):
+        try:
+            parse_shard(bad)
+            assert False, f"Should reject {bad}"
+        except ValueError:
+            pass
+    assert shard_of("SKU-1", 7) == shard_of("SKU-1", 7)
+    
+    catalog = list(generate_catalog(24, seed=11))
+    keys = [product["sku"] for product in catalog]
+    for i in range(0, 24, 3):
+        catalog[i]["compare_with"] = keys[i + 1]
+    cross = [keys[i] for i in range(0, 24, 3) if shard_of(keys[i], 3) != shard_of(keys[i + 1], 3)]
+    assert cross
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "catalog.ndjson")
+        
+        def write_catalog():
+            with open(source, 'w', encoding='utf-8') as f:
+                for product in catalog:
+                    f.write(json.dumps(product, ensure_ascii=False) + "\n")
+        
+        write_catalog()
+        shards = [os.path.join(tmp, f"shard-{i}") for i in range(3)]
+        for i, out in enumerate(shards):
+            assert cli.main([source, "--shard", f"{i}/3", "-o", out, "--workers", "1", "-q"]) == 0
+            header, entries = read_manifest(out)
+            assert header["shard"] == i and header["shards"] == 3
+            assert all(shard_of(key, 3) == i for key in entries)
+        
+        try:
+            merge(shards[:2], os.path.join(tmp, "partial"))
+            assert False, "Should reject missing shards"
+        except ValueError as e:
+            assert "2/3" in str(e)
+        
+        merged = os.path.join(tmp, "site")
+        report = merge(shards, merged)
+        assert report["products"] == 24 and report["cross_shard"] == len(cross)
+        assert report["stale"] == [] and report["dangling"] == []
+        _, entries = read_manifest(merged)
+        assert sorted(entries) == sorted(keys)
+        assert "comparison_page.json" in os.listdir(os.path.join(merged, slugify(cross[0])))
+        
+        # Same pages as an unsharded NDJSON merge of the same shards
+        report = merge(shards, os.path.join(tmp, "site.ndjson"), "ndjson")
+        with open(os.path.join(tmp, "site.ndjson"), 'r', encoding='utf-8') as f:
+            records = {r["key"]: r["outputs"] for r in map(json.loads, f)}
+        with open(os.path.join(merged, slugify(keys[5]), "faq.json"), 'r', encoding='utf-8') as f:
+            assert records[keys[5]]["faq"] == json.load(f)
+        
+        # A partner edited and re-rendered on its own node leaves the
+        # comparison in the other shard stale until merge re-renders it
+        owner = cross[0]
+        partner = keys[keys.index(owner) + 1]
+        catalog[keys.index(partner)]["price"] = "₹1"
+        write_catalog()
+        node = shard_of(partner, 3)
+        assert cli.main([source, "--shard", f"{node}/3", "-o", shards[node],
+                         "--workers", "1", "--incremental", "-q"]) == 0
+        report = merge(shards, os.path.join(tmp, "stale"))
+        assert owner in report["stale"] and report["rerendered"] == 0
+        report = merge(shards, os.path.join(tmp, "fresh"), catalog=source)
+        assert report["rerendered"] == len(report["stale"])
+        with open(os.path.join(tmp, "fresh", slugify(owner), "comparison_page.json"), 'r', encoding='utf-8') as f:
+            assert "₹1" in f.read()
+        
+        # Shard outputs copied to the merge host are read from the given paths,
+        # not from where the shard nodes wrote them
+        moved = [os.path.join(tmp, "copied", f"shard-{i}") for i in range(3)]
+        for old, new in zip(shards, moved):
+            os.renames(old, new)
+        report = merge(moved, os.path.join(tmp, "moved"))
+        assert report["products"] == 24
+        assert sorted(os.listdir(os.path.join(tmp, "moved", slugify(keys[5])))) == ["faq.json", "product_page.json"]
+        
+        ndjson_shards = [os.path.join(tmp, f"shard-{i}.ndjson") for i in range(3)]
+        for i, out in enumerate(ndjson_shards):
+            assert cli.main([source, "--shard", f"{i}/3", "-o", out, "--format", "ndjson", "--workers", "1", "-q"]) == 0
+            os.renames(out, os.path.join(tmp, "copied", os.path.basename(out)))
+            os.renames(out + ".manifest.ndjson", os.path.join(tmp, "copied", os.path.basename(out) + ".manifest.ndjson"))
+        copied = [os.path.join(tmp, "copied", os.path.basename(out)) for out in ndjson_shards]
+        report = merge([copied[0] + ".manifest.ndjson"] + copied[1:], os.path.join(tmp, "moved.ndjson"))
+        with open(os.path.join(tmp, "moved.ndjson"), 'r', encoding='utf-8') as f:
+            assert sorted(json.loads(line)["key"] for line in f) == sorted(keys)
+        
+        # A recorded page that is missing fails the merge instead of being skipped
+        _, entries = read_manifest(moved[0])
+        os.remove(os.path.join(moved[0], slugify(next(iter(entries))), "faq.json"))
+        try:
+            merge(moved, os.path.join(tmp, "broken"))
+            assert False, "Should reject a shard with missing pages"
+        except ValueError as e:
+            assert "faq" in str(e)
+    
+    print("✓ Sharded batch and merge tests passed")
+
+
+def test_lazy_outputs():
+    """Test that pipeline pages and their upstream stages are built on first access"""
+    print("Testing lazy page outputs...")
+    
+    import pickle
+    from orchestrator.outputs import LazyOutputs
+    
+    data = _load_input_data()
+    product_b = dict(data, product_name="RadiantGlow Essence", price="₹899")
+    orchestrator = WorkflowOrchestrator()
+    results = orchestrator.execute_pipeline_from_data(data, product_b)
+    outputs = results["outputs"]
+    assert isinstance(outputs, LazyOutputs)
+    assert list(outputs) == ["faq", "product", "comparison"] and len(outputs) == 3
+    assert outputs.pending == ("faq", "product", "comparison")
+    assert set(results["timings"]) == {"parse"}
+    
+    product = outputs["product"]
+    assert outputs["product"] is product and outputs.pending == ("faq", "comparison")
+    assert "questions" not in results["timings"] and "answers" not in results["timings"]
+    assert "QuestionGenerationAgent" not in results["agents_executed"]
+    
+    faq = outputs.get("faq")
+    assert {"questions", "answers", "faq_page"} <= set(results["timings"])
+    assert results["agents_executed"] == [
+        "DataParserAgent", "QuestionGenerationAgent", "FAQGenerationAgent", "ContentAssemblyAgent"
+    ]
+    assert len(faq["faqs"]) >= 15
+    
+    # Consumers of every page see the same pages an eager build produces
+    eager = WorkflowOrchestrator().execute_pipeline_from_data(data, product_b)["outputs"]
+    assert json.dumps(eager, sort_keys=True) == json.dumps(outputs, sort_keys=True)
+    assert eager.copy() == outputs and dict(eager) == dict(outputs)
+    assert outputs.pending == ()
+    restored = pickle.loads(pickle.dumps(WorkflowOrchestrator().execute_pipeline_from_data(data)["outputs"]))
+    assert type(restored) is dict and set(restored) == {"faq", "product"}
+    
+    print("✓ Lazy page outputs tests passed")
+
+
+def test_partial_rerender():
+    """Test field dependency tracking and patching stored pages after a change"""
+    print("Testing partial re-rendering...")
+    
+    import tempfile
+    import blocks.content_blocks as content_blocks
+    from agents.question_generation_agent import QUESTION_FIELDS, QuestionGenerationAgent
+    from blocks.block_cache import BLOCK_FIELDS
+    from orchestrator.change_feed import ChangeFeedConsumer
+    from orchestrator.dependencies import PageUpdater, changed_fields, traced_fields
+    from orchestrator.sinks import make_sink
+    
+    base = _load_input_data()
+    rival = dict(base, sku="B", product_name="Rival Serum", price="₹999")
+    product, partner = Product.from_dict(base), Product.from_dict(rival)
+    
+    # Declared dependencies cover every field the code reads (some reads,
+    # like names in benefit advantages, happen only for some inputs)
+    for name, fields in BLOCK_FIELDS.items():
+        products = (product, partner) if name.startswith("compare_") else (product,)
+        assert traced_fields(getattr(content_blocks, name), *products) <= set(fields), name
+    assert traced_fields(QuestionGenerationAgent().generate_questions, product) == set(QUESTION_FIELDS)
+    
+    assert changed_fields(base, dict(base, price="₹1")) == {"price"}
+    assert changed_fields(base, dict(base, sku="X")) == set()
+    assert changed_fields(dict(base, price=10), dict(base, price=10.0)) == {"price"}
+    assert changed_fields(dict(base, benefits=[1]), dict(base, benefits=[True])) == {"benefits"}
+    assert changed_fields(dict(base, price=10.0), dict(base, price=10.0)) == set()
+    
+    orchestrator = WorkflowOrchestrator()
+    pages = orchestrator.execute_pipeline_from_data(base, rival)["outputs"].copy()
+    updated_data = dict(base, price="₹1")
+    updated = PageUpdater().update(pages, Product.from_dict(updated_data), {"price"}, partner)
+    assert updated["product"] == ["sections.pricing"]
+    assert len(updated["faq"]) == 3 and all(part.endswith(".answer") for part in updated["faq"])
+    assert updated["comparison"] == ["comparisons.pricing", "products.product_a"]
+    fresh = orchestrator.execute_pipeline_from_data(updated_data, rival)["outputs"]
+    assert json.dumps(pages, sort_keys=True) == json.dumps(fresh, sort_keys=True)
+    
+    # Renaming changes the questions: the FAQ is rebuilt, unrelated sections are not
+    renamed = dict(base, product_name="GlowBoost Max")
+    updated = PageUpdater().update(pages, Product.from_dict(renamed), {"product_name"}, partner)
+    assert updated["faq"] == ["*"] and "sections.usage" not in updated["product"]
+    assert pages["faq"] == orchestrator.execute_pipeline_from_data(renamed)["outputs"]["faq"]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "changes.ndjson")
+        out = os.path.join(tmp, "site")
+        
+        def append(*events):
+            with open(log, 'a', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        
+        sink = make_sink(out, "json")
+        consumer = ChangeFeedConsumer(log, sink, window=0)
+        append({"op": "upsert", "product": rival}, {"op": "upsert", "product": dict(base, sku="A", compare_with="B")})
+        consumer.poll()
+        assert consumer.flush()["patched"] == 0
+        
+        # A price-only change of B patches B's pages and A's comparison page only
+        usage_path = sink.page_path("A", "product")
+        before = os.stat(usage_path).st_mtime_ns
+        append({"op": "upsert", "product": dict(rival, price="₹5")})
+        consumer.poll()
+        summary = consumer.flush()
+        assert summary["rendered"] == 2 and summary["patched"] == 2
+        assert os.stat(usage_path).st_mtime_ns == before
+        expected = orchestrator.execute_pipeline_from_data(dict(base, sku="A", compare_with="B"),
+                                                           dict(rival, price="₹5"))["outputs"]
+        assert sink.read("A", "comparison") == json.loads(json.dumps(expected["comparison"]))
+        assert "₹5" in json.dumps(sink.read("B", "faq"), ensure_ascii=False)
+        consumer.close()
+    
+    print("✓ Partial re-rendering tests passed")
+
+
+def test_page_versions():
+    """Test JSON Patch diffs, the page version store and the changes API"""
+    print("Testing page versions...")
+    
+    import copy
+    import sqlite3
+    import tempfile
+    import main as cli
+    from api.generate import handler
+    from benchmarks.catalog import generate_catalog
+    from orchestrator.page_versions import PageVersionStore, apply_patch, diff
+    from templates.template_engine import PRODUCT_PAGE_METADATA
+    
+    data = _load_input_data()
+    orchestrator = WorkflowOrchestrator()
+    old = orchestrator.execute_pipeline_from_data(data)["outputs"].copy()
+    new = orchestrator.execute_pipeline_from_data(dict(data, price="₹1"))["outputs"].copy()
+    patch = diff(old["faq"], new["faq"])
+    assert all(op["op"] == "replace" and op["path"].endswith("/answer") for op in patch) and len(patch) == 3
+    assert apply_patch(old["faq"], patch) == new["faq"]
+    assert diff(old["product"], old["product"]) == []
+    
+    # Arrays grow and shrink, keys are escaped, the input is never modified
+    before = {"a/b": [1, 2, 3], "~": {"x": 1}, "gone": True}
+    after = {"a/b": [1, 5], "~": {"x": 1, "y": [7]}, "new": None}
+    snapshot = copy.deepcopy(before)
+    assert apply_patch(before, diff(before, after)) == after and before == snapshot
+    assert apply_patch([1, 2, 3], diff([1, 2, 3], [1, 2, 3, 4, 5])) == [1, 2, 3, 4, 5]
+    # Python equality is not JSON equality: nested 1, 1.0 and true differ
+    assert diff([1], [True]) == [{"op": "replace", "path": "/0", "value": True}]
+    assert diff({"a": {"b": [1]}}, {"a": {"b": [1.0]}}) == [{"op": "replace", "path": "/a/b/0", "value": 1.0}]
+    assert diff({"a": 1, "b": [2]}, {"b": [2], "a": 1}) == []
+    patched = apply_patch(old["product"], [{"op": "replace", "path": "/metadata/section_count", "value": 7}])
+    assert patched["metadata"]["section_count"] == 7 and PRODUCT_PAGE_METADATA["section_count"] == 6
+    assert apply_patch({"a": {"b": 1}}, [{"op": "move", "from": "/a/b", "path": "/c"},
+                                         {"op": "copy", "from": "/c", "path": "/a/d"},
+                                         {"op": "test", "path": "/a/d", "value": 1}]) == {"a": {"d": 1}, "c": 1}
+    for bad in ([{"op": "test", "path": "/a", "value": 2}], [{"op": "remove", "path": "/missing"}],
+                [{"op": "add", "path": "/list/9", "value": 0}], [{"op": "nope", "path": ""}]):
+        try:
+            apply_patch({"a": 1, "list": []}, bad)
+            assert False, f"Should reject {bad}"
+        except ValueError:
+            pass
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PageVersionStore(os.path.join(tmp, "versions.sqlite3"))
+        assert store.record("A", old) == {"faq": 1, "product": 2}
+        assert store.record("A", old) == {}
+        assert list(store.record("A", new)) == ["faq", "product"]
+        result = store.changes(since=2)
+        assert [change["op"] for change in result["changes"]] == ["update", "update"] and result["version"] == 4
+        page = store.page("A", "faq")[1]
+        replayed = apply_patch(old["faq"], result["changes"][0]["patch"])
+        assert replayed == page == json.loads(json.dumps(new["faq"]))
+        store.remove("A", ["faq"])
+        assert store.changes(since=4)["changes"][0]["op"] == "delete" and store.page("A", "faq") is None
+        assert store.changes(since=0, limit=2)["more"]
+        store.prune(3)
+        assert store.changes(since=1)["reset"] and not store.changes(since=3)["reset"]
+        store.record("B", {"card": {"flags": [1]}})
+        assert store.record("B", {"card": {"flags": [True]}}) == {"card": 7}
+        assert store.page("B", "card")[1]["flags"][0] is True
+        with store._connect() as conn:
+            pass
+        try:
+            conn.execute("SELECT 1")
+            assert False, "Connections should be closed after use"
+        except sqlite3.ProgrammingError:
+            pass
+        
+        # Batch runs record versions; an incremental rerun records only what changed
+        catalog = list(generate_catalog(5, seed=8))
+        source = os.path.join(tmp, "catalog.json")
+        versions = os.path.join(tmp, "site.sqlite3")
+        for run in range(2):
+            with open(source, 'w', encoding='utf-8') as f:
+                json.dump(catalog, f, ensure_ascii=False)
+            args = [source, "-o", os.path.join(tmp, "site"), "--versions", versions, "--workers", "1", "-q"]
+            assert cli.main(args + (["--incremental"] if run else [])) == 0
+            catalog[2]["price"] = "₹42"
+        changes = PageVersionStore(versions).changes(since=10)["changes"]
+        assert {change["key"] for change in changes} == {catalog[2]["sku"]}
+        assert {change["page_type"] for change in changes} == {"faq", "product"}
+        
+        handler.version_store = PageVersionStore(versions)
+        try:
+            status, _, body = _api_request('GET', f'/api/changes?since=10&key={catalog[2]["sku"]}')
+            assert status == 200 and json.loads(body)["changes"] == changes
+            assert _api_request('GET', '/api/changes?since=x')[0] == 400
+        finally:
+            handler.version_store = None
+    
+    print("✓ Page versions tests passed")
+
+
+def test_template_compiler():
+    """Test page schemas compiled into render functions and new page registration"""
+    print("Testing template compiler...")
+    
+    from templates import Arg, Attr, Call, Each, Key, PageSchema, TemplateEngine, compile_schema
+    from templates.template_engine import FAQTemplate, PRODUCT_PAGE_METADATA
+    
+    product = Product.from_dict(_load_input_data())
+    questions = QuestionGenerationAgent().generate_questions(product)
+    answers = FAQGenerationAgent().generate_answers(product, questions)
+    
+    # Same page the hand-written template built, one item per answered question
+    page = FAQTemplate().render(product, questions + [{"question": "Extra?"}], answers)
+    assert page["faq_count"] == len(questions) == len(page["faqs"])
+    assert page["faqs"][0] == {"category": questions[0]["category"], "question": questions[0]["question"],
+                               "answer": answers[0]}
+    assert page["metadata"]["categories"][:2] == ["Informational", "Safety"]
+    assert FAQTemplate().render(product, [{"question": "Q?"}], ["A."])["faqs"][0]["category"] == "General"
+    assert "for q, answer in zip(questions, answers)" in FAQTemplate.render.source
+    
+    engine = TemplateEngine()
+    blocks = {name: {"title": name} for name in ("overview", "benefits", "ingredients", "usage", "safety", "pricing")}
+    rendered = engine.render_template("product", product=product, **blocks)
+    assert rendered["metadata"] is PRODUCT_PAGE_METADATA and rendered["sections"]["usage"] == {"title": "usage"}
+    
+    # New page types are a schema, not a class; static parts are hoisted and shared
+    engine.register("ingredient_card", PageSchema(
+        "ingredient_card",
+        params=("product",),
+        body={
+            "page_type": "ingredient_card",
+            "name": Attr("product", "product_name"),
+            "items": Each({"ingredient": Attr("product", "key_ingredients")},
+                          {"name": Arg("ingredient"), "length": Call(len, Arg("ingredient"))}),
+            "layout": {"columns": 2, "theme": ["light", "compact"]},
+            "ratio": 0.5
+        }
+    ))
+    first = engine.render_template("ingredient_card", product=product)
+    second = engine.render_template("ingredient_card", product=product)
+    assert first["items"][0] == {"name": product.key_ingredients[0], "length": len(product.key_ingredients[0])}
+    assert first["layout"] is second["layout"] and first["items"] is not second["items"] and first["ratio"] == 0.5
+    
+    # Constants of schemas registered at runtime are pre-encoded too, and
+    # recompiling an equal schema does not hoist duplicates
+    from server import serialization
+    from templates.compiler import hoisted_count
+    serialization.encode_page(first)
+    assert id(first["layout"]) in serialization._STATIC_FRAGMENTS
+    counts, cards = set(), []
+    for _ in range(3):
+        card = compile_schema(PageSchema("card", ("product",), {"theme": {"columns": 2, "tags": ["new"]}}))
+        counts.add(hoisted_count())
+        cards.append(card(product))
+    assert len(counts) == 1 and cards[0] is cards[1] is cards[2]
+    late = compile_schema(PageSchema("late", ("product",), {"name": Attr("product", "concentration"),
+                                                          "tags": ["late-only"]}))(product)
+    assert serialization.encode_page(late) == json.dumps(late, separators=(",", ":"), ensure_ascii=False).encode()
+    assert serialization._STATIC_FRAGMENTS[id(late["tags"])][0] is late["tags"]
+    
+    for bad in (PageSchema("bad", ("product",), {"x": Arg("missing")}),
+                PageSchema("bad", ("class",), {}),
+                PageSchema("bad", ("product",), {"x": Key(Arg("product"), "k")}, lets={"product": 1}),
+                PageSchema("bad page", (), {})):
+        try:
+            compile_schema(bad)
+            assert False, f"Should reject {bad}"
+        except ValueError:
+            pass
+    
+    print("✓ Template compiler tests passed")
+
+
+def test_streaming_renderers():
+    """Test HTML/Markdown pages streamed to writers, sinks and the API"""
+    print("Testing streaming renderers...")
+    
+    import gzip
+    import tempfile
+    from html.parser import HTMLParser
+    import main as cli
+    from orchestrator.sinks import make_sink, slugify
+    from templates import PageRenderer, get_renderer
+    
+    data = _load_input_data()
+    rival = dict(data, product_name="Rival <script>alert(1)</script> & Co", price="₹899")
+    outputs = WorkflowOrchestrator().execute_pipeline_from_data(data, rival)["outputs"]
+    
+    class TagChecker(HTMLParser):
+        def __init__(self):
+            super().__init__()
+            self.open, self.text = [], []
+        
+        def handle_starttag(self, tag, attrs):
+            if tag != "meta":
+                self.open.append(tag)
+        
+        def handle_endtag(self, tag):
+            assert self.open.pop() == tag, f"Unbalanced </{tag}>"
+        
+        def handle_data(self, data):
+            self.text.append(data)
+    
+    # Fragments go to the writer as they are produced
+    html_renderer = get_renderer("html")
+    chunks = []
+    html_renderer.render(outputs["comparison"], chunks.append)
+    assert len(chunks) > 10 and all(isinstance(chunk, bytes) for chunk in chunks)
+    document = b"".join(chunks).decode("utf-8")
+    assert document.startswith("<!DOCTYPE html>") and "<script>" not in document
+    assert "Rival &lt;script&gt;alert(1)&lt;/script&gt; &amp; Co" in document
+    checker = TagChecker()
+    checker.feed(document)
+    assert checker.open == [] and "Rival <script>alert(1)</script> & Co" in "".join(checker.text)
+    
+    # One document for all pages; FAQ grouped by category; static fragments cached
+    document = html_renderer.render_bytes(outputs).decode("utf-8")
+    assert document.count("<!DOCTYPE html>") == 1 and document.count("<article") == 3
+    assert document.count('<section class="faq-category">') == len(outputs["faq"]["metadata"]["categories"])
+    assert outputs["faq"]["faqs"][0]["question"] in document
+    assert html_renderer.static("Key Benefits") is html_renderer.static("Key Benefits")
+    
+    markdown = get_renderer("markdown").render_bytes(outputs).decode("utf-8")
+    assert markdown.startswith(f"# {data['product_name']}: Frequently Asked Questions")
+    assert "Rival \\<script\\>alert(1)\\</script\\> \\& Co" in markdown
+    assert "## Key Benefits" in markdown and "- Brightening" in markdown
+    assert get_renderer("markdown").escape("- 1. *x*") == "\\- 1. \\*x\\*"
+    assert get_renderer("markdown").escape("10. Apply") == "10\\. Apply"
+    assert get_renderer("markdown").escape("1.5% acid") == "1.5% acid"
+    
+    class Incomplete(PageRenderer):
+        format = "incomplete"
+    
+    try:
+        Incomplete()
+        assert False, "Should require escape()"
+    except TypeError:
+        pass
+    try:
+        get_renderer("pdf")
+        assert False, "Should reject unknown format"
+    except ValueError:
+        pass
+    
+    # Sinks stream straight into the page files
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = make_sink(os.path.join(tmp, "md"), "markdown")
+        sink.write("SKU 1", {"product": outputs["product"]})
+        with open(os.path.join(tmp, "md", slugify("SKU 1"), "product_page.md"), "r", encoding="utf-8") as f:
+            assert f.read().startswith(f"# {data['product_name']}")
+        assert sink.read("SKU 1", "product") is None
+        
+        source = os.path.join(tmp, "catalog.json")
+        with open(source, "w", encoding="utf-8") as f:
+            json.dump([dict(data, sku="A", compare_with="B"), dict(rival, sku="B")], f)
+        site = os.path.join(tmp, "site")
+        assert cli.main([source, "-o", site, "--format", "html", "--workers", "1", "-q"]) == 0
+        assert sorted(os.listdir(os.path.join(site, "A"))) == ["comparison_page.html", "faq.html", "product_page.html"]
+        with open(os.path.join(site, "A", "comparison_page.html"), "r", encoding="utf-8") as f:
+            checker = TagChecker()
+            checker.feed(f.read())
+            assert checker.open == []
+    
+    status, headers, body = _api_request('POST', '/api/generate?format=markdown',
+                                         {'product_a': data, 'pages': 'product'})
+    assert status == 200 and headers['Content-type'].startswith('text/markdown')
+    assert body.decode("utf-8").startswith(f"# {data['product_name']}") and b"Frequently" not in body
+    assert headers['Transfer-Encoding'] == 'chunked' and 'Content-Length' not in headers
+    status, headers, compressed = _api_request('POST', '/api/generate?format=markdown',
+                                               {'product_a': data, 'pages': 'product'},
+                                               headers={'Accept-Encoding': 'gzip'})
+    assert status == 200 and headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed) == body
+    status, _, _ = _api_request('POST', '/api/generate', {'product_a': data, 'format': 'html', 'fields': 'faq.faqs'})
+    assert status == 400
+    
+    print("✓ Streaming renderer tests passed")
+
+
 def run_all_tests():
     """Run all tests"""
     print("=" * 60)
@@ -247,7 +1646,32 @@ def run_all_tests():
         test_json_outputs,
         test_faq_output_structure,
         test_product_page_structure,
-        test_comparison_page_structure
+        test_comparison_page_structure,
+        test_page_selection,
+        test_field_projection,
+        test_response_compression,
+        test_metrics_endpoint,
+        test_server_timing,
+        test_admission_control,
+        test_job_api,
+        test_cold_start_imports,
+        test_serialization_fast_path,
+        test_static_files,
+        test_benchmark_suite,
+        test_load_generator,
+        test_profiling_mode,
+        test_catalog_cli,
+        test_change_feed,
+        test_answer_backend,
+        test_answer_cache,
+        test_block_cache,
+        test_shared_memory_batch,
+        test_sharded_batch,
+        test_lazy_outputs,
+        test_partial_rerender,
+        test_page_versions,
+        test_template_compiler,
+        test_streaming_renderers
     ]
     
     passed = 0